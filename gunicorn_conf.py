@@ -0,0 +1,26 @@
+"""
+Gunicorn settings for serving the web interface and API in production.
+
+Planning requests spend most of their time waiting on OpenAI, so each worker
+runs a pool of threads; `workers * threads` requests can be in flight at once.
+
+    gunicorn -c gunicorn_conf.py --chdir src "web_interface:create_app()"
+    gunicorn -c gunicorn_conf.py --chdir src api_server:app
+"""
+
+import os
+
+bind = f"{os.getenv('HOST', '0.0.0.0')}:{os.getenv('PORT', '8000')}"
+
+workers = int(os.getenv("WEB_CONCURRENCY", 4))
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", 16))
+
+# OpenAI planning calls can take tens of seconds; batch polling is separate
+timeout = 120
+graceful_timeout = 30
+keepalive = 5
+
+accesslog = "-"
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info")
@@ -5,46 +5,770 @@ Uses OpenAI API to intelligently plan government reports based on data profiles.
 """
 
 import os
+import re
+import atexit
+import copy
 import json
+import time
+import asyncio
+import importlib.util
 import logging
-from typing import Dict, Any, List, Optional
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, List, Optional, Tuple, Iterable, Iterator, AsyncIterator, TYPE_CHECKING
 from dataclasses import asdict
-import openai
 from dotenv import load_dotenv
 
+# The OpenAI SDK takes hundreds of ms to import, so it is only imported when a
+# client is first needed, and pydantic when the first response is parsed;
+# fallback planning and health checks never pay for either
+if TYPE_CHECKING:
+    import openai
+    import pydantic
+
+# RapidFuzz is optional; column matching falls back to substring checks without it
+try:
+    from rapidfuzz import fuzz, process as fuzz_process
+except ImportError:
+    fuzz = fuzz_process = None
+
+# orjson is optional; the stdlib json module is used when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Try relative imports first, fall back to absolute for standalone testing
 try:
     from .report_spec import (
         ReportSpec, KPI, ChartSpec, ChartSeries, TableSpec,
-        MetricType, FormatType, ChartType, SortOrder
+        MetricType, FormatType, ChartType, SortOrder,
+        create_government_report_templates
     )
-    from .data_processor import DataProfile
+    from .data_processor import DataProfile, ColumnProfile
+    from .llm_cache import LLMCache
+    from .openai_pool import AsyncOpenAIPool
+    from .semantic_cache import SemanticCache
 except ImportError:
     from report_spec import (
         ReportSpec, KPI, ChartSpec, ChartSeries, TableSpec,
-        MetricType, FormatType, ChartType, SortOrder
+        MetricType, FormatType, ChartType, SortOrder,
+        create_government_report_templates
     )
-    from data_processor import DataProfile
+    from data_processor import DataProfile, ColumnProfile
+    from llm_cache import LLMCache
+    from openai_pool import AsyncOpenAIPool
+    from semantic_cache import SemanticCache
 
 # Load environment variables
 load_dotenv()
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# OpenAI Batch API settings
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+BATCH_POLL_INTERVAL_SECONDS = 30.0
+BATCH_TIMEOUT_SECONDS = 24 * 60 * 60
+
+# Static planning instructions and response schema. Sent first, unchanged on every
+# call, so OpenAI's automatic prompt caching can reuse the prefix.
+PLANNING_SYSTEM_PROMPT = """You are an expert government report planner. Always respond with valid JSON matching the exact schema provided. Create clear, government-ready report specifications grounded in the available data.
+
+Generate a JSON response that matches this schema:
+
+{
+  "title": "Report title",
+  "description": "Brief description of the report",
+  "kpis": [
+    {
+      "label": "KPI label",
+      "metric": "sum|avg|min|max|count|formula",
+      "column": "column_name",
+      "filter": {"optional": "filtering"},
+      "format": "currency|percent|number|date|string",
+      "description": "What this KPI measures"
+    }
+  ],
+  "charts": [
+    {
+      "type": "bar|line|pie",
+      "title": "Chart title",
+      "x": {"column": "x_axis_column", "granularity": "optional_time_granularity"},
+      "series": [
+        {
+          "label": "Series label",
+          "metric": "sum|avg|min|max|count",
+          "column": "data_column",
+          "filter": {"optional": "filtering"},
+          "color": "optional_color"
+        }
+      ],
+      "sort": {"by": "column_name", "order": "asc|desc"},
+      "limit": 10,
+      "description": "What this chart shows"
+    }
+  ],
+  "tables": [
+    {
+      "title": "Table title",
+      "columns": ["col1", "col2", "col3"],
+      "sort": {"by": "column_name", "order": "asc|desc"},
+      "limit": 20,
+      "zebra_rows": true,
+      "description": "What this table shows"
+    }
+  ],
+  "narrative_goals": [
+    "Goal 1: What insights should this report provide",
+    "Goal 2: What actions should it enable"
+  ],
+  "template": "suggested_template_name"
+}
+
+IMPORTANT: Only use columns that exist in the available data. Return ONLY the JSON response, no additional text or explanations.
+"""
+
+# Fixed pieces of the per-request user prompt, split at each interpolated value
+_PROMPT_HEAD = "AVAILABLE DATA ("
+_PROMPT_ROWS = " rows):\n"
+_PROMPT_REQUEST = "\n\nUSER REQUEST:\n"
+_PROMPT_HINT = "\n\nTEMPLATE HINT:\n"
+_PROMPT_DEFAULT_HINT = "No specific template requested"
+_PROMPT_TAIL = "\n\nRespond with JSON matching the schema.\n"
+
+# Models: a small model plans by default; a larger one retries plans it gets badly wrong
+DEFAULT_PLANNING_MODEL = "gpt-4o-mini"
+DEFAULT_ESCALATION_MODEL = "gpt-4o"
+MODEL_ESCALATION_MAX_ERRORS = 2
+
+# Per-request OpenAI timeout; the SDK default of 10 minutes outlives the gunicorn worker timeout
+OPENAI_TIMEOUT_SECONDS = 60.0
+
+# Threads that build the fallback plan while the OpenAI request is in flight
+FALLBACK_PLANNING_WORKERS = 4
+
+# Concurrent planning settings
+DEFAULT_PLANNING_CONCURRENCY = 20
+
+# Plan cache settings
+PLAN_CACHE_MAX_ENTRIES = 512
+PLAN_CACHE_TTL_SECONDS = 60 * 60
+TEMPLATE_CACHE_MAX_ENTRIES = 256
+RESPONSE_FORMAT_CACHE_MAX_ENTRIES = 256
+
+# Semantic cache settings: near-duplicate descriptions on the same columns reuse a plan.
+# Off unless an embedding model (e.g. text-embedding-3-small) is configured, since the
+# embedding is an extra OpenAI round trip ahead of every uncached completion
+DEFAULT_EMBEDDING_MODEL = ""
+SEMANTIC_CACHE_MIN_SIMILARITY = 0.92
+TEMPLATE_CACHE_MIN_CONFIDENCE = 0.8
+
+# Descriptions that name a built-in government template are planned from it without
+# an OpenAI call when at least this share of its columns bind to the profile
+BUILTIN_TEMPLATE_MIN_CONFIDENCE = 0.8
+
+# Minimum RapidFuzz WRatio score (0-100) for a column name to count as a match
+COLUMN_MATCH_SCORE_CUTOFF = 60
+
+# Patterns masked out of descriptions so "Q1 2024" and "Q2 2025" requests share a skeleton
+_SKELETON_MASKS = [
+    (re.compile(r"\bfy\s?\d{2,4}\b"), "<fy>"),
+    (re.compile(r"\bq[1-4]\b"), "<quarter>"),
+    (re.compile(r"\b(?:january|february|march|april|may|june|july|august|september|"
+                r"october|november|december|jan|feb|mar|apr|jun|jul|aug|sep|sept|oct|nov|dec)\b"), "<month>"),
+    (re.compile(r"\d+(?:[.,]\d+)*"), "<num>"),
+]
+
+# Column-name keywords the fallback planner uses to recognise report types; each
+# alternation scans a name once instead of one substring test per keyword
+_BUDGET_KEYWORDS = re.compile(r"budget|actual|planned|allocated|spent|expended", re.IGNORECASE)
+_DEPT_KEYWORDS = re.compile(r"department|division|unit|agency|bureau", re.IGNORECASE)
+_FINANCIAL_KEYWORDS = re.compile(r"revenue|income|expense|cost|amount|total", re.IGNORECASE)
+_METRIC_KEYWORDS = re.compile(r"score|rating|performance|efficiency|target", re.IGNORECASE)
+_PLANNED_KEYWORDS = re.compile(r"budget|planned|allocated", re.IGNORECASE)
+_ACTUAL_KEYWORDS = re.compile(r"actual|spent|expended", re.IGNORECASE)
+_FINANCIAL_KPI_KEYWORDS = re.compile(r"revenue|income|amount|total", re.IGNORECASE)
+_METRIC_KPI_KEYWORDS = re.compile(r"score|rating|performance", re.IGNORECASE)
+_DEPT_CHART_KEYWORDS = re.compile(r"department|division|unit", re.IGNORECASE)
+
+# Phrases in a description (or template hint) that name a built-in template
+_BUILTIN_TEMPLATE_KEYWORDS = {
+    "budget_vs_actual": re.compile(
+        r"budget\W+(?:vs\.?|versus|against|to|and)\W+actual|actuals?\W+(?:vs\.?|versus|against)\W+budget|"
+        r"budget\W+variance", re.IGNORECASE),
+    "balance_sheet": re.compile(
+        r"balance\W+sheet|assets\W+(?:and|vs\.?|versus)\W+liabilities|net\W+position", re.IGNORECASE),
+    "response_times": re.compile(r"\b311\b|response\W+times?", re.IGNORECASE),
+}
+
+# Raw AI responses keyed by normalized planning inputs, shared by all planners
+_plan_cache = LLMCache(max_entries=PLAN_CACHE_MAX_ENTRIES, ttl_seconds=PLAN_CACHE_TTL_SECONDS)
+
+# Plans of near-duplicate descriptions, shared by all planners. Created the first
+# time a planner with an embedding model uses it, so numpy stays off the import path
+_semantic_cache = None
+_semantic_cache_lock = threading.Lock()
+
+# Rate limits are per API key, so every planner shares one request/token budget
+_openai_pool = AsyncOpenAIPool.from_env()
+_template_cache_lock = threading.Lock()
+
+# One connection pool for every planner's sync OpenAI client, so TLS sessions
+# are reused across planners instead of each instance opening its own
+_shared_http_client = None
+_shared_http_client_lock = threading.Lock()
+
+# HTTP/2 multiplexing needs the optional h2 package (pip install httpx[http2])
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+# Shared by all planners so fallback plans are ready if the OpenAI call fails
+_fallback_executor = ThreadPoolExecutor(
+    max_workers=FALLBACK_PLANNING_WORKERS, thread_name_prefix="fallback-plan"
+)
+
+# One long-lived event loop on its own thread owns the AsyncOpenAI connection pool,
+# so keep-alive connections survive across requests even though Flask runs every
+# async view on a fresh loop
+_openai_loop = None
+_openai_loop_lock = threading.Lock()
+
+
+def _get_shared_http_client():
+    """Return the process-wide HTTP client used by sync OpenAI clients."""
+    global _shared_http_client
+    with _shared_http_client_lock:
+        if _shared_http_client is None:
+            import openai
+            _shared_http_client = openai.DefaultHttpxClient(http2=HTTP2_AVAILABLE)
+        return _shared_http_client
+
+
+def close_shared_http_client() -> None:
+    """Close the shared HTTP connection pool; a new one is opened on next use."""
+    global _shared_http_client
+    with _shared_http_client_lock:
+        if _shared_http_client is not None:
+            _shared_http_client.close()
+            _shared_http_client = None
+
+
+atexit.register(close_shared_http_client)
+
+
+def _get_openai_loop() -> asyncio.AbstractEventLoop:
+    """Return the process-wide event loop that async OpenAI calls run on, starting it if needed."""
+    global _openai_loop
+    with _openai_loop_lock:
+        if _openai_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="openai-loop", daemon=True).start()
+            _openai_loop = loop
+        return _openai_loop
+
+
+async def _on_openai_loop(coro: Any) -> Any:
+    """Run a coroutine on the shared OpenAI loop and await its result from any loop."""
+    loop = _get_openai_loop()
+    if asyncio.get_running_loop() is loop:
+        return await coro
+    return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coro, loop))
+
+
+def iterate_on_openai_loop(async_iterator: AsyncIterator[Any]) -> Iterator[Any]:
+    """
+    Drive an async iterator from sync code, one item at a time, on the shared OpenAI loop.
+    
+    Streamed plans then use that loop's AsyncOpenAI client and warm connections,
+    instead of a new event loop per request whose client pool is never closed.
+    """
+    loop = _get_openai_loop()
+    
+    async def _next():
+        return await async_iterator.__anext__()
+    
+    try:
+        while True:
+            try:
+                yield asyncio.run_coroutine_threadsafe(_next(), loop).result()
+            except StopAsyncIteration:
+                return
+    finally:
+        # Also runs when the client disconnects mid-stream
+        asyncio.run_coroutine_threadsafe(async_iterator.aclose(), loop).result()
+
+
+def _json_loads(text: str) -> Any:
+    """Decode JSON with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+def _json_dumps(obj: Any, indent: bool = False, sort_keys: bool = False) -> str:
+    """Encode compact JSON with orjson when available."""
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option).decode("utf-8")
+    return json.dumps(obj, indent=2 if indent else None,
+                      separators=None if indent else (",", ":"), sort_keys=sort_keys)
+
+
+def _plan_cache_key(
+    user_description: str,
+    data_profile: DataProfile,
+    template_hint: Optional[str] = None
+) -> str:
+    """Build a stable cache key from the description, column schema and template hint."""
+    return LLMCache.make_key(
+        desc=" ".join(user_description.lower().split()),
+        schema=data_profile.column_schema,
+        hint=template_hint or None
+    )
+
+
+def plan_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the shared AI response cache."""
+    return _plan_cache.stats()
+
+
+def _get_semantic_cache() -> SemanticCache:
+    """The shared embedding-based plan cache, created on first use."""
+    global _semantic_cache
+    if _semantic_cache is None:
+        with _semantic_cache_lock:
+            if _semantic_cache is None:
+                _semantic_cache = SemanticCache(
+                    min_similarity=SEMANTIC_CACHE_MIN_SIMILARITY,
+                    max_entries=PLAN_CACHE_MAX_ENTRIES,
+                    ttl_seconds=PLAN_CACHE_TTL_SECONDS
+                )
+    return _semantic_cache
+
+
+def semantic_cache_stats() -> Dict[str, Any]:
+    """Hit/miss counters for the shared embedding-based plan cache, or 'enabled': False before first use."""
+    if _semantic_cache is None:
+        return {'enabled': False}
+    return _semantic_cache.stats()
+
+
+def _semantic_cache_signature(data_profile: DataProfile, template_hint: Optional[str]) -> Tuple[Any, ...]:
+    """What a semantically cached plan must match exactly: the column layout and template hint."""
+    return (data_profile.column_schema, template_hint or None)
+
+
+def _embedding_input(user_description: str) -> str:
+    """Normalize a description the same way as the exact cache key before embedding it."""
+    return " ".join(user_description.lower().split())
+
+
+def openai_pool_stats() -> Dict[str, Any]:
+    """Remaining capacity of the shared OpenAI rate limiter."""
+    return _openai_pool.stats()
+
+
+def _build_column_index(columns: Iterable[str]) -> Dict[str, str]:
+    """
+    Map lower-cased column names to the actual names for case-insensitive lookup.
+    
+    Built once per column layout and shared, so callers must not modify it.
+    """
+    return _column_index_for(tuple(columns))
+
+
+@lru_cache(maxsize=128)
+def _column_index_for(columns: Tuple[str, ...]) -> Dict[str, str]:
+    """Cached body of _build_column_index."""
+    return {name.lower(): name for name in columns}
+
+
+@lru_cache(maxsize=128)
+def _column_word_index(lowered_columns: Tuple[str, ...]) -> Dict[str, str]:
+    """Map each word of the lower-cased column names to the first column containing it."""
+    words: Dict[str, str] = {}
+    for col_lower in lowered_columns:
+        for word in col_lower.split():
+            words.setdefault(word, col_lower)
+    return words
+
+
+def _match_builtin_template(user_description: str, template_hint: Optional[str] = None) -> Optional[str]:
+    """Name of the built-in template the hint or description asks for, if any."""
+    if template_hint:
+        name = "_".join(template_hint.lower().split())
+        if name in _BUILTIN_TEMPLATE_KEYWORDS:
+            return name
+    text = f"{template_hint or ''} {user_description}"
+    for name, keywords in _BUILTIN_TEMPLATE_KEYWORDS.items():
+        if keywords.search(text):
+            return name
+    return None
+
+
+@lru_cache(maxsize=1)
+def _builtin_templates() -> Dict[str, Dict[str, Any]]:
+    """Built-in templates in template-cache form: the plan dict and its columns, with any type."""
+    templates = {}
+    for name, spec in create_government_report_templates().items():
+        roles = {}
+        
+        def _record(column, roles=roles):
+            roles[column] = None
+            return column
+        
+        templates[name] = {"response": _map_response_columns(spec.to_dict(), _record), "roles": roles}
+    return templates
+
+
+def _columns_matching(columns: List[ColumnProfile], keywords: "re.Pattern") -> List[ColumnProfile]:
+    """Return the columns whose names contain any of the keywords."""
+    return [col for col in columns if keywords.search(col.name)]
+
+
+# Column-agnostic plan templates keyed by description skeleton, shared by all planners.
+# Each entry holds the parsed AI response and the type ("role") of every column it used.
+_template_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+
+def _description_skeleton(user_description: str, template_hint: Optional[str] = None) -> str:
+    """Reduce a description to its structure by masking names, dates and numbers."""
+    words = []
+    for i, word in enumerate(user_description.split()):
+        # Capitalized words after the first are treated as named entities (agencies, places)
+        if i > 0 and word[:1].isupper():
+            word = "<name>"
+        if not (word == "<name>" and words and words[-1] == "<name>"):
+            words.append(word)
+    skeleton = " ".join(words).lower()
+    for pattern, mask in _SKELETON_MASKS:
+        skeleton = pattern.sub(mask, skeleton)
+    return f"{template_hint or ''}|{skeleton}"
+
+
+def _map_response_columns(data: Dict[str, Any], mapper, copy_data: bool = True) -> Dict[str, Any]:
+    """
+    Pass every column reference in a raw AI response through mapper.
+    
+    Works on a deep copy unless copy_data is False, in which case the
+    response is updated in place and returned.
+    """
+    if copy_data:
+        data = copy.deepcopy(data)
+    
+    def _map_sort(item):
+        sort = item.get("sort")
+        if isinstance(sort, dict) and sort.get("by"):
+            sort["by"] = mapper(sort["by"])
+    
+    for kpi in data.get("kpis", []):
+        if isinstance(kpi, dict) and kpi.get("column"):
+            kpi["column"] = mapper(kpi["column"])
+    for chart in data.get("charts", []):
+        if not isinstance(chart, dict):
+            continue
+        if isinstance(chart.get("x"), dict) and chart["x"].get("column"):
+            chart["x"]["column"] = mapper(chart["x"]["column"])
+        for series in chart.get("series", []):
+            if isinstance(series, dict) and series.get("column"):
+                series["column"] = mapper(series["column"])
+        _map_sort(chart)
+    for table in data.get("tables", []):
+        if not isinstance(table, dict):
+            continue
+        if isinstance(table.get("columns"), list):
+            table["columns"] = [mapper(col) for col in table["columns"]]
+        _map_sort(table)
+    return data
+
+
+# Value -> member maps; a dict lookup skips Enum.__call__ on every field conversion
+_METRIC_TYPES = {member.value: member for member in MetricType}
+_FORMAT_TYPES = {member.value: member for member in FormatType}
+_CHART_TYPES = {member.value: member for member in ChartType}
+
+@lru_cache(maxsize=1)
+def _plan_adapter() -> "pydantic.TypeAdapter":
+    """
+    TypeAdapter that validates a response and builds the ReportSpec dataclasses in one pass.
+    
+    Built on first use, since importing pydantic and building the adapter
+    takes tens of ms that health checks and fallback planning never need.
+    """
+    import pydantic
+    return pydantic.TypeAdapter(ReportSpec)
+
+# JSON Schema keywords pydantic adds for documentation; left out of the strict response format
+_SCHEMA_ANNOTATIONS = {"title", "default", "description"}
+
+
+def _strict_object(properties: Dict[str, Any]) -> Dict[str, Any]:
+    """Object schema in the form strict structured outputs require: every key present, no extras."""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False
+    }
+
+
+def _nullable(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Allow null in place of a value matching schema."""
+    return {"anyOf": [schema, {"type": "null"}]}
+
+
+@lru_cache(maxsize=1)
+def _plan_json_schema() -> Dict[str, Any]:
+    """JSON Schema of ReportSpec, from the same adapter that validates responses."""
+    return _plan_adapter().json_schema()
+
+
+def _strict_schema(
+    node: Any,
+    definitions: Dict[str, Any],
+    overrides: Dict[str, Dict[str, Optional[Dict[str, Any]]]],
+    name: Optional[str] = None
+) -> Any:
+    """
+    Rewrite a pydantic JSON Schema node in the form strict structured outputs require.
+    
+    References are inlined, documentation keywords dropped and every object
+    made strict. Properties of the dataclass called name are replaced by
+    overrides[name], or left out where the override is None.
+    """
+    if isinstance(node, list):
+        return [_strict_schema(item, definitions, overrides) for item in node]
+    if not isinstance(node, dict):
+        return node
+    if "$ref" in node:
+        name = node["$ref"].rsplit("/", 1)[-1]
+        return _strict_schema(definitions[name], definitions, overrides, name)
+    
+    if "properties" in node:
+        fixed = overrides.get(name, {})
+        properties = {}
+        for prop, schema in node["properties"].items():
+            if prop not in fixed:
+                properties[prop] = _strict_schema(schema, definitions, overrides)
+            elif fixed[prop] is not None:
+                properties[prop] = fixed[prop]
+        return _strict_object(properties)
+    return {key: _strict_schema(value, definitions, overrides)
+            for key, value in node.items() if key not in _SCHEMA_ANNOTATIONS}
+
+
+@lru_cache(maxsize=RESPONSE_FORMAT_CACHE_MAX_ENTRIES)
+def _planning_response_format(columns: Tuple[str, ...]) -> Dict[str, Any]:
+    """
+    Strict structured-output response format for a profile's columns.
+    
+    Column references are constrained to an enum of the profile's column
+    names, so the model cannot return columns that do not exist. Callers pass
+    the names sorted, so every upload with the same columns shares one schema
+    object here and one compiled grammar on OpenAI's side, whose first compile
+    of a new schema is slow.
+    """
+    column = {"type": "string", "enum": list(columns)}
+    sort = _nullable(_strict_object({
+        "by": column,
+        "order": {"type": "string", "enum": [order.value for order in SortOrder]}
+    }))
+    
+    # Column references become enums; free-form dicts, which strict mode cannot
+    # describe, become fixed objects or (filters) are left out
+    overrides = {
+        "KPI": {"column": _nullable(column), "filter": None},
+        "ChartSeries": {
+            "metric": {"type": "string", "enum": [value for value in _METRIC_TYPES if value != "formula"]},
+            "column": column,
+            "filter": None
+        },
+        "ChartSpec": {
+            "x": _strict_object({"column": column, "granularity": _nullable({"type": "string"})}),
+            "sort": sort
+        },
+        "TableSpec": {"columns": {"type": "array", "items": column}, "sort": sort}
+    }
+    base = _plan_json_schema()
+    schema = _strict_schema(base, base.get("$defs", {}), overrides, "ReportSpec")
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": "report_spec", "strict": True, "schema": schema}
+    }
+
+
+class _IncrementalSectionParser:
+    """
+    Pick complete KPI, chart and table objects out of a partially received plan.
+    
+    Tracks JSON nesting across chunks so each item in the top-level "kpis",
+    "charts" and "tables" arrays can be decoded as soon as its closing brace
+    arrives, without waiting for the rest of the document.
+    """
+    
+    SECTIONS = ("kpis", "charts", "tables")
+    
+    def __init__(self):
+        self._buffer: List[str] = []
+        self._length = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_key: Optional[str] = None
+        self._section: Optional[str] = None
+        self._item_start: Optional[int] = None
+    
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """Consume the next chunk of text and return any items it completed."""
+        completed = []
+        self._buffer.append(chunk)
+        offset = self._length
+        self._length += len(chunk)
+        
+        for pos, char in enumerate(chunk, start=offset):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_key = self._text()[self._string_start + 1:pos]
+                continue
+            
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char in "{[":
+                if char == "[" and self._depth == 1 and self._last_key in self.SECTIONS:
+                    self._section = self._last_key
+                elif char == "{" and self._depth == 2 and self._section:
+                    self._item_start = pos
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 2 and self._item_start is not None and char == "}":
+                    item_text = self._text()[self._item_start:pos + 1]
+                    self._item_start = None
+                    try:
+                        completed.append((self._section, _json_loads(item_text)))
+                    except ValueError:
+                        logger.warning("Skipping undecodable streamed %s item", self._section)
+                elif self._depth == 1:
+                    self._section = None
+        
+        return completed
+    
+    def _text(self) -> str:
+        """Return everything received so far."""
+        if len(self._buffer) > 1:
+            self._buffer = ["".join(self._buffer)]
+        return self._buffer[0] if self._buffer else ""
+
 
 class AIReportPlanner:
     """AI-powered report planning system."""
     
-    def __init__(self, api_key: Optional[str] = None):
-        """Initialize the AI planner with OpenAI API key."""
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        model: Optional[str] = None,
+        escalation_model: Optional[str] = None,
+        embedding_model: Optional[str] = None,
+        builtin_templates: bool = True,
+        template_cache: Optional[bool] = None
+    ):
+        """
+        Initialize the AI planner with OpenAI API key.
+        
+        Args:
+            api_key: OpenAI API key; defaults to OPENAI_API_KEY
+            model: Planning model; defaults to OPENAI_MODEL, then gpt-4o-mini
+            escalation_model: Model that retries unparseable or badly invalid plans;
+                defaults to OPENAI_ESCALATION_MODEL, then gpt-4o. Set it to the
+                planning model or an empty string to disable escalation.
+            embedding_model: Model that embeds descriptions for the semantic cache;
+                defaults to OPENAI_EMBEDDING_MODEL. The cache is disabled when
+                neither is set or the model is an empty string.
+            builtin_templates: Plan descriptions that name a built-in government
+                template from that template instead of calling OpenAI
+            template_cache: Reuse the plan of an earlier request whose description
+                differs only in numbers, dates and capitalized names, re-bound to
+                the new profile's columns; defaults to PLAN_TEMPLATE_CACHE. Off
+                unless enabled, since those masked words are often exactly what
+                tells two requests apart ("Top 10" vs "Top 3", "Revenue" vs
+                "Headcount"), and the reused plan keeps the earlier titles.
+        """
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key is required. Set OPENAI_API_KEY environment variable.")
         
-        openai.api_key = self.api_key
-        self.client = openai.OpenAI(api_key=self.api_key)
+        self.model = model or os.getenv("OPENAI_MODEL") or DEFAULT_PLANNING_MODEL
+        if escalation_model is None:
+            escalation_model = os.getenv("OPENAI_ESCALATION_MODEL", DEFAULT_ESCALATION_MODEL)
+        self.escalation_model = escalation_model if escalation_model != self.model else ""
+        if embedding_model is None:
+            embedding_model = os.getenv("OPENAI_EMBEDDING_MODEL", DEFAULT_EMBEDDING_MODEL)
+        self.embedding_model = embedding_model
+        self.builtin_templates = builtin_templates
+        if template_cache is None:
+            template_cache = os.getenv("PLAN_TEMPLATE_CACHE", "").lower() in ("1", "true")
+        self.template_cache = template_cache
+        
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._pinned_async_client = None
+        self.pool = _openai_pool
+    
+    @property
+    def client(self) -> "openai.OpenAI":
+        """The sync OpenAI client, created (and the SDK imported) on first use."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    import openai
+                    openai.api_key = self.api_key
+                    self._client = openai.OpenAI(
+                        api_key=self.api_key, http_client=_get_shared_http_client(),
+                        timeout=OPENAI_TIMEOUT_SECONDS
+                    )
+        return self._client
+    
+    @client.setter
+    def client(self, client: "openai.OpenAI") -> None:
+        self._client = client
+    
+    @property
+    def async_client(self) -> "openai.AsyncOpenAI":
+        """
+        The AsyncOpenAI client for the running event loop.
+        
+        httpx async connection pools can't be shared between event loops, so
+        each loop gets its own client. Completion and embedding calls, and the
+        API's streamed plans, run on the shared OpenAI loop, so one client (and
+        one pool of warm connections) serves them all. Must be accessed from
+        inside a coroutine.
+        """
+        if self._pinned_async_client is not None:
+            return self._pinned_async_client
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            import openai
+            client = openai.AsyncOpenAI(api_key=self.api_key, timeout=OPENAI_TIMEOUT_SECONDS)
+            self._async_clients[loop] = client
+        return client
+    
+    @async_client.setter
+    def async_client(self, client: "openai.AsyncOpenAI") -> None:
+        """Use one specific async client on every event loop."""
+        self._pinned_async_client = client
     
     def plan_report(
         self, 
@@ -63,29 +787,538 @@ class AIReportPlanner:
         Returns:
             ReportSpec object with structured report plan
         """
+        # Reuse a cached plan for identical or structurally similar requests
+        cache_key = _plan_cache_key(user_description, data_profile, template_hint)
+        try:
+            cached_spec = self._plan_from_cache(cache_key, user_description, data_profile, template_hint)
+            if cached_spec is not None:
+                return cached_spec
+        except Exception as e:
+            logger.error("Error reading plan cache: %s", e)
+        
+        # Build the template-based fallback in parallel so a failed call doesn't wait for it
+        fallback = _fallback_executor.submit(
+            self._generate_fallback_report, data_profile, user_description, template_hint
+        )
+        try:
+            # Reuse the plan of a near-duplicate description on the same columns
+            embedding = self._embed_description(user_description)
+            cached_spec = self._plan_from_semantic_cache(embedding, data_profile, template_hint)
+            if cached_spec is not None:
+                fallback.cancel()
+                return cached_spec
+            
+            # Create the AI prompt
+            prompt = self._create_planning_prompt(user_description, data_profile, template_hint)
+            
+            # Call OpenAI API
+            response = self._call_openai_api(prompt, data_profile)
+            
+            # Parse and validate the response; retry on the larger model if it is unusable
+            report_spec = self._build_report_spec_or_escalate(response, data_profile)
+            if report_spec is None:
+                response = self._call_openai_api(prompt, data_profile, model=self.escalation_model)
+                report_spec = self._parse_ai_response(response, data_profile)
+            self._remember_plan(cache_key, user_description, data_profile, template_hint, response, embedding)
+            fallback.cancel()
+            return report_spec
+            
+        except Exception as e:
+            logger.error("Error in AI planning: %s", e)
+            # Fallback to template-based generation
+            return fallback.result()
+    
+    async def plan_report_async(
+        self,
+        user_description: str,
+        data_profile: DataProfile,
+        template_hint: Optional[str] = None
+    ) -> ReportSpec:
+        """
+        Async variant of plan_report that awaits the OpenAI call.
+        
+        Args:
+            user_description: Natural language description of desired report
+            data_profile: Profile of the available data
+            template_hint: Optional hint about report template type
+            
+        Returns:
+            ReportSpec object with structured report plan
+        """
+        cache_key = _plan_cache_key(user_description, data_profile, template_hint)
+        try:
+            cached_spec = self._plan_from_cache(cache_key, user_description, data_profile, template_hint)
+            if cached_spec is not None:
+                return cached_spec
+        except Exception as e:
+            logger.error("Error reading plan cache: %s", e)
+        
+        fallback = asyncio.get_running_loop().run_in_executor(
+            _fallback_executor, self._generate_fallback_report,
+            data_profile, user_description, template_hint
+        )
+        try:
+            embedding = await self._embed_description_async(user_description)
+            cached_spec = self._plan_from_semantic_cache(embedding, data_profile, template_hint)
+            if cached_spec is not None:
+                fallback.cancel()
+                return cached_spec
+            
+            prompt = self._create_planning_prompt(user_description, data_profile, template_hint)
+            response = await self._call_openai_api_async(prompt, data_profile)
+            report_spec = self._build_report_spec_or_escalate(response, data_profile)
+            if report_spec is None:
+                response = await self._call_openai_api_async(prompt, data_profile, model=self.escalation_model)
+                report_spec = self._parse_ai_response(response, data_profile)
+            self._remember_plan(cache_key, user_description, data_profile, template_hint, response, embedding)
+            fallback.cancel()
+            return report_spec
+        
+        except Exception as e:
+            logger.error("Error in AI planning: %s", e)
+            return await fallback
+    
+    async def stream_plan_report(
+        self,
+        user_description: str,
+        data_profile: DataProfile,
+        template_hint: Optional[str] = None
+    ) -> AsyncIterator[Tuple[str, Any]]:
+        """
+        Stream a report plan, yielding each component as soon as it is decoded.
+        
+        The OpenAI response is requested with stream=True and fed through an
+        incremental parser, so KPIs, charts and tables can be handed to the
+        renderer while the rest of the plan is still arriving.
+        
+        Args:
+            user_description: Natural language description of desired report
+            data_profile: Profile of the available data
+            template_hint: Optional hint about report template type
+            
+        Yields:
+            ("kpi", KPI), ("chart", ChartSpec) and ("table", TableSpec) tuples as
+            they complete, then a final ("report", ReportSpec) with the validated plan
+        """
+        cache_key = _plan_cache_key(user_description, data_profile, template_hint)
+        try:
+            cached_spec = self._plan_from_cache(cache_key, user_description, data_profile, template_hint)
+        except Exception as e:
+            logger.error("Error reading plan cache: %s", e)
+            cached_spec = None
+        if cached_spec is not None:
+            for kpi in cached_spec.kpis:
+                yield "kpi", kpi
+            for chart in cached_spec.charts:
+                yield "chart", chart
+            for table in cached_spec.tables:
+                yield "table", table
+            yield "report", cached_spec
+            return
+        
+        builders = {
+            "kpis": ("kpi", self._parse_kpi),
+            "charts": ("chart", self._parse_chart),
+            "tables": ("table", self._parse_table),
+        }
+        counts = {section: 0 for section in builders}
+        
+        try:
+            prompt = self._create_planning_prompt(user_description, data_profile, template_hint)
+            request = self._build_chat_request(prompt, data_profile)
+            stream = await self.pool.submit(self.async_client, dict(request, stream=True))
+            
+            parser = _IncrementalSectionParser()
+            chunks = []
+            async for event in stream:
+                if not event.choices:
+                    continue
+                delta = event.choices[0].delta.content
+                if not delta:
+                    continue
+                chunks.append(delta)
+                for section, item_data in parser.feed(delta):
+                    kind, build = builders[section]
+                    item = build(item_data, counts[section])
+                    counts[section] += 1
+                    if item is not None:
+                        yield kind, item
+            
+            response = "".join(chunks)
+            report_spec = self._parse_ai_response(response, data_profile)
+            self._remember_plan(cache_key, user_description, data_profile, template_hint, response)
+            
+        except Exception as e:
+            logger.error("Error in streamed AI planning: %s", e)
+            report_spec = self._generate_fallback_report(data_profile, user_description, template_hint)
+        
+        yield "report", report_spec
+    
+    async def plan_reports_many(
+        self,
+        requests: List[Tuple[str, DataProfile, Optional[str]]],
+        concurrency: int = DEFAULT_PLANNING_CONCURRENCY
+    ) -> List[ReportSpec]:
+        """
+        Plan many reports concurrently, with at most `concurrency` calls in flight.
+        
+        Args:
+            requests: List of (user_description, data_profile, template_hint) tuples
+            concurrency: Maximum number of simultaneous OpenAI requests
+            
+        Returns:
+            List of ReportSpec objects in the same order as the requests
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        async def _plan(user_description, data_profile, template_hint):
+            async with semaphore:
+                return await self.plan_report_async(user_description, data_profile, template_hint)
+        
+        return list(await asyncio.gather(*(_plan(*request) for request in requests)))
+    
+    def plan_reports_batch(
+        self,
+        requests: List[Tuple[str, DataProfile, Optional[str]]],
+        poll_interval: float = BATCH_POLL_INTERVAL_SECONDS,
+        timeout: float = BATCH_TIMEOUT_SECONDS
+    ) -> List[ReportSpec]:
+        """
+        Plan many reports in a single OpenAI Batch API job.
+        
+        Batch jobs are billed at a discount and are not subject to the
+        per-minute rate limits, but they complete asynchronously (up to the
+        24h completion window), so this is meant for offline bulk planning.
+        Interactive callers should keep using plan_report.
+        
+        Args:
+            requests: List of (user_description, data_profile, template_hint) tuples
+            poll_interval: Seconds to wait between batch status checks
+            timeout: Maximum seconds to wait for the batch to finish
+            
+        Returns:
+            List of ReportSpec objects in the same order as the requests.
+            Requests that fail in the batch fall back to template-based plans.
+        """
+        if not requests:
+            return []
+        
+        batch = None
+        try:
+            batch_id = self.submit_reports_batch(requests)
+            batch = self._wait_for_batch(batch_id, poll_interval, timeout)
+        except Exception as e:
+            logger.error("OpenAI batch planning failed: %s", e)
+        
+        return self._reports_from_batch(batch, requests)
+    
+    def submit_reports_batch(self, requests: List[Tuple[str, DataProfile, Optional[str]]]) -> str:
+        """
+        Upload planning requests as an OpenAI Batch API job without waiting for it.
+        
+        Args:
+            requests: List of (user_description, data_profile, template_hint) tuples
+            
+        Returns:
+            The batch id, to be passed to collect_reports_batch with the same requests
+        """
+        # One JSONL line per request, keyed by its position in the input
+        lines = []
+        for i, (user_description, data_profile, template_hint) in enumerate(requests):
+            prompt = self._create_planning_prompt(user_description, data_profile, template_hint)
+            lines.append(_json_dumps({
+                "custom_id": str(i),
+                "method": "POST",
+                "url": BATCH_ENDPOINT,
+                "body": self._build_chat_request(prompt, data_profile)
+            }))
+        
+        batch_file = self.client.files.create(
+            file=("report_plans.jsonl", "\n".join(lines).encode("utf-8")),
+            purpose="batch"
+        )
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window="24h"
+        )
+        logger.info("Submitted OpenAI batch %s with %s requests", batch.id, len(lines))
+        return batch.id
+    
+    def collect_reports_batch(
+        self,
+        batch_id: str,
+        requests: List[Tuple[str, DataProfile, Optional[str]]]
+    ) -> Optional[List[ReportSpec]]:
+        """
+        Check a submitted batch once and build its plans if it has finished.
+        
+        Args:
+            batch_id: Id returned by submit_reports_batch
+            requests: The same requests, in the same order, that were submitted
+            
+        Returns:
+            List of ReportSpec objects in request order, or None while the batch is still running
+        """
+        batch = self.client.batches.retrieve(batch_id)
+        if batch.status not in BATCH_TERMINAL_STATUSES:
+            return None
+        return self._reports_from_batch(batch, requests)
+    
+    def _reports_from_batch(
+        self,
+        batch: Any,
+        requests: List[Tuple[str, DataProfile, Optional[str]]]
+    ) -> List[ReportSpec]:
+        """Build one plan per request from a finished batch, falling back where a result is missing."""
+        responses = {}
+        if batch is not None:
+            try:
+                if batch.status == "completed" and batch.output_file_id:
+                    output = self.client.files.content(batch.output_file_id).text
+                    responses = self._parse_batch_output(output)
+                else:
+                    logger.error("OpenAI batch %s ended with status '%s'", batch.id, batch.status)
+            except Exception as e:
+                logger.error("Reading OpenAI batch %s failed: %s", batch.id, e)
+        
+        report_specs = []
+        for i, (user_description, data_profile, template_hint) in enumerate(requests):
+            try:
+                content = responses.get(str(i))
+                if content is None:
+                    raise ValueError("No response returned for this request")
+                report_specs.append(self._parse_ai_response(content, data_profile))
+            except Exception as e:
+                logger.error("Error in batch planning for request %s: %s", i, e)
+                report_specs.append(
+                    self._generate_fallback_report(data_profile, user_description, template_hint)
+                )
+        
+        return report_specs
+    
+    def _wait_for_batch(self, batch_id: str, poll_interval: float, timeout: float):
+        """Poll an OpenAI batch until it reaches a terminal status or times out."""
+        deadline = time.monotonic() + timeout
+        batch = self.client.batches.retrieve(batch_id)
+        while batch.status not in BATCH_TERMINAL_STATUSES:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"OpenAI batch {batch_id} did not finish within {timeout}s")
+            time.sleep(poll_interval)
+            batch = self.client.batches.retrieve(batch_id)
+        return batch
+    
+    def _parse_batch_output(self, output: str) -> Dict[str, str]:
+        """Map each batch output line's custom_id to its completion content."""
+        responses = {}
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            result = _json_loads(line)
+            response = result.get("response") or {}
+            if result.get("error") or response.get("status_code") != 200:
+                logger.warning("Batch request %s failed: %s", result.get('custom_id'),
+                               result.get('error') or response.get('status_code'))
+                continue
+            choices = response.get("body", {}).get("choices", [])
+            if choices:
+                responses[result["custom_id"]] = choices[0]["message"]["content"]
+        return responses
+    
+    def _plan_from_cache(
+        self,
+        cache_key: str,
+        user_description: str,
+        data_profile: DataProfile,
+        template_hint: Optional[str] = None
+    ) -> Optional[ReportSpec]:
+        """Serve a plan from the exact cache, a structurally similar cached plan or a built-in template."""
+        cached = _plan_cache.get(cache_key)
+        if cached is not None:
+            logger.info("Plan cache hit, skipping OpenAI call")
+            return self._parse_ai_response(cached, data_profile)
+        
+        template = None
+        if self.template_cache:
+            with _template_cache_lock:
+                template = _template_cache.get(_description_skeleton(user_description, template_hint))
+        if template is not None:
+            response, confidence = self._instantiate_template(template, data_profile)
+            if confidence >= TEMPLATE_CACHE_MIN_CONFIDENCE:
+                logger.info("Template cache hit (confidence %.2f), skipping OpenAI call", confidence)
+                return self._parse_ai_response(response, data_profile)
+            logger.info("Template cache match too weak (confidence %.2f)", confidence)
+        
+        return self._plan_from_builtin_template(user_description, data_profile, template_hint)
+    
+    def _plan_from_builtin_template(
+        self,
+        user_description: str,
+        data_profile: DataProfile,
+        template_hint: Optional[str] = None
+    ) -> Optional[ReportSpec]:
+        """Bind the built-in template the description names to the profile's columns."""
+        if not self.builtin_templates:
+            return None
+        name = _match_builtin_template(user_description, template_hint)
+        if name is None:
+            return None
+        
+        response, confidence = self._instantiate_template(_builtin_templates()[name], data_profile)
+        if confidence < BUILTIN_TEMPLATE_MIN_CONFIDENCE:
+            logger.info("Built-in template %s does not fit the data (confidence %.2f)", name, confidence)
+            return None
+        
+        logger.info("Built-in template %s matched (confidence %.2f), skipping OpenAI call", name, confidence)
+        return self._parse_ai_response(response, data_profile)
+    
+    def _remember_plan(
+        self,
+        cache_key: str,
+        user_description: str,
+        data_profile: DataProfile,
+        template_hint: Optional[str],
+        response: str,
+        embedding: Optional[List[float]] = None
+    ) -> None:
+        """Store a successful AI response in the exact, semantic and template caches."""
+        _plan_cache.set(cache_key, response)
+        if embedding is not None:
+            _get_semantic_cache().set(embedding, _semantic_cache_signature(data_profile, template_hint), response)
+        if not self.template_cache:
+            return
+        
+        try:
+            data = _json_loads(response[response.find('{'):response.rfind('}') + 1])
+        except ValueError:
+            return
+        
+        # Record the type of each referenced column so it can be re-bound to other profiles
+        roles = {}
+        
+        def _record(column):
+            col = data_profile.get_column_by_name(column)
+            roles[column] = col.type if col is not None else None
+            return column
+        
+        _map_response_columns(data, _record, copy_data=False)
+        
+        with _template_cache_lock:
+            skeleton = _description_skeleton(user_description, template_hint)
+            _template_cache[skeleton] = {"response": data, "roles": roles}
+            _template_cache.move_to_end(skeleton)
+            while len(_template_cache) > TEMPLATE_CACHE_MAX_ENTRIES:
+                _template_cache.popitem(last=False)
+    
+    def _embed_description(self, user_description: str) -> Optional[List[float]]:
+        """Embed a description for the semantic cache; None if disabled or the call fails."""
+        if not self.embedding_model:
+            return None
+        try:
+            response = self.client.embeddings.create(
+                model=self.embedding_model, input=_embedding_input(user_description)
+            )
+            return list(response.data[0].embedding)
+        except Exception as e:
+            logger.warning("Description embedding failed, skipping semantic cache: %s", e)
+            return None
+    
+    async def _embed_description_async(self, user_description: str) -> Optional[List[float]]:
+        """Async variant of _embed_description."""
+        if not self.embedding_model:
+            return None
+        async def _embed():
+            return await self.async_client.embeddings.create(
+                model=self.embedding_model, input=_embedding_input(user_description)
+            )
+        
+        try:
+            response = await _on_openai_loop(_embed())
+            return list(response.data[0].embedding)
+        except Exception as e:
+            logger.warning("Description embedding failed, skipping semantic cache: %s", e)
+            return None
+    
+    def _plan_from_semantic_cache(
+        self,
+        embedding: Optional[List[float]],
+        data_profile: DataProfile,
+        template_hint: Optional[str] = None
+    ) -> Optional[ReportSpec]:
+        """Serve the cached plan of a near-duplicate description on the same column layout."""
+        if embedding is None:
+            return None
+        try:
+            match = _get_semantic_cache().get(embedding, _semantic_cache_signature(data_profile, template_hint))
+            if match is None:
+                return None
+            response, similarity = match
+            logger.info("Semantic cache hit (similarity %.3f), skipping OpenAI call", similarity)
+            return self._parse_ai_response(response, data_profile)
+        except Exception as e:
+            logger.error("Error reading semantic cache: %s", e)
+            return None
+    
+    def _instantiate_template(
+        self,
+        template: Dict[str, Any],
+        data_profile: DataProfile
+    ) -> Tuple[str, float]:
+        """
+        Re-bind a cached plan's columns to a new data profile.
+        
+        Each original column is matched by name first, then by an unused column
+        of the same type. Returns the rebound response JSON and a confidence
+        score: the average match quality over all referenced columns.
+        """
+        column_index = _build_column_index(data_profile.column_names)
+        column_types = {col.name: col.type for col in data_profile.columns}
+        bindings = {}
+        scores = []
+        
+        for column, role in template["roles"].items():
+            match = self._find_similar_column(column, column_index)
+            if match and (role is None or column_types[match] == role):
+                score = 1.0
+            else:
+                used = set(bindings.values())
+                same_type = [name for name, col_type in column_types.items()
+                             if col_type == role and name not in used]
+                if same_type:
+                    match, score = same_type[0], 0.75
+                elif match:
+                    score = 0.5
+                else:
+                    match, score = column, 0.0
+            bindings[column] = match
+            scores.append(score)
+        
+        confidence = sum(scores) / len(scores) if scores else 0.0
+        data = _map_response_columns(template["response"], lambda column: bindings.get(column, column))
+        return _json_dumps(data), confidence
+    
+    def _build_report_spec_or_escalate(self, response: str, data_profile: DataProfile) -> Optional[ReportSpec]:
+        """
+        Build the ReportSpec, or return None if the plan should be redone on the escalation model.
+        
+        Without an escalation model, parse errors propagate as from _parse_ai_response.
+        """
+        if not self.escalation_model:
+            return self._parse_ai_response(response, data_profile)
+        
         try:
-            # Create the AI prompt
-            prompt = self._create_planning_prompt(user_description, data_profile, template_hint)
-            
-            # Call OpenAI API
-            response = self._call_openai_api(prompt)
-            
-            # Parse and validate the response
             report_spec = self._parse_ai_response(response, data_profile)
-            
-            # Validate the generated specification
-            validation_errors = report_spec.validate_against_profile(data_profile)
-            if validation_errors:
-                logger.warning(f"AI generated spec has validation errors: {validation_errors}")
-                # Try to fix common issues
-                report_spec = self._fix_validation_errors(report_spec, data_profile, validation_errors)
-            
-            return report_spec
-            
         except Exception as e:
-            logger.error(f"Error in AI planning: {e}")
-            # Fallback to template-based generation
-            return self._generate_fallback_report(data_profile, user_description, template_hint)
+            logger.warning("Plan from %s could not be parsed (%s), escalating to %s",
+                           self.model, e, self.escalation_model)
+            return None
+        
+        errors = report_spec.validate_against_profile(data_profile)
+        if len(errors) > MODEL_ESCALATION_MAX_ERRORS:
+            logger.warning("Plan from %s has %s validation errors, escalating to %s",
+                           self.model, len(errors), self.escalation_model)
+            return None
+        return report_spec
     
     def _create_planning_prompt(
         self, 
@@ -93,110 +1326,102 @@ class AIReportPlanner:
         data_profile: DataProfile,
         template_hint: Optional[str] = None
     ) -> str:
-        """Create the AI prompt for report planning with enhanced GPT-5 capabilities."""
+        """Create the request-specific part of the planning prompt.
         
-        # Convert data profile to JSON for context
-        profile_json = json.dumps(data_profile.to_dict(), indent=2)
+        The schema and rules live in PLANNING_SYSTEM_PROMPT so they form an
+        identical prefix on every call and hit OpenAI's prompt cache.
+        """
         
-        prompt = f"""
-You are an expert government report planner. Generate a JSON response for this report specification.
-
-AVAILABLE DATA:
-{profile_json}
-
-USER REQUEST:
-{user_description}
-
-TEMPLATE HINT:
-{template_hint or 'No specific template requested'}
-
-Generate a JSON response that matches this schema:
-
-{{
-  "title": "Report title",
-  "description": "Brief description of the report",
-  "kpis": [
-    {{
-      "label": "KPI label",
-      "metric": "sum|avg|min|max|count|formula",
-      "column": "column_name",
-      "filter": {{"optional": "filtering"}},
-      "format": "currency|percent|number|date|string",
-      "description": "What this KPI measures"
-    }}
-  ],
-  "charts": [
-    {{
-      "type": "bar|line|pie",
-      "title": "Chart title",
-      "x": {{"column": "x_axis_column", "granularity": "optional_time_granularity"}},
-      "series": [
-        {{
-          "label": "Series label",
-          "metric": "sum|avg|min|max|count",
-          "column": "data_column",
-          "filter": {{"optional": "filtering"}},
-          "color": "optional_color"
-        }}
-      ],
-      "sort": {{"by": "column_name", "order": "asc|desc"}},
-      "limit": 10,
-      "description": "What this chart shows"
-    }}
-  ],
-  "tables": [
-    {{
-      "title": "Table title",
-      "columns": ["col1", "col2", "col3"],
-      "sort": {{"by": "column_name", "order": "asc|desc"}},
-      "limit": 20,
-      "zebra_rows": true,
-      "description": "What this table shows"
-    }}
-  ],
-  "narrative_goals": [
-    "Goal 1: What insights should this report provide",
-    "Goal 2: What actions should it enable"
-  ],
-  "template": "suggested_template_name"
-}}
-
-IMPORTANT: Only use columns that exist in the available data. Respond with ONLY the JSON, no other text.
-"""
-        return prompt
+        # Compact column digest: no indentation and no sample values keeps the prompt small.
+        # Serialized once per profile, so repeat requests on the same upload reuse it.
+        profile_json = data_profile.planner_digest_json
+        
+        return "".join((
+            _PROMPT_HEAD, str(int(data_profile.total_rows)), _PROMPT_ROWS,
+            profile_json, _PROMPT_REQUEST,
+            user_description, _PROMPT_HINT,
+            template_hint or _PROMPT_DEFAULT_HINT, _PROMPT_TAIL
+        ))
+    
+    def _build_chat_request(
+        self,
+        prompt: str,
+        data_profile: Optional[DataProfile] = None,
+        model: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Build the chat completion request body shared by the direct and batch paths.
+        
+        With a data profile, the response is constrained by a strict JSON schema
+        whose column fields only accept the profile's column names. The model
+        defaults to the planner's model.
+        """
+        request = {
+            "model": model or self.model,
+            "messages": [
+                {
+                    "role": "system",
+                    "content": PLANNING_SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": 3000,  # Increased for more comprehensive reports
+            "temperature": 0  # Deterministic output so cached responses stand in for fresh calls
+        }
+        if data_profile is not None and data_profile.columns:
+            request["response_format"] = _planning_response_format(tuple(sorted(data_profile.column_names)))
+        return request
     
-    def _call_openai_api(self, prompt: str) -> str:
-        """Call OpenAI API to generate the report plan using GPT-4o's advanced capabilities."""
+    def _call_openai_api(
+        self,
+        prompt: str,
+        data_profile: Optional[DataProfile] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """Call OpenAI API to generate the report plan."""
         try:
             response = self.client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert government report planner. Always respond with valid JSON matching the exact schema provided. Leverage GPT-4o's advanced reasoning capabilities to create exceptional, government-ready report specifications. IMPORTANT: Return ONLY the JSON response, no additional text or explanations."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                max_tokens=3000,  # Increased for more comprehensive reports
-                temperature=0.3  # Lower temperature for more consistent formatting
+                **self._build_chat_request(prompt, data_profile, model)
             )
             
             content = response.choices[0].message.content
-            logger.info(f"OpenAI API response received: {content[:200]}...")
+            logger.debug("OpenAI API response received: %s...", content[:200])
             return content
             
         except Exception as e:
-            logger.error(f"OpenAI API call failed: {e}")
+            logger.error("OpenAI API call failed: %s", e)
+            raise
+    
+    async def _call_openai_api_async(
+        self,
+        prompt: str,
+        data_profile: Optional[DataProfile] = None,
+        model: Optional[str] = None
+    ) -> str:
+        """Call OpenAI API asynchronously through the shared rate limiter and connection pool."""
+        request = self._build_chat_request(prompt, data_profile, model)
+        
+        async def _send():
+            return await self.pool.submit(self.async_client, request)
+        
+        try:
+            response = await _on_openai_loop(_send())
+        except Exception as e:
+            logger.error("OpenAI API call failed: %s", e)
             raise
+        
+        content = response.choices[0].message.content
+        logger.debug("OpenAI API response received: %s...", content[:200])
+        return content
     
     def _parse_ai_response(self, response: str, data_profile: DataProfile) -> ReportSpec:
         """Parse the AI response and convert it to a ReportSpec object."""
         try:
-            logger.info(f"Parsing AI response of type: {type(response)}")
-            logger.info(f"Raw response content: {response}")
+            logger.debug("Parsing AI response of type: %s", type(response))
+            logger.debug("Raw response content: %s", response)
             
             # Handle different response formats
             if isinstance(response, str):
@@ -206,218 +1431,70 @@ IMPORTANT: Only use columns that exist in the available data. Respond with ONLY
                 
                 if json_start != -1 and json_end > json_start:
                     json_content = response[json_start:json_end]
-                    logger.info(f"Extracted JSON content from response: {json_content[:200]}...")
+                    logger.debug("Extracted JSON content from response: %s...", json_content[:200])
                     
                     try:
-                        data = json.loads(json_content)
-                        logger.info(f"Successfully parsed extracted JSON with keys: {list(data.keys())}")
-                        logger.info(f"Full parsed response: {json.dumps(data, indent=2)}")
+                        data = _json_loads(json_content)
+                        logger.debug("Successfully parsed extracted JSON with keys: %s", list(data.keys()))
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Full parsed response: %s", _json_dumps(data, indent=True))
                     except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse extracted JSON: {e}")
-                        logger.error(f"Extracted content: {json_content}")
+                        logger.error("Failed to parse extracted JSON: %s", e)
+                        logger.error("Extracted content: %s", json_content)
                         raise ValueError(f"Invalid extracted JSON: {e}")
                 else:
                     # Try to parse the entire response as JSON
                     try:
-                        data = json.loads(response)
-                        logger.info(f"Successfully parsed full response as JSON with keys: {list(data.keys())}")
-                        logger.info(f"Full parsed response: {json.dumps(data, indent=2)}")
+                        data = _json_loads(response)
+                        logger.debug("Successfully parsed full response as JSON with keys: %s", list(data.keys()))
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Full parsed response: %s", _json_dumps(data, indent=True))
                     except json.JSONDecodeError as e:
-                        logger.error(f"Failed to parse response as JSON: {e}")
-                        logger.error(f"Response content: {response}")
+                        logger.error("Failed to parse response as JSON: %s", e)
+                        logger.error("Response content: %s", response)
                         raise ValueError(f"Invalid JSON response: {e}")
             else:
                 data = response
-                logger.info(f"Response was already parsed: {type(data)}")
-                logger.info(f"Full parsed response: {json.dumps(data, indent=2)}")
+                logger.debug("Response was already parsed: %s", type(data))
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Full parsed response: %s", _json_dumps(data, indent=True))
             
             # Validate the response structure
             if not isinstance(data, dict):
                 raise ValueError(f"Expected dict response, got {type(data)}")
             
+            # A well-formed response is built without any per-item checks
+            import pydantic
+            try:
+                return _plan_adapter().validate_python(data)
+            except pydantic.ValidationError as e:
+                logger.warning("AI response failed validation: %s", e.errors()[0].get('msg'))
+            
             required_keys = ["title"]
             missing_keys = [key for key in required_keys if key not in data]
             if missing_keys:
                 raise ValueError(f"Missing required keys in AI response: {missing_keys}")
             
-            logger.info(f"AI response structure validated. Processing {len(data.get('kpis', []))} KPIs, {len(data.get('charts', []))} charts, {len(data.get('tables', []))} tables")
+            logger.info("AI response structure validated. Processing %s KPIs, %s charts, %s tables",
+                        len(data.get('kpis', [])), len(data.get('charts', [])), len(data.get('tables', [])))
             
             # Extract KPIs
-            kpis = []
-            logger.info(f"Processing {len(data.get('kpis', []))} KPIs from AI response")
-            for i, kpi_data in enumerate(data.get("kpis", [])):
-                try:
-                    logger.info(f"Processing KPI {i+1}: {kpi_data}")
-                    
-                    # Validate KPI data structure
-                    if not isinstance(kpi_data, dict):
-                        logger.warning(f"KPI {i+1} is not a dict, skipping: {kpi_data}")
-                        continue
-                    
-                    if "label" not in kpi_data:
-                        logger.warning(f"KPI {i+1} missing label, skipping: {kpi_data}")
-                        continue
-                    
-                    # Handle metric type conversion with better error handling
-                    metric_value = kpi_data.get("metric", "count")
-                    try:
-                        metric = MetricType(metric_value)
-                        logger.info(f"Successfully converted metric type: {metric}")
-                    except ValueError as e:
-                        logger.warning(f"Invalid metric type '{metric_value}', defaulting to 'count': {e}")
-                        metric = MetricType.COUNT
-                    
-                    # Handle format type conversion with better error handling
-                    format_value = kpi_data.get("format")
-                    format_type = None
-                    if format_value:
-                        try:
-                            format_type = FormatType(format_value)
-                            logger.info(f"Successfully converted format type: {format_type}")
-                        except ValueError as e:
-                            logger.warning(f"Invalid format type '{format_value}', skipping format: {e}")
-                    
-                    kpi = KPI(
-                        label=kpi_data["label"],
-                        metric=metric,
-                        column=kpi_data.get("column"),
-                        filter=kpi_data.get("filter"),
-                        format=format_type,
-                        description=kpi_data.get("description")
-                    )
-                    kpis.append(kpi)
-                    logger.info(f"Successfully created KPI: {kpi.label}")
-                except Exception as e:
-                    logger.error(f"Error creating KPI {i+1}: {e}")
-                    logger.error(f"KPI data: {kpi_data}")
-                    # Skip this KPI and continue
-                    continue
+            logger.debug("Processing %s KPIs from AI response", len(data.get('kpis', [])))
+            kpis = [kpi for kpi in (self._parse_kpi(kpi_data, i)
+                                    for i, kpi_data in enumerate(data.get("kpis", [])))
+                    if kpi is not None]
             
             # Extract charts
-            charts = []
-            logger.info(f"Processing {len(data.get('charts', []))} charts from AI response")
-            for i, chart_data in enumerate(data.get("charts", [])):
-                try:
-                    logger.info(f"Processing chart {i+1}: {chart_data}")
-                    
-                    # Validate chart data structure
-                    if not isinstance(chart_data, dict):
-                        logger.warning(f"Chart {i+1} is not a dict, skipping: {chart_data}")
-                        continue
-                    
-                    required_chart_keys = ["title", "x"]
-                    missing_chart_keys = [key for key in required_chart_keys if key not in chart_data]
-                    if missing_chart_keys:
-                        logger.warning(f"Chart {i+1} missing required keys {missing_chart_keys}, skipping: {chart_data}")
-                        continue
-                    
-                    # Validate x-axis data
-                    x_data = chart_data.get("x", {})
-                    if not isinstance(x_data, dict) or "column" not in x_data:
-                        logger.warning(f"Chart {i+1} has invalid x-axis data, skipping: {chart_data}")
-                        continue
-                    
-                    # Process series data
-                    series = []
-                    series_data_list = chart_data.get("series", [])
-                    if not isinstance(series_data_list, list):
-                        logger.warning(f"Chart {i+1} series is not a list, skipping: {chart_data}")
-                        continue
-                    
-                    for j, series_data in enumerate(series_data_list):
-                        try:
-                            if not isinstance(series_data, dict):
-                                logger.warning(f"Chart {i+1} series {j+1} is not a dict, skipping: {series_data}")
-                                continue
-                            
-                            required_series_keys = ["label", "metric", "column"]
-                            missing_series_keys = [key for key in required_series_keys if key not in series_data]
-                            if missing_series_keys:
-                                logger.warning(f"Chart {i+1} series {j+1} missing required keys {missing_series_keys}, skipping: {series_data}")
-                                continue
-                            
-                            series_obj = ChartSeries(
-                                label=series_data["label"],
-                                metric=series_data["metric"],
-                                column=series_data["column"],
-                                filter=series_data.get("filter"),
-                                color=series_data.get("color")
-                            )
-                            series.append(series_obj)
-                            logger.info(f"Successfully created series {j+1} for chart {i+1}")
-                        except Exception as e:
-                            logger.error(f"Error creating series {j+1} for chart {i+1}: {e}")
-                            logger.error(f"Series data: {series_data}")
-                            continue
-                    
-                    # Handle chart type conversion with better error handling
-                    chart_type_value = chart_data.get("type", "unknown")
-                    logger.info(f"Creating chart with type: '{chart_type_value}' (type: {type(chart_type_value)})")
-                    
-                    # Handle chart type conversion with better error handling
-                    try:
-                        chart_type = ChartType(chart_type_value)
-                        logger.info(f"Successfully converted chart type: {chart_type}")
-                    except ValueError as e:
-                        logger.warning(f"Invalid chart type '{chart_type_value}', defaulting to 'bar': {e}")
-                        chart_type = ChartType.BAR
-                    
-                    chart = ChartSpec(
-                        type=chart_type,
-                        title=chart_data["title"],
-                        x=chart_data["x"],
-                        series=series,
-                        sort=chart_data.get("sort"),
-                        limit=chart_data.get("limit"),
-                        description=chart_data.get("description")
-                    )
-                    charts.append(chart)
-                    logger.info(f"Successfully created chart: {chart.title}")
-                except Exception as e:
-                    logger.error(f"Error creating chart {i+1}: {e}")
-                    logger.error(f"Chart data: {chart_data}")
-                    # Skip this chart and continue
-                    continue
+            logger.debug("Processing %s charts from AI response", len(data.get('charts', [])))
+            charts = [chart for chart in (self._parse_chart(chart_data, i)
+                                          for i, chart_data in enumerate(data.get("charts", [])))
+                      if chart is not None]
             
             # Extract tables
-            tables = []
-            logger.info(f"Processing {len(data.get('tables', []))} tables from AI response")
-            for i, table_data in enumerate(data.get("tables", [])):
-                try:
-                    logger.info(f"Processing table {i+1}: {table_data}")
-                    
-                    # Validate table data structure
-                    if not isinstance(table_data, dict):
-                        logger.warning(f"Table {i+1} is not a dict, skipping: {table_data}")
-                        continue
-                    
-                    required_table_keys = ["title", "columns"]
-                    missing_table_keys = [key for key in required_table_keys if key not in table_data]
-                    if missing_table_keys:
-                        logger.warning(f"Table {i+1} missing required keys {missing_table_keys}, skipping: {table_data}")
-                        continue
-                    
-                    # Validate columns data
-                    columns_data = table_data.get("columns", [])
-                    if not isinstance(columns_data, list):
-                        logger.warning(f"Table {i+1} columns is not a list, skipping: {table_data}")
-                        continue
-                    
-                    table = TableSpec(
-                        title=table_data["title"],
-                        columns=table_data["columns"],
-                        sort=table_data.get("sort"),
-                        limit=table_data.get("limit"),
-                        zebra_rows=table_data.get("zebra_rows", False),
-                        description=table_data.get("description")
-                    )
-                    tables.append(table)
-                    logger.info(f"Successfully created table: {table.title}")
-                except Exception as e:
-                    logger.error(f"Error creating table {i+1}: {e}")
-                    logger.error(f"Table data: {table_data}")
-                    # Skip this table and continue
-                    continue
+            logger.debug("Processing %s tables from AI response", len(data.get('tables', [])))
+            tables = [table for table in (self._parse_table(table_data, i)
+                                          for i, table_data in enumerate(data.get("tables", [])))
+                      if table is not None]
             
             # Create ReportSpec
             try:
@@ -431,12 +1508,13 @@ IMPORTANT: Only use columns that exist in the available data. Respond with ONLY
                     description=data.get("description")
                 )
                 
-                logger.info(f"Successfully created ReportSpec with {len(kpis)} KPIs, {len(charts)} charts, {len(tables)} tables")
+                logger.info("Successfully created ReportSpec with %s KPIs, %s charts, %s tables",
+                            len(kpis), len(charts), len(tables))
                 return report_spec
                 
             except Exception as e:
-                logger.error(f"Error creating ReportSpec: {e}")
-                logger.error(f"Falling back to minimal ReportSpec")
+                logger.error("Error creating ReportSpec: %s", e)
+                logger.error("Falling back to minimal ReportSpec")
                 
                 # Create a minimal valid ReportSpec
                 fallback_spec = ReportSpec(
@@ -452,83 +1530,226 @@ IMPORTANT: Only use columns that exist in the available data. Respond with ONLY
                 return fallback_spec
             
         except Exception as e:
-            logger.error(f"Error parsing AI response: {e}")
-            logger.error(f"Response type: {type(response)}")
-            logger.error(f"Response content: {response}")
+            logger.error("Error parsing AI response: %s", e)
+            logger.error("Response type: %s", type(response))
+            logger.error("Response content: %s", response)
             raise ValueError(f"Failed to parse AI response: {e}")
     
-    def _fix_validation_errors(
-        self, 
-        report_spec: ReportSpec, 
-        data_profile: DataProfile, 
-        errors: List[str]
-    ) -> ReportSpec:
-        """Attempt to fix common validation errors in the AI-generated spec."""
-        logger.info("Attempting to fix validation errors...")
-        
-        # Get available column names
-        available_columns = {col.name for col in data_profile.columns}
-        
-        # Fix KPI column references
-        for kpi in report_spec.kpis:
-            if kpi.column and kpi.column not in available_columns:
-                # Try to find a similar column
-                similar_col = self._find_similar_column(kpi.column, available_columns)
-                if similar_col:
-                    kpi.column = similar_col
-                    logger.info(f"Fixed KPI column reference: {kpi.column} -> {similar_col}")
-        
-        # Fix chart column references
-        for chart in report_spec.charts:
-            if chart.x.get("column") and chart.x["column"] not in available_columns:
-                similar_col = self._find_similar_column(chart.x["column"], available_columns)
-                if similar_col:
-                    chart.x["column"] = similar_col
-            
-            for series in chart.series:
-                if series.column not in available_columns:
-                    similar_col = self._find_similar_column(series.column, available_columns)
-                    if similar_col:
-                        series.column = similar_col
-        
-        # Fix table column references
-        for table in report_spec.tables:
-            fixed_columns = []
-            for col in table.columns:
-                if col not in available_columns:
-                    similar_col = self._find_similar_column(col, available_columns)
-                    if similar_col:
-                        fixed_columns.append(similar_col)
-                    else:
-                        fixed_columns.append(col)  # Keep original if no match found
-                else:
-                    fixed_columns.append(col)
-            table.columns = fixed_columns
-        
-        return report_spec
+    def _parse_kpi(self, kpi_data: Any, i: int) -> Optional[KPI]:
+        """Build a KPI from one entry of the AI response, or None if it is unusable."""
+        try:
+            logger.debug("Processing KPI %s: %s", i+1, kpi_data)
+            
+            # Validate KPI data structure
+            if not isinstance(kpi_data, dict):
+                logger.warning("KPI %s is not a dict, skipping: %s", i+1, kpi_data)
+                return None
+            
+            if "label" not in kpi_data:
+                logger.warning("KPI %s missing label, skipping: %s", i+1, kpi_data)
+                return None
+            
+            # Handle metric type conversion with better error handling
+            metric_value = kpi_data.get("metric", "count")
+            try:
+                metric = _METRIC_TYPES[metric_value]
+                logger.debug("Successfully converted metric type: %s", metric)
+            except (KeyError, TypeError):
+                logger.warning("Invalid metric type '%s', defaulting to 'count'", metric_value)
+                metric = MetricType.COUNT
+            
+            # Handle format type conversion with better error handling
+            format_value = kpi_data.get("format")
+            format_type = None
+            if format_value:
+                try:
+                    format_type = _FORMAT_TYPES[format_value]
+                    logger.debug("Successfully converted format type: %s", format_type)
+                except (KeyError, TypeError):
+                    logger.warning("Invalid format type '%s', skipping format", format_value)
+            
+            kpi = KPI(
+                label=kpi_data["label"],
+                metric=metric,
+                column=kpi_data.get("column"),
+                filter=kpi_data.get("filter"),
+                format=format_type,
+                description=kpi_data.get("description")
+            )
+            logger.debug("Successfully created KPI: %s", kpi.label)
+            return kpi
+        except Exception as e:
+            logger.error("Error creating KPI %s: %s", i+1, e)
+            logger.error("KPI data: %s", kpi_data)
+            # Skip this KPI
+            return None
+    
+    def _parse_chart(self, chart_data: Any, i: int) -> Optional[ChartSpec]:
+        """Build a ChartSpec from one entry of the AI response, or None if it is unusable."""
+        try:
+            logger.debug("Processing chart %s: %s", i+1, chart_data)
+            
+            # Validate chart data structure
+            if not isinstance(chart_data, dict):
+                logger.warning("Chart %s is not a dict, skipping: %s", i+1, chart_data)
+                return None
+            
+            required_chart_keys = ["title", "x"]
+            missing_chart_keys = [key for key in required_chart_keys if key not in chart_data]
+            if missing_chart_keys:
+                logger.warning("Chart %s missing required keys %s, skipping: %s",
+                               i+1, missing_chart_keys, chart_data)
+                return None
+            
+            # Validate x-axis data
+            x_data = chart_data.get("x", {})
+            if not isinstance(x_data, dict) or "column" not in x_data:
+                logger.warning("Chart %s has invalid x-axis data, skipping: %s", i+1, chart_data)
+                return None
+            
+            # Process series data
+            series = []
+            series_data_list = chart_data.get("series", [])
+            if not isinstance(series_data_list, list):
+                logger.warning("Chart %s series is not a list, skipping: %s", i+1, chart_data)
+                return None
+            
+            for j, series_data in enumerate(series_data_list):
+                try:
+                    if not isinstance(series_data, dict):
+                        logger.warning("Chart %s series %s is not a dict, skipping: %s", i+1, j+1, series_data)
+                        continue
+                    
+                    required_series_keys = ["label", "metric", "column"]
+                    missing_series_keys = [key for key in required_series_keys if key not in series_data]
+                    if missing_series_keys:
+                        logger.warning("Chart %s series %s missing required keys %s, skipping: %s",
+                                       i+1, j+1, missing_series_keys, series_data)
+                        continue
+                    
+                    series_obj = ChartSeries(
+                        label=series_data["label"],
+                        metric=series_data["metric"],
+                        column=series_data["column"],
+                        filter=series_data.get("filter"),
+                        color=series_data.get("color")
+                    )
+                    series.append(series_obj)
+                    logger.debug("Successfully created series %s for chart %s", j+1, i+1)
+                except Exception as e:
+                    logger.error("Error creating series %s for chart %s: %s", j+1, i+1, e)
+                    logger.error("Series data: %s", series_data)
+                    continue
+            
+            # Handle chart type conversion with better error handling
+            chart_type_value = chart_data.get("type", "unknown")
+            logger.debug("Creating chart with type: '%s' (type: %s)", chart_type_value, type(chart_type_value))
+            
+            # Handle chart type conversion with better error handling
+            try:
+                chart_type = _CHART_TYPES[chart_type_value]
+                logger.debug("Successfully converted chart type: %s", chart_type)
+            except (KeyError, TypeError):
+                logger.warning("Invalid chart type '%s', defaulting to 'bar'", chart_type_value)
+                chart_type = ChartType.BAR
+            
+            chart = ChartSpec(
+                type=chart_type,
+                title=chart_data["title"],
+                x=chart_data["x"],
+                series=series,
+                sort=chart_data.get("sort"),
+                limit=chart_data.get("limit"),
+                description=chart_data.get("description")
+            )
+            logger.debug("Successfully created chart: %s", chart.title)
+            return chart
+        except Exception as e:
+            logger.error("Error creating chart %s: %s", i+1, e)
+            logger.error("Chart data: %s", chart_data)
+            # Skip this chart
+            return None
+    
+    def _parse_table(self, table_data: Any, i: int) -> Optional[TableSpec]:
+        """Build a TableSpec from one entry of the AI response, or None if it is unusable."""
+        try:
+            logger.debug("Processing table %s: %s", i+1, table_data)
+            
+            # Validate table data structure
+            if not isinstance(table_data, dict):
+                logger.warning("Table %s is not a dict, skipping: %s", i+1, table_data)
+                return None
+            
+            required_table_keys = ["title", "columns"]
+            missing_table_keys = [key for key in required_table_keys if key not in table_data]
+            if missing_table_keys:
+                logger.warning("Table %s missing required keys %s, skipping: %s",
+                               i+1, missing_table_keys, table_data)
+                return None
+            
+            # Validate columns data
+            columns_data = table_data.get("columns", [])
+            if not isinstance(columns_data, list):
+                logger.warning("Table %s columns is not a list, skipping: %s", i+1, table_data)
+                return None
+            
+            table = TableSpec(
+                title=table_data["title"],
+                columns=table_data["columns"],
+                sort=table_data.get("sort"),
+                limit=table_data.get("limit"),
+                zebra_rows=table_data.get("zebra_rows", False),
+                description=table_data.get("description")
+            )
+            logger.debug("Successfully created table: %s", table.title)
+            return table
+        except Exception as e:
+            logger.error("Error creating table %s: %s", i+1, e)
+            logger.error("Table data: %s", table_data)
+            # Skip this table
+            return None
     
-    def _find_similar_column(self, target: str, available: set) -> Optional[str]:
-        """Find a similar column name in the available columns."""
+    def _find_similar_column(self, target: str, column_index: Dict[str, str]) -> Optional[str]:
+        """
+        Find a similar column name in the available columns.
+        
+        Args:
+            target: Column name referenced by the report spec
+            column_index: Lower-cased column name -> actual column name,
+                as built by _build_column_index
+            
+        Returns:
+            The best matching column name, or None if nothing is close enough
+        """
         target_lower = target.lower()
         
-        # Exact match
-        if target in available:
-            return target
+        # Exact or case-insensitive match
+        match = column_index.get(target_lower)
+        if match is not None:
+            return match
         
-        # Case-insensitive match
-        for col in available:
-            if col.lower() == target_lower:
-                return col
+        if not column_index:
+            return None
+        
+        # Fuzzy match on the C-accelerated scorer when available
+        if fuzz_process is not None:
+            result = fuzz_process.extractOne(
+                target_lower, list(column_index), scorer=fuzz.WRatio,
+                score_cutoff=COLUMN_MATCH_SCORE_CUTOFF
+            )
+            return column_index[result[0]] if result else None
         
         # Partial match
-        for col in available:
-            if target_lower in col.lower() or col.lower() in target_lower:
+        for col_lower, col in column_index.items():
+            if target_lower in col_lower or col_lower in target_lower:
                 return col
         
-        # Fuzzy match (simple)
-        for col in available:
-            if any(word in col.lower() for word in target_lower.split()):
-                return col
+        # Shared word, looked up in a per-layout word index instead of rescanning every column
+        word_index = _column_word_index(tuple(column_index))
+        for word in target_lower.split():
+            col_lower = word_index.get(word)
+            if col_lower is not None:
+                return column_index[col_lower]
         
         return None
     
@@ -539,278 +1760,258 @@ IMPORTANT: Only use columns that exist in the available data. Respond with ONLY
         template_hint: Optional[str] = None
     ) -> ReportSpec:
         """Generate a fallback report specification when AI planning fails."""
-        logger.info("Generating fallback report specification...")
-        
-        # Analyze the data profile to create a more intelligent fallback
-        numeric_columns = data_profile.get_columns_by_type("number")
-        string_columns = data_profile.get_columns_by_type("string")
-        date_columns = data_profile.get_columns_by_type("date")
-        currency_columns = data_profile.get_columns_by_type("currency")
-        percent_columns = data_profile.get_columns_by_type("percent")
-        
-        # Determine report type based on data characteristics
-        report_type = self._determine_report_type_from_data(data_profile)
-        
-        # Create KPIs based on report type
-        kpis = self._create_kpis_for_report_type(report_type, data_profile)
-        
-        # Create charts based on report type
-        charts = self._create_charts_for_report_type(report_type, data_profile)
-        
-        # Create tables based on report type
-        tables = self._create_tables_for_report_type(report_type, data_profile)
-        
-        # Create narrative goals based on report type
-        narrative_goals = self._create_narrative_for_report_type(report_type, data_profile)
-        
-        return ReportSpec(
-            title=f"{report_type['title']}: {user_description[:50]}...",
-            kpis=kpis,
-            charts=charts,
-            tables=tables,
-            narrative_goals=narrative_goals,
-            description=f"Intelligent fallback report for {report_type['name']} data"
-        )
+        return generate_fallback_spec(user_description, data_profile, template_hint)
+
+
+def generate_fallback_spec(
+    user_description: str,
+    data_profile: DataProfile,
+    template_hint: Optional[str] = None
+) -> ReportSpec:
+    """Generate a rule-based report specification without calling OpenAI."""
+    logger.info("Generating fallback report specification...")
     
-    def _determine_report_type_from_data(self, data_profile: DataProfile) -> Dict[str, Any]:
-        """Determine the most appropriate report type based on data characteristics."""
-        numeric_columns = data_profile.get_columns_by_type("number")
-        string_columns = data_profile.get_columns_by_type("string")
-        date_columns = data_profile.get_columns_by_type("date")
-        currency_columns = data_profile.get_columns_by_type("currency")
-        
-        # Check for budget/performance patterns
-        budget_keywords = ['budget', 'actual', 'planned', 'allocated', 'spent', 'expended']
-        dept_keywords = ['department', 'division', 'unit', 'agency', 'bureau']
-        
-        has_budget_data = any(
-            any(keyword in col.name.lower() for keyword in budget_keywords)
-            for col in numeric_columns + currency_columns
-        )
-        
-        has_dept_data = any(
-            any(keyword in col.name.lower() for keyword in dept_keywords)
-            for col in string_columns
-        )
-        
-        if has_budget_data and has_dept_data:
-            return {
-                'name': 'budget_performance',
-                'title': 'Budget Performance Analysis',
-                'description': 'Analysis of budget vs actual spending across departments'
-            }
-        
-        # Check for financial data
-        financial_keywords = ['revenue', 'income', 'expense', 'cost', 'amount', 'total']
-        has_financial_data = any(
-            any(keyword in col.name.lower() for keyword in financial_keywords)
-            for col in numeric_columns + currency_columns
-        )
-        
-        if has_financial_data:
-            return {
-                'name': 'financial_summary',
-                'title': 'Financial Summary Report',
-                'description': 'Comprehensive financial overview and analysis'
-            }
-        
-        # Check for operational metrics
-        metric_keywords = ['score', 'rating', 'performance', 'efficiency', 'target']
-        has_metrics = any(
-            any(keyword in col.name.lower() for keyword in metric_keywords)
-            for col in numeric_columns + percent_columns
-        )
-        
-        if has_metrics:
-            return {
-                'name': 'operational_metrics',
-                'title': 'Operational Metrics Report',
-                'description': 'Performance indicators and operational analysis'
-            }
-        
-        # Check for trend analysis
-        if date_columns and numeric_columns:
-            return {
-                'name': 'trend_analysis',
-                'title': 'Trend Analysis Report',
-                'description': 'Time-series analysis and trend identification'
-            }
-        
-        # Default to data summary
+    # Determine report type based on data characteristics
+    report_type = _determine_report_type_from_data(data_profile)
+    
+    # Create KPIs based on report type
+    kpis = _create_kpis_for_report_type(report_type, data_profile)
+    
+    # Create charts based on report type
+    charts = _create_charts_for_report_type(report_type, data_profile)
+    
+    # Create tables based on report type
+    tables = _create_tables_for_report_type(report_type, data_profile)
+    
+    # Create narrative goals based on report type
+    narrative_goals = _create_narrative_for_report_type(report_type, data_profile)
+    
+    return ReportSpec(
+        title=f"{report_type['title']}: {user_description[:50]}...",
+        kpis=kpis,
+        charts=charts,
+        tables=tables,
+        narrative_goals=narrative_goals,
+        description=f"Intelligent fallback report for {report_type['name']} data"
+    )
+
+
+def _determine_report_type_from_data(data_profile: DataProfile) -> Dict[str, Any]:
+    """Determine the most appropriate report type based on data characteristics."""
+    buckets = data_profile.columns_by_type
+    numeric_columns = buckets["number"]
+    string_columns = buckets["string"]
+    date_columns = buckets["date"]
+    currency_columns = buckets["currency"]
+    percent_columns = buckets["percent"]
+    
+    # Check for budget/performance patterns
+    has_budget_data = any(_BUDGET_KEYWORDS.search(col.name) for col in numeric_columns + currency_columns)
+    has_dept_data = any(_DEPT_KEYWORDS.search(col.name) for col in string_columns)
+    
+    if has_budget_data and has_dept_data:
         return {
-            'name': 'data_summary',
-            'title': 'Data Summary Report',
-            'description': 'Comprehensive overview of the dataset'
+            'name': 'budget_performance',
+            'title': 'Budget Performance Analysis',
+            'description': 'Analysis of budget vs actual spending across departments'
         }
     
-    def _create_kpis_for_report_type(self, report_type: Dict[str, Any], data_profile: DataProfile) -> List[KPI]:
-        """Create appropriate KPIs based on report type."""
-        kpis = []
-        numeric_columns = data_profile.get_columns_by_type("number")
-        currency_columns = data_profile.get_columns_by_type("currency")
-        percent_columns = data_profile.get_columns_by_type("percent")
-        
-        if report_type['name'] == 'budget_performance':
-            # Look for budget-related columns
-            budget_cols = [col for col in numeric_columns + currency_columns 
-                          if any(keyword in col.name.lower() 
-                                for keyword in ['budget', 'planned', 'allocated'])]
-            actual_cols = [col for col in numeric_columns + currency_columns 
-                          if any(keyword in col.name.lower() 
-                                for keyword in ['actual', 'spent', 'expended'])]
-            
-            if budget_cols and actual_cols:
-                kpis.extend([
-                    KPI(label="Total Budget", metric=MetricType.SUM, column=budget_cols[0].name, format=FormatType.CURRENCY),
-                    KPI(label="Total Actual", metric=MetricType.SUM, column=actual_cols[0].name, format=FormatType.CURRENCY),
-                    KPI(label="Budget Variance", metric=MetricType.AVG, column="Variance", format=FormatType.PERCENT)
-                ])
-        
-        elif report_type['name'] == 'financial_summary':
-            # Look for financial columns
-            financial_cols = [col for col in numeric_columns + currency_columns 
-                            if any(keyword in col.name.lower() 
-                                  for keyword in ['revenue', 'income', 'amount', 'total'])]
-            
-            if financial_cols:
-                kpis.extend([
-                    KPI(label=f"Total {financial_cols[0].name.title()}", metric=MetricType.SUM, 
-                        column=financial_cols[0].name, format=FormatType.CURRENCY),
-                    KPI(label=f"Average {financial_cols[0].name.title()}", metric=MetricType.AVG, 
-                        column=financial_cols[0].name, format=FormatType.CURRENCY)
-                ])
-        
-        elif report_type['name'] == 'operational_metrics':
-            # Look for metric columns
-            metric_cols = [col for col in numeric_columns + percent_columns 
-                          if any(keyword in col.name.lower() 
-                                for keyword in ['score', 'rating', 'performance'])]
-            
-            if metric_cols:
-                kpis.extend([
-                    KPI(label=f"Average {metric_cols[0].name.title()}", metric=MetricType.AVG, 
-                        column=metric_cols[0].name, format=FormatType.NUMBER),
-                    KPI(label=f"Best {metric_cols[0].name.title()}", metric=MetricType.MAX, 
-                        column=metric_cols[0].name, format=FormatType.NUMBER)
-                ])
-        
-        # Add a general KPI if none were created
-        if not kpis and numeric_columns:
-            kpis.append(KPI(
-                label=f"Total {numeric_columns[0].name.title()}", 
-                metric=MetricType.SUM, 
-                column=numeric_columns[0].name, 
-                format=FormatType.NUMBER
-            ))
+    # Check for financial data
+    has_financial_data = any(_FINANCIAL_KEYWORDS.search(col.name) for col in numeric_columns + currency_columns)
+    
+    if has_financial_data:
+        return {
+            'name': 'financial_summary',
+            'title': 'Financial Summary Report',
+            'description': 'Comprehensive financial overview and analysis'
+        }
+    
+    # Check for operational metrics
+    has_metrics = any(_METRIC_KEYWORDS.search(col.name) for col in numeric_columns + percent_columns)
+    
+    if has_metrics:
+        return {
+            'name': 'operational_metrics',
+            'title': 'Operational Metrics Report',
+            'description': 'Performance indicators and operational analysis'
+        }
+    
+    # Check for trend analysis
+    if date_columns and numeric_columns:
+        return {
+            'name': 'trend_analysis',
+            'title': 'Trend Analysis Report',
+            'description': 'Time-series analysis and trend identification'
+        }
+    
+    # Default to data summary
+    return {
+        'name': 'data_summary',
+        'title': 'Data Summary Report',
+        'description': 'Comprehensive overview of the dataset'
+    }
+
+
+def _create_kpis_for_report_type(report_type: Dict[str, Any], data_profile: DataProfile) -> List[KPI]:
+    """Create appropriate KPIs based on report type."""
+    kpis = []
+    buckets = data_profile.columns_by_type
+    numeric_columns = buckets["number"]
+    currency_columns = buckets["currency"]
+    percent_columns = buckets["percent"]
+    
+    if report_type['name'] == 'budget_performance':
+        # Look for budget-related columns
+        budget_cols = _columns_matching(numeric_columns + currency_columns, _PLANNED_KEYWORDS)
+        actual_cols = _columns_matching(numeric_columns + currency_columns, _ACTUAL_KEYWORDS)
         
-        return kpis
-    
-    def _create_charts_for_report_type(self, report_type: Dict[str, Any], data_profile: DataProfile) -> List[ChartSpec]:
-        """Create appropriate charts based on report type."""
-        charts = []
-        numeric_columns = data_profile.get_columns_by_type("number")
-        string_columns = data_profile.get_columns_by_type("string")
-        date_columns = data_profile.get_columns_by_type("date")
-        
-        if report_type['name'] == 'budget_performance' and string_columns and numeric_columns:
-            # Budget vs Actual bar chart
-            budget_cols = [col for col in numeric_columns 
-                          if any(keyword in col.name.lower() 
-                                for keyword in ['budget', 'planned', 'allocated'])]
-            actual_cols = [col for col in numeric_columns 
-                          if any(keyword in col.name.lower() 
-                                for keyword in ['actual', 'spent', 'expended'])]
-            dept_cols = [col for col in string_columns 
-                        if any(keyword in col.name.lower() 
-                              for keyword in ['department', 'division', 'unit'])]
-            
-            if budget_cols and actual_cols and dept_cols:
-                charts.append(ChartSpec(
-                    type=ChartType.BAR,
-                    title="Budget vs Actual by Department",
-                    x={"column": dept_cols[0].name},
-                    series=[
-                        ChartSeries(label="Budget", metric="sum", column=budget_cols[0].name),
-                        ChartSeries(label="Actual", metric="sum", column=actual_cols[0].name)
-                    ],
-                    description="Comparison of budgeted vs actual spending across departments"
-                ))
-        
-        elif report_type['name'] == 'trend_analysis' and date_columns and numeric_columns:
-            # Time series chart
-            charts.append(ChartSpec(
-                type=ChartType.LINE,
-                title=f"{numeric_columns[0].name.title()} Over Time",
-                x={"column": date_columns[0].name},
-                series=[
-                    ChartSeries(label=numeric_columns[0].name.title(), metric="sum", column=numeric_columns[0].name)
-                ],
-                description=f"Trend analysis of {numeric_columns[0].name} over time"
-            ))
+        if budget_cols and actual_cols:
+            kpis.extend([
+                KPI(label="Total Budget", metric=MetricType.SUM, column=budget_cols[0].name, format=FormatType.CURRENCY),
+                KPI(label="Total Actual", metric=MetricType.SUM, column=actual_cols[0].name, format=FormatType.CURRENCY),
+                KPI(label="Budget Variance", metric=MetricType.AVERAGE, column="Variance", format=FormatType.PERCENT)
+            ])
+    
+    elif report_type['name'] == 'financial_summary':
+        # Look for financial columns
+        financial_cols = _columns_matching(numeric_columns + currency_columns, _FINANCIAL_KPI_KEYWORDS)
+        
+        if financial_cols:
+            kpis.extend([
+                KPI(label=f"Total {financial_cols[0].name.title()}", metric=MetricType.SUM, 
+                    column=financial_cols[0].name, format=FormatType.CURRENCY),
+                KPI(label=f"Average {financial_cols[0].name.title()}", metric=MetricType.AVERAGE, 
+                    column=financial_cols[0].name, format=FormatType.CURRENCY)
+            ])
+    
+    elif report_type['name'] == 'operational_metrics':
+        # Look for metric columns
+        metric_cols = _columns_matching(numeric_columns + percent_columns, _METRIC_KPI_KEYWORDS)
+        
+        if metric_cols:
+            kpis.extend([
+                KPI(label=f"Average {metric_cols[0].name.title()}", metric=MetricType.AVERAGE, 
+                    column=metric_cols[0].name, format=FormatType.NUMBER),
+                KPI(label=f"Best {metric_cols[0].name.title()}", metric=MetricType.MAXIMUM, 
+                    column=metric_cols[0].name, format=FormatType.NUMBER)
+            ])
+    
+    # Add a general KPI if none were created
+    if not kpis and numeric_columns:
+        kpis.append(KPI(
+            label=f"Total {numeric_columns[0].name.title()}", 
+            metric=MetricType.SUM, 
+            column=numeric_columns[0].name, 
+            format=FormatType.NUMBER
+        ))
+    
+    return kpis
+
+
+def _create_charts_for_report_type(report_type: Dict[str, Any], data_profile: DataProfile) -> List[ChartSpec]:
+    """Create appropriate charts based on report type."""
+    charts = []
+    buckets = data_profile.columns_by_type
+    numeric_columns = buckets["number"]
+    string_columns = buckets["string"]
+    date_columns = buckets["date"]
+    
+    if report_type['name'] == 'budget_performance' and string_columns and numeric_columns:
+        # Budget vs Actual bar chart
+        budget_cols = _columns_matching(numeric_columns, _PLANNED_KEYWORDS)
+        actual_cols = _columns_matching(numeric_columns, _ACTUAL_KEYWORDS)
+        dept_cols = _columns_matching(string_columns, _DEPT_CHART_KEYWORDS)
         
-        elif string_columns and numeric_columns:
-            # Generic distribution chart
+        if budget_cols and actual_cols and dept_cols:
             charts.append(ChartSpec(
                 type=ChartType.BAR,
-                title=f"{numeric_columns[0].name.title()} by {string_columns[0].name.title()}",
-                x={"column": string_columns[0].name},
+                title="Budget vs Actual by Department",
+                x={"column": dept_cols[0].name},
                 series=[
-                    ChartSeries(label=numeric_columns[0].name.title(), metric="sum", column=numeric_columns[0].name)
+                    ChartSeries(label="Budget", metric="sum", column=budget_cols[0].name),
+                    ChartSeries(label="Actual", metric="sum", column=actual_cols[0].name)
                 ],
-                description=f"Distribution of {numeric_columns[0].name} across {string_columns[0].name}"
-            ))
-        
-        return charts
-    
-    def _create_tables_for_report_type(self, report_type: Dict[str, Any], data_profile: DataProfile) -> List[TableSpec]:
-        """Create appropriate tables based on report type."""
-        tables = []
-        
-        if data_profile.columns:
-            # Create a summary table with key columns
-            key_columns = [col.name for col in data_profile.columns[:5]]  # First 5 columns
-            tables.append(TableSpec(
-                title=f"{report_type['title']} - Data Summary",
-                columns=key_columns,
-                limit=20,
-                zebra_rows=True,
-                description=f"Summary data for {report_type['name'].replace('_', ' ').title()}"
+                description="Comparison of budgeted vs actual spending across departments"
             ))
-        
-        return tables
-    
-    def _create_narrative_for_report_type(self, report_type: Dict[str, Any], data_profile: DataProfile) -> List[str]:
-        """Create narrative goals based on report type."""
-        if report_type['name'] == 'budget_performance':
-            return [
-                "Analyze budget performance across departments",
-                "Identify areas of over/under spending",
-                "Provide recommendations for budget optimization"
-            ]
-        elif report_type['name'] == 'financial_summary':
-            return [
-                "Summarize key financial metrics",
-                "Identify revenue and expense patterns",
-                "Highlight financial performance insights"
-            ]
-        elif report_type['name'] == 'operational_metrics':
-            return [
-                "Assess operational performance indicators",
-                "Identify areas for improvement",
-                "Track progress against targets"
-            ]
-        elif report_type['name'] == 'trend_analysis':
-            return [
-                "Identify key trends and patterns",
-                "Analyze seasonal variations",
-                "Forecast future performance"
-            ]
-        else:
-            return [
-                "Provide comprehensive data overview",
-                "Identify key patterns and insights",
-                "Support data-driven decision making"
-            ]
+    
+    elif report_type['name'] == 'trend_analysis' and date_columns and numeric_columns:
+        # Time series chart
+        charts.append(ChartSpec(
+            type=ChartType.LINE,
+            title=f"{numeric_columns[0].name.title()} Over Time",
+            x={"column": date_columns[0].name},
+            series=[
+                ChartSeries(label=numeric_columns[0].name.title(), metric="sum", column=numeric_columns[0].name)
+            ],
+            description=f"Trend analysis of {numeric_columns[0].name} over time"
+        ))
+    
+    elif string_columns and numeric_columns:
+        # Generic distribution chart
+        charts.append(ChartSpec(
+            type=ChartType.BAR,
+            title=f"{numeric_columns[0].name.title()} by {string_columns[0].name.title()}",
+            x={"column": string_columns[0].name},
+            series=[
+                ChartSeries(label=numeric_columns[0].name.title(), metric="sum", column=numeric_columns[0].name)
+            ],
+            description=f"Distribution of {numeric_columns[0].name} across {string_columns[0].name}"
+        ))
+    
+    return charts
+
+
+def _create_tables_for_report_type(report_type: Dict[str, Any], data_profile: DataProfile) -> List[TableSpec]:
+    """Create appropriate tables based on report type."""
+    tables = []
+    
+    if data_profile.columns:
+        # Create a summary table with key columns
+        key_columns = [col.name for col in data_profile.columns[:5]]  # First 5 columns
+        tables.append(TableSpec(
+            title=f"{report_type['title']} - Data Summary",
+            columns=key_columns,
+            limit=20,
+            zebra_rows=True,
+            description=f"Summary data for {report_type['name'].replace('_', ' ').title()}"
+        ))
+    
+    return tables
+
+
+def _create_narrative_for_report_type(report_type: Dict[str, Any], data_profile: DataProfile) -> List[str]:
+    """Create narrative goals based on report type."""
+    if report_type['name'] == 'budget_performance':
+        return [
+            "Analyze budget performance across departments",
+            "Identify areas of over/under spending",
+            "Provide recommendations for budget optimization"
+        ]
+    elif report_type['name'] == 'financial_summary':
+        return [
+            "Summarize key financial metrics",
+            "Identify revenue and expense patterns",
+            "Highlight financial performance insights"
+        ]
+    elif report_type['name'] == 'operational_metrics':
+        return [
+            "Assess operational performance indicators",
+            "Identify areas for improvement",
+            "Track progress against targets"
+        ]
+    elif report_type['name'] == 'trend_analysis':
+        return [
+            "Identify key trends and patterns",
+            "Analyze seasonal variations",
+            "Forecast future performance"
+        ]
+    else:
+        return [
+            "Provide comprehensive data overview",
+            "Identify key patterns and insights",
+            "Support data-driven decision making"
+        ]
+
 
 
 def create_sample_ai_plan() -> Dict[str, Any]:
@@ -5,20 +5,33 @@ Provides the /api/plan-report endpoint for AI-powered report planning.
 """
 
 import os
-import json
+import gzip
+import tempfile
 import logging
-from typing import Dict, Any, Optional
-from flask import Flask, request, jsonify
+import zlib
+from typing import Dict, Any, Optional, Tuple
+from flask import Flask, Response, request, jsonify
 from flask_cors import CORS
+from werkzeug.exceptions import BadRequest, HTTPException
 from dotenv import load_dotenv
 
+# Flask-Compress is optional; responses are sent uncompressed without it
+try:
+    from flask_compress import Compress
+except ImportError:
+    Compress = None
+
 # Try relative imports first, fall back to absolute for standalone testing
 try:
     from .data_processor import DataProcessor, DataProfile
-    from .ai_planner import AIReportPlanner, create_sample_ai_plan
+    from .ai_planner import AIReportPlanner, generate_fallback_spec, create_sample_ai_plan, plan_cache_stats, semantic_cache_stats, openai_pool_stats, iterate_on_openai_loop
+    from .json_provider import OrjsonProvider
+    from .batch_store import BatchStore
 except ImportError:
     from data_processor import DataProcessor, DataProfile
-    from ai_planner import AIReportPlanner, create_sample_ai_plan
+    from ai_planner import AIReportPlanner, generate_fallback_spec, create_sample_ai_plan, plan_cache_stats, semantic_cache_stats, openai_pool_stats, iterate_on_openai_loop
+    from json_provider import OrjsonProvider
+    from batch_store import BatchStore
 
 # Load environment variables
 load_dotenv()
@@ -29,11 +42,140 @@ logger = logging.getLogger(__name__)
 
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)  # Enable CORS for frontend integration
+if Compress is not None:
+    Compress(app)  # gzip/brotli JSON responses for clients that accept it
+
+# Largest request body accepted, after gzip decompression
+app.config['MAX_CONTENT_LENGTH'] = int(float(os.getenv('MAX_FILE_SIZE_MB', 100)) * 1024 * 1024)
+
+# Most reports accepted by one /api/plan-reports call
+MAX_REPORTS_PER_REQUEST = 50
+
+# Inputs of submitted batches are kept on disk so any worker can collect them; a
+# batch finishes within 24h, and entries left uncollected expire after two days
+BATCH_STORE_DIR = os.getenv('BATCH_STORE_DIR') or os.path.join(tempfile.gettempdir(), 'gov-report-ai-batches')
+BATCH_STORE_MAX_ENTRIES = 256
+BATCH_STORE_TTL_SECONDS = 2 * 24 * 60 * 60
+
+
+def _create_ai_planner() -> Optional[AIReportPlanner]:
+    """Create the shared AI planner at startup; None when no API key is configured."""
+    api_key = os.getenv('OPENAI_API_KEY')
+    if not api_key:
+        logger.warning("No OpenAI API key found. AI planning will not be available.")
+        return None
+    try:
+        planner = AIReportPlanner(api_key)
+        logger.info("AI planner initialized successfully")
+        return planner
+    except Exception as e:
+        logger.warning(f"Failed to initialize AI planner: {e}")
+        return None
 
-# Global instances
+
+# Global instances, created once per process at import
 data_processor = DataProcessor()
-ai_planner = None  # Will be initialized when API key is available
+ai_planner = _create_ai_planner()
+
+# Planning requests of submitted OpenAI batches, keyed by batch id, until they are collected
+pending_batches = BatchStore(BATCH_STORE_DIR, BATCH_STORE_MAX_ENTRIES, BATCH_STORE_TTL_SECONDS)
+
+
+class _GzipRequestStream:
+    """Request body stream that decompresses as it is read and rejects corrupt gzip data with a 400."""
+    
+    def __init__(self, stream):
+        self._gzip = gzip.GzipFile(fileobj=stream, mode='rb')
+    
+    def read(self, size: int = -1) -> bytes:
+        try:
+            return self._gzip.read(size)
+        except (OSError, EOFError, zlib.error) as e:
+            raise BadRequest(f'Request body is not valid gzip data: {e}')
+    
+    def readline(self, size: int = -1) -> bytes:
+        try:
+            return self._gzip.readline(size)
+        except (OSError, EOFError, zlib.error) as e:
+            raise BadRequest(f'Request body is not valid gzip data: {e}')
+
+
+@app.before_request
+def decompress_gzip_request():
+    """Transparently decompress request bodies sent with Content-Encoding: gzip."""
+    if request.headers.get('Content-Encoding', '').lower() != 'gzip':
+        return
+    environ = request.environ
+    environ['wsgi.input'] = _GzipRequestStream(environ['wsgi.input'])
+    # The decompressed length is unknown; read to the end, bounded by MAX_CONTENT_LENGTH
+    environ.pop('CONTENT_LENGTH', None)
+    environ.pop('HTTP_CONTENT_ENCODING', None)
+    environ['wsgi.input_terminated'] = True
+
+
+def _read_planning_request() -> Tuple[Optional[Tuple[str, Optional[str], DataProfile]], Optional[Any]]:
+    """
+    Read a planning request sent as JSON or as a multipart file upload.
+    
+    Multipart requests carry the data as a `file` part (CSV or XLSX, optionally
+    gzipped as .gz) with `user_description` and `template_hint` form fields;
+    the upload is parsed straight from its stream.
+    
+    Returns:
+        ((user_description, template_hint, data_profile), None) on success,
+        or (None, error_response) for an invalid request
+    """
+    upload = request.files.get('file')
+    if upload is not None:
+        user_description = request.form.get('user_description')
+        template_hint = request.form.get('template_hint')
+        if not user_description:
+            return None, (jsonify({'error': 'user_description is required'}), 400)
+        
+        filename = (upload.filename or '').lower()
+        stream = upload.stream
+        if filename.endswith('.gz'):
+            stream = gzip.GzipFile(fileobj=stream, mode='rb')
+            filename = filename[:-3]
+        data_type = request.form.get('data_type') or ('xlsx' if filename.endswith(('.xlsx', '.xls')) else 'csv')
+        
+        try:
+            data_profile = data_processor.process_data_from_file(stream, data_type)
+        except Exception as e:
+            logger.error(f"Data processing error: {e}")
+            return None, (jsonify({'error': f'Data processing failed: {str(e)}'}), 400)
+        return (user_description, template_hint, data_profile), None
+    
+    data = request.get_json(silent=True)
+    if not data:
+        return None, (jsonify({'error': 'No JSON data or file upload provided'}), 400)
+    
+    user_description = data.get('user_description')
+    csv_data = data.get('data')
+    data_type = data.get('data_type', 'csv')
+    template_hint = data.get('template_hint')
+    
+    # Validate required fields
+    if not user_description:
+        return None, (jsonify({'error': 'user_description is required'}), 400)
+    if not csv_data:
+        return None, (jsonify({'error': 'data is required'}), 400)
+    if data_type != 'csv':
+        return None, (jsonify({'error': 'Send xlsx data as a multipart file upload'}), 415)
+    
+    try:
+        data_profile = data_processor.process_data_from_string(csv_data, 'csv')
+    except Exception as e:
+        logger.error(f"Data processing error: {e}")
+        return None, (jsonify({'error': f'Data processing failed: {str(e)}'}), 400)
+    return (user_description, template_hint, data_profile), None
+
+
+def _http_error_response(error: HTTPException) -> Tuple[Any, int]:
+    """JSON error for a request Flask rejected while reading it (bad gzip or JSON, body too large)."""
+    return jsonify({'error': error.description}), error.code
 
 
 @app.route('/health', methods=['GET'])
@@ -42,66 +184,50 @@ def health_check():
     return jsonify({
         'status': 'healthy',
         'service': 'Gov-Report-AI API',
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'plan_cache': plan_cache_stats(),
+        'semantic_cache': semantic_cache_stats(),
+        'openai_pool': openai_pool_stats()
     })
 
 
 @app.route('/api/plan-report', methods=['POST'])
-def plan_report():
+async def plan_report():
     """
     AI-powered report planning endpoint.
     
+    Runs as an async view so the OpenAI round trip is awaited on
+    AsyncOpenAI instead of blocking on the sync client.
+    
     Expected JSON payload:
     {
         "user_description": "Natural language description of desired report",
-        "data": "CSV data as string or file path",
-        "data_type": "csv or xlsx",
+        "data": "CSV data as string",
+        "data_type": "csv",
         "template_hint": "Optional template suggestion"
     }
+    
+    Large files should instead be sent as multipart/form-data with a `file`
+    part (.csv, .xlsx, or either gzipped as .gz) and `user_description` /
+    `template_hint` form fields. Any request body may also be sent with
+    Content-Encoding: gzip.
     """
     try:
-        # Get request data
-        data = request.get_json()
-        if not data:
-            return jsonify({'error': 'No JSON data provided'}), 400
-        
-        user_description = data.get('user_description')
-        csv_data = data.get('data')
-        data_type = data.get('data_type', 'csv')
-        template_hint = data.get('template_hint')
-        
-        # Validate required fields
-        if not user_description:
-            return jsonify({'error': 'user_description is required'}), 400
-        if not csv_data:
-            return jsonify({'error': 'data is required'}), 400
-        
-        # Initialize AI planner if not already done
         if ai_planner is None:
-            try:
-                ai_planner = AIReportPlanner()
-                logger.info("AI planner initialized successfully")
-            except ValueError as e:
-                logger.warning(f"AI planner not available: {e}")
-                return jsonify({
-                    'error': 'AI planning not available - missing API key',
-                    'fallback': 'Use /api/plan-report-fallback for template-based planning'
-                }), 503
+            return jsonify({
+                'error': 'AI planning not available - missing API key',
+                'fallback': 'Use /api/plan-report-fallback for template-based planning'
+            }), 503
         
-        # Process the data
-        try:
-            if data_type == 'csv':
-                data_profile = data_processor.process_data_from_string(csv_data, 'csv')
-            else:
-                # For file paths, you'd handle file uploads here
-                return jsonify({'error': 'File uploads not yet implemented'}), 501
-        except Exception as e:
-            logger.error(f"Data processing error: {e}")
-            return jsonify({'error': f'Data processing failed: {str(e)}'}), 400
+        # Read the request and process the data
+        planning_inputs, error_response = _read_planning_request()
+        if error_response is not None:
+            return error_response
+        user_description, template_hint, data_profile = planning_inputs
         
         # Generate AI plan
         try:
-            report_spec = ai_planner.plan_report(
+            report_spec = await ai_planner.plan_report_async(
                 user_description=user_description,
                 data_profile=data_profile,
                 template_hint=template_hint
@@ -124,11 +250,177 @@ def plan_report():
                 'fallback': 'Use /api/plan-report-fallback for template-based planning'
             }), 500
     
+    except HTTPException as e:
+        return _http_error_response(e)
+    
     except Exception as e:
         logger.error(f"Unexpected error in plan_report: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
 
+def _sse_event(event: str, payload: Dict[str, Any]) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {app.json.dumps(payload)}\n\n"
+
+
+@app.route('/api/plan-report/stream', methods=['POST'])
+def plan_report_stream():
+    """
+    Stream a report plan as server-sent events.
+    
+    Takes the same JSON payload or file upload as /api/plan-report. Emits "kpi", "chart" and
+    "table" events as each component is decoded from the model output, then a
+    final "report" event with the validated plan, so clients can start
+    rendering long before the whole response has arrived.
+    """
+    try:
+        if ai_planner is None:
+            return jsonify({
+                'error': 'AI planning not available - missing API key',
+                'fallback': 'Use /api/plan-report-fallback for template-based planning'
+            }), 503
+        
+        planning_inputs, error_response = _read_planning_request()
+        if error_response is not None:
+            return error_response
+        user_description, template_hint, data_profile = planning_inputs
+        
+        def generate():
+            events = ai_planner.stream_plan_report(user_description, data_profile, template_hint)
+            for kind, item in iterate_on_openai_loop(events):
+                yield _sse_event(kind, item.to_dict())
+        
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # Keep nginx from buffering the stream
+        })
+    
+    except HTTPException as e:
+        return _http_error_response(e)
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in plan_report_stream: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@app.route('/api/plan-reports', methods=['POST'])
+async def plan_reports():
+    """
+    Plan several reports in one call.
+    
+    Expected JSON payload:
+    {
+        "reports": [
+            {
+                "user_description": "Natural language description of desired report",
+                "data": "CSV data as string",
+                "template_hint": "Optional template suggestion"
+            }
+        ],
+        "mode": "interactive (default) or batch"
+    }
+    
+    Interactive mode plans all reports concurrently and returns them. Batch
+    mode submits an OpenAI Batch API job at reduced cost and returns 202
+    with a batch id to poll at /api/plan-reports/<batch_id>.
+    """
+    try:
+        data = request.get_json()
+        if not data:
+            return jsonify({'error': 'No JSON data provided'}), 400
+        
+        reports = data.get('reports')
+        mode = data.get('mode', 'interactive')
+        if not isinstance(reports, list) or not reports:
+            return jsonify({'error': 'reports must be a non-empty list'}), 400
+        if len(reports) > MAX_REPORTS_PER_REQUEST:
+            return jsonify({'error': f'At most {MAX_REPORTS_PER_REQUEST} reports per request'}), 400
+        if mode not in ('interactive', 'batch'):
+            return jsonify({'error': "mode must be 'interactive' or 'batch'"}), 400
+        
+        if ai_planner is None:
+            return jsonify({
+                'error': 'AI planning not available - missing API key',
+                'fallback': 'Use /api/plan-report-fallback for template-based planning'
+            }), 503
+        
+        # Process the data for every report up front so bad input fails fast
+        planning_requests = []
+        for i, report in enumerate(reports):
+            if not isinstance(report, dict) or not report.get('user_description') or not report.get('data'):
+                return jsonify({'error': f'reports[{i}] needs user_description and data'}), 400
+            try:
+                data_profile = data_processor.process_data_from_string(report['data'], 'csv')
+            except Exception as e:
+                logger.error(f"Data processing error in reports[{i}]: {e}")
+                return jsonify({'error': f'Data processing failed for reports[{i}]: {str(e)}'}), 400
+            planning_requests.append((report['user_description'], data_profile, report.get('template_hint')))
+        
+        if mode == 'batch':
+            try:
+                batch_id = ai_planner.submit_reports_batch(planning_requests)
+            except Exception as e:
+                logger.error(f"Batch submission error: {e}")
+                return jsonify({'error': f'Batch submission failed: {str(e)}'}), 502
+            pending_batches.set(batch_id, [
+                {'user_description': user_description, 'data_profile': data_profile.to_dict(),
+                 'template_hint': template_hint}
+                for user_description, data_profile, template_hint in planning_requests
+            ])
+            return jsonify({
+                'success': True,
+                'batch_id': batch_id,
+                'status_url': f'/api/plan-reports/{batch_id}',
+                'message': f'Submitted {len(planning_requests)} reports for batch planning'
+            }), 202
+        
+        report_specs = await ai_planner.plan_reports_many(planning_requests)
+        return jsonify({
+            'success': True,
+            'report_specs': [spec.to_dict() for spec in report_specs],
+            'message': f'Generated {len(report_specs)} report plans'
+        }), 200
+    
+    except HTTPException as e:
+        return _http_error_response(e)
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in plan_reports: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
+@app.route('/api/plan-reports/<batch_id>', methods=['GET'])
+def plan_reports_status(batch_id):
+    """Return the plans of a submitted batch, or 202 while it is still running."""
+    try:
+        stored_requests = pending_batches.get(batch_id)
+        if stored_requests is None:
+            return jsonify({'error': f'Unknown batch {batch_id}'}), 404
+        
+        if ai_planner is None:
+            return jsonify({'error': 'AI planning not available - missing API key'}), 503
+        
+        planning_requests = [
+            (stored['user_description'], DataProfile.from_dict(stored['data_profile']), stored['template_hint'])
+            for stored in stored_requests
+        ]
+        report_specs = ai_planner.collect_reports_batch(batch_id, planning_requests)
+        if report_specs is None:
+            return jsonify({'success': True, 'batch_id': batch_id, 'status': 'in_progress'}), 202
+        
+        pending_batches.delete(batch_id)
+        return jsonify({
+            'success': True,
+            'batch_id': batch_id,
+            'status': 'completed',
+            'report_specs': [spec.to_dict() for spec in report_specs]
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Unexpected error in plan_reports_status: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+
 @app.route('/api/plan-report-fallback', methods=['POST'])
 def plan_report_fallback():
     """
@@ -155,11 +447,7 @@ def plan_report_fallback():
         
         # Generate fallback plan
         try:
-            # Use the fallback method from AI planner
-            fallback_planner = AIReportPlanner.__new__(AIReportPlanner)
-            report_spec = fallback_planner._generate_fallback_report(
-                user_description, data_profile, template_hint
-            )
+            report_spec = generate_fallback_spec(user_description, data_profile, template_hint)
             
             response_data = {
                 'success': True,
@@ -175,6 +463,9 @@ def plan_report_fallback():
             logger.error(f"Fallback planning error: {e}")
             return jsonify({'error': f'Fallback planning failed: {str(e)}'}), 500
     
+    except HTTPException as e:
+        return _http_error_response(e)
+    
     except Exception as e:
         logger.error(f"Unexpected error in plan_report_fallback: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -214,6 +505,9 @@ def analyze_data():
         
         return jsonify(response_data), 200
     
+    except HTTPException as e:
+        return _http_error_response(e)
+    
     except Exception as e:
         logger.error(f"Unexpected error in analyze_data: {e}")
         return jsonify({'error': 'Internal server error'}), 500
@@ -282,17 +576,6 @@ def create_app():
 
 
 if __name__ == '__main__':
-    # Check if OpenAI API key is available
-    api_key = os.getenv('OPENAI_API_KEY')
-    if api_key:
-        try:
-            ai_planner = AIReportPlanner(api_key)
-            logger.info("AI planner initialized successfully")
-        except Exception as e:
-            logger.warning(f"Failed to initialize AI planner: {e}")
-    else:
-        logger.warning("No OpenAI API key found. AI planning will not be available.")
-    
     # Run the development server
     app.run(
         host='0.0.0.0',
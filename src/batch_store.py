@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+File-backed store for the inputs of submitted OpenAI batches.
+Every worker process on the host sees the same entries, so a batch can be
+polled from any worker; entries are bounded in number and expire.
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Any, Optional
+
+
+class BatchStore:
+    """Directory of JSON files, one per batch, with a size limit and time-to-live."""
+    
+    def __init__(self, directory: str, max_entries: int = 256, ttl_seconds: float = 48 * 60 * 60):
+        """
+        Create a store in directory, creating the directory if needed.
+        
+        Args:
+            directory: Where entries are written; share it between workers
+            max_entries: Maximum number of entries kept; the oldest go first
+            ttl_seconds: Lifetime of an entry
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+    
+    def _path(self, key: str) -> str:
+        """File of an entry; keys are hashed so request input never becomes a path."""
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".json")
+    
+    def _entry_files(self) -> Dict[str, float]:
+        """Modification time of every entry file."""
+        mtimes = {}
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                try:
+                    mtimes[name] = os.path.getmtime(os.path.join(self.directory, name))
+                except FileNotFoundError:  # Removed by another worker
+                    continue
+        return mtimes
+    
+    def _remove(self, path: str) -> None:
+        """Delete a file that another worker may already have deleted."""
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value for key, or None if it is missing or expired."""
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl_seconds <= time.time():
+                self._remove(path)
+                return None
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+    
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value, then drop expired entries and the oldest beyond max_entries."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(value, f, separators=(",", ":"), default=str)
+            # Atomic, so other workers never read a half-written entry
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            self._remove(tmp_path)
+            raise
+        
+        with self._lock:
+            expired_before = time.time() - self.ttl_seconds
+            mtimes = self._entry_files()
+            oldest_first = sorted(mtimes, key=mtimes.get)
+            excess = len(oldest_first) - self.max_entries
+            for i, name in enumerate(oldest_first):
+                if i < excess or mtimes[name] <= expired_before:
+                    self._remove(os.path.join(self.directory, name))
+    
+    def delete(self, key: str) -> None:
+        """Remove an entry if it exists."""
+        self._remove(self._path(key))
+    
+    def __len__(self) -> int:
+        return len(self._entry_files())
+    
+    def stats(self) -> Dict[str, Any]:
+        """Occupancy, suitable for a health endpoint."""
+        return {
+            'size': len(self),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds
+        }
@@ -4,65 +4,95 @@ Centralizes all configurable parameters for easy customization.
 """
 
 import os
+from types import MappingProxyType
 from typing import Dict, Any
 
+
+def _env_number(name: str, default: float, parse=float):
+    """Environment variable parsed with parse (int or float), or the default when it is unset."""
+    value = os.environ.get(name)
+    return default if value is None else parse(value)
+
+
+# Cost rules, checked in order: the measure compared, the COST_WARNINGS threshold
+# it must exceed, the warning shown and the recommendations that go with it
+_COST_RULES = (
+    ('row_count', 'row_count_threshold',
+     "Large dataset detected ({row_count:,} rows). Consider using a smaller sample for initial planning.",
+     ("Use AI-optimized sampling for planning (reduces tokens by 80%)",
+      "Process data in chunks for better performance")),
+    ('file_size_mb', 'file_size_threshold_mb',
+     "Large file size ({file_size_mb:.1f} MB). Processing may take longer.",
+     ("Large files may take longer to process",
+      "Consider compressing data or using more efficient formats")),
+    ('estimated_tokens', 'token_threshold',
+     "High token usage estimated ({estimated_tokens:,} tokens). Using aggressive sampling to reduce costs.",
+     ("Consider breaking large reports into smaller sections",
+      "Use template-based planning for cost-sensitive operations")),
+)
+
+# Recommendations are listed in this order, which differs from the warnings above
+_COST_RECOMMENDATION_ORDER = ('row_count', 'estimated_tokens', 'file_size_mb')
+
+
 class Config:
     """Configuration class for the application."""
     
     # Data Processing Limits
-    MAX_SAMPLE_ROWS = int(os.environ.get('MAX_SAMPLE_ROWS', 1000))
-    MAX_AI_TOKENS = int(os.environ.get('MAX_AI_TOKENS', 15000))
-    MAX_FILE_SIZE_MB = float(os.environ.get('MAX_FILE_SIZE_MB', 100.0))
+    MAX_SAMPLE_ROWS = _env_number('MAX_SAMPLE_ROWS', 1000, int)
+    MAX_AI_TOKENS = _env_number('MAX_AI_TOKENS', 15000, int)
+    MAX_FILE_SIZE_MB = _env_number('MAX_FILE_SIZE_MB', 100.0)
     
-    # AI Planning Sample Sizes
-    AI_SAMPLE_SIZES = {
+    # AI Planning Sample Sizes (the lookup tables are read-only; subclasses redefine them)
+    AI_SAMPLE_SIZES = MappingProxyType({
         'small': 500,      # 0-5000 rows
         'medium': 750,     # 5000-10000 rows
         'large': 1000,     # 10000+ rows
         'extreme': 200     # Very large datasets (fallback)
-    }
+    })
     
     # Chunk Processing
-    CHUNK_SIZES = {
+    CHUNK_SIZES = MappingProxyType({
         'small': 1000,     # Standard chunk size
         'medium': 5000,    # Medium datasets
         'large': 10000     # Large datasets
-    }
+    })
     
     # Processing Strategies
-    PROCESSING_STRATEGIES = {
-        'standard': {
+    PROCESSING_STRATEGIES = MappingProxyType({
+        'standard': MappingProxyType({
             'description': 'Standard processing for datasets under 5000 rows',
             'ai_sample_size': 500,
             'chunk_size': 1000
-        },
-        'sampled': {
+        }),
+        'sampled': MappingProxyType({
             'description': 'Sampled processing for datasets 5000-10000 rows',
             'ai_sample_size': 750,
             'chunk_size': 2000
-        },
-        'chunked': {
+        }),
+        'chunked': MappingProxyType({
             'description': 'Chunked processing for datasets over 10000 rows',
             'ai_sample_size': 1000,
             'chunk_size': 5000
-        }
-    }
+        })
+    })
     
     # OpenAI Configuration
-    OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o')
-    OPENAI_MAX_TOKENS = int(os.environ.get('OPENAI_MAX_TOKENS', 4000))
-    OPENAI_TEMPERATURE = float(os.environ.get('OPENAI_TEMPERATURE', 0.7))
+    OPENAI_MODEL = os.environ.get('OPENAI_MODEL', 'gpt-4o-mini')
+    OPENAI_ESCALATION_MODEL = os.environ.get('OPENAI_ESCALATION_MODEL', 'gpt-4o')
+    OPENAI_MAX_TOKENS = _env_number('OPENAI_MAX_TOKENS', 4000, int)
+    OPENAI_TEMPERATURE = _env_number('OPENAI_TEMPERATURE', 0.7)
     
     # Cost Control
-    COST_WARNINGS = {
+    COST_WARNINGS = MappingProxyType({
         'token_threshold': 10000,
         'file_size_threshold_mb': 50.0,
         'row_count_threshold': 10000
-    }
+    })
     
     # Performance Settings
-    MAX_PROCESSING_TIME_SECONDS = int(os.environ.get('MAX_PROCESSING_TIME_SECONDS', 300))
-    MEMORY_LIMIT_MB = int(os.environ.get('MEMORY_LIMIT_MB', 512))
+    MAX_PROCESSING_TIME_SECONDS = _env_number('MAX_PROCESSING_TIME_SECONDS', 300, int)
+    MEMORY_LIMIT_MB = _env_number('MEMORY_LIMIT_MB', 512, int)
     
     @classmethod
     def get_ai_sample_size(cls, row_count: int) -> int:
@@ -99,41 +129,22 @@ class Config:
     @classmethod
     def get_cost_warning(cls, row_count: int, file_size_mb: float, estimated_tokens: int) -> Dict[str, Any]:
         """Get cost warnings based on dataset characteristics."""
-        warnings = []
-        
-        if row_count > cls.COST_WARNINGS['row_count_threshold']:
-            warnings.append(f"Large dataset detected ({row_count:,} rows). Consider using a smaller sample for initial planning.")
-        
-        if file_size_mb > cls.COST_WARNINGS['file_size_threshold_mb']:
-            warnings.append(f"Large file size ({file_size_mb:.1f} MB). Processing may take longer.")
-        
-        if estimated_tokens > cls.COST_WARNINGS['token_threshold']:
-            warnings.append(f"High token usage estimated ({estimated_tokens:,} tokens). Using aggressive sampling to reduce costs.")
+        measures = {'row_count': row_count, 'file_size_mb': file_size_mb, 'estimated_tokens': estimated_tokens}
+        rules = cls._triggered_cost_rules(measures)
+        warnings = [warning.format(**measures) for _, _, warning, _ in rules]
+        tips_by_measure = {measure: tips for measure, _, _, tips in rules}
         
         return {
             'has_warnings': len(warnings) > 0,
             'warnings': warnings,
-            'recommendations': cls._get_cost_recommendations(row_count, file_size_mb, estimated_tokens)
+            'recommendations': [tip for measure in _COST_RECOMMENDATION_ORDER
+                                for tip in tips_by_measure.get(measure, ())]
         }
     
     @classmethod
-    def _get_cost_recommendations(cls, row_count: int, file_size_mb: float, estimated_tokens: int) -> list:
-        """Get cost-saving recommendations."""
-        recommendations = []
-        
-        if row_count > 10000:
-            recommendations.append("Use AI-optimized sampling for planning (reduces tokens by 80%)")
-            recommendations.append("Process data in chunks for better performance")
-        
-        if estimated_tokens > 10000:
-            recommendations.append("Consider breaking large reports into smaller sections")
-            recommendations.append("Use template-based planning for cost-sensitive operations")
-        
-        if file_size_mb > 50:
-            recommendations.append("Large files may take longer to process")
-            recommendations.append("Consider compressing data or using more efficient formats")
-        
-        return recommendations
+    def _triggered_cost_rules(cls, measures: Dict[str, float]) -> list:
+        """Cost rules whose measure exceeds its COST_WARNINGS threshold."""
+        return [rule for rule in _COST_RULES if measures[rule[0]] > cls.COST_WARNINGS[rule[1]]]
 
 # Environment-specific configurations
 class DevelopmentConfig(Config):
@@ -154,16 +165,16 @@ class TestingConfig(Config):
     MAX_SAMPLE_ROWS = 100
     MAX_AI_TOKENS = 5000
 
+_CONFIGS = {
+    'development': DevelopmentConfig,
+    'production': ProductionConfig,
+    'testing': TestingConfig
+}
+
 # Configuration factory
 def get_config(environment: str = None) -> Config:
     """Get configuration based on environment."""
     if environment is None:
         environment = os.environ.get('FLASK_ENV', 'development')
     
-    configs = {
-        'development': DevelopmentConfig,
-        'production': ProductionConfig,
-        'testing': TestingConfig
-    }
-    
-    return configs.get(environment, DevelopmentConfig)
+    return _CONFIGS.get(environment, DevelopmentConfig)
@@ -4,20 +4,105 @@ Data processing module for CSV/XLSX files.
 Handles file parsing, column type inference, and data profiling.
 """
 
-import pandas as pd
+import json
 import logging
-from typing import List, Dict, Any, Optional, Tuple
-from datetime import datetime
+import importlib.util
+from typing import List, Dict, Any, Optional, Tuple, Union, BinaryIO, Iterable, Iterator, TYPE_CHECKING
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+import time
 import re
-from io import StringIO
+from io import BytesIO
+
+# pandas is imported inside the methods that parse data, so importing this
+# module (and the API server with it) stays cheap until data arrives
+if TYPE_CHECKING:
+    import pandas as pd
+
+# pyarrow is optional; CSVs are parsed with its multithreaded reader when it is
+# installed. Only its presence is checked here, pandas imports it when needed.
+PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Below this size pyarrow's reader setup costs more than it saves over the C parser
+PYARROW_CSV_MIN_BYTES = 16 * 1024
+
+# python-calamine is optional; its Rust reader parses workbooks several times
+# faster than openpyxl (pandas 2.2+ exposes it as the 'calamine' engine)
+CALAMINE_AVAILABLE = importlib.util.find_spec("python_calamine") is not None
+
+# orjson is optional; the stdlib json module is used when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Columns with at most this many distinct values report their cardinality to the planner
+PLANNER_DIGEST_MAX_UNIQUE = 50
+
+# Rows parsed at a time when profiling an upload stream; bounds peak memory on large files
+CSV_CHUNK_ROWS = 50000
+
+# Bytes per record batch when pyarrow's streaming reader parses an upload instead
+PYARROW_CSV_BLOCK_BYTES = 8 * 1024 * 1024
+
+# Frames at least this wide have their columns profiled on a thread pool; pandas
+# releases the GIL in its hashing and null checks, narrower frames aren't worth it
+PARALLEL_PROFILE_MIN_COLUMNS = 16
+PROFILE_WORKERS = 8
+
+# Shared by all processors; threads are only started once a wide frame arrives
+_profile_executor = ThreadPoolExecutor(max_workers=PROFILE_WORKERS, thread_name_prefix="column-profile")
+
+# Column types produced by DataProcessor._infer_column_type
+COLUMN_TYPES = ('number', 'string', 'date', 'currency', 'percent')
+
+# Leading non-null values of a text column whose format decides its type
+TYPE_INFERENCE_SAMPLE_SIZE = 20
+
+# Share of those values that must match a format for the column to take its type;
+# above one half, at most one format can reach it
+TYPE_INFERENCE_MIN_MATCH = 0.7
+
+# Currency markers, shared by the text format regex and the numeric column check
+_CURRENCY_MARKERS = ("$", "USD", "EUR", "GBP", "CAD", "€", "£")
+_CURRENCY_SYMBOLS = "|".join(re.escape(marker) for marker in _CURRENCY_MARKERS)
+
+# Value formats recognised in text columns, one named group per column type in
+# priority order; one match per value tests every format at once
+_VALUE_FORMAT_RE = re.compile(
+    r"^(?:"
+    r"(?P<date>(?:\d{4}-\d{1,2}-\d{1,2}|\d{1,2}[/-]\d{1,2}[/-]\d{2,4}|"
+    r"[A-Za-z]{3,9}\.? \d{1,2},? \d{4}|\d{1,2} [A-Za-z]{3,9},? \d{4})"
+    r"(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?)"
+    r"|(?P<currency>\(?-?(?:" + _CURRENCY_SYMBOLS + r") ?-?[\d,]*\.?\d+\)?)"
+    r"|(?P<percent>-?[\d,]*\.?\d+ ?%)"
+    r"|(?P<number>-?[\d,]*\.?\d+)"
+    r")$"
+)
+
+
+def _char_count(values: List[Any]) -> int:
+    """Total length of the values as strings.
+    
+    Sample values are normally strings already, and joining them counts the
+    characters in C; anything else is stringified one value at a time.
+    """
+    try:
+        return len(''.join(values))
+    except TypeError:
+        return sum(len(str(val)) for val in values)
+
 
 class ColumnProfile:
-    """Profile information for a single column."""
+    """Profile information for a single column.
+    
+    Slotted, since a profile holds one instance per column and sessions keep
+    profiles around between requests.
+    """
+    
+    __slots__ = ('name', 'type', 'sample_values', 'null_count', 'unique_count', '_serialized')
     
     def __init__(self, name: str, data_type: str, sample_values: List[str], 
                  null_count: int = 0, unique_count: int = 0):
@@ -26,16 +111,33 @@ class ColumnProfile:
         self.sample_values = sample_values
         self.null_count = null_count
         self.unique_count = unique_count
+        self._serialized: Optional[Dict[str, Any]] = None
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary representation with JSON-serializable types."""
-        return {
-            'name': self.name,
-            'type': self.type,
-            'sample_values': self.sample_values,
-            'null_count': int(self.null_count),  # Convert numpy types to Python types
-            'unique_count': int(self.unique_count)
-        }
+        """Convert to dictionary representation with JSON-serializable types.
+        
+        Built once and cached, so callers must not modify the returned dict.
+        """
+        if self._serialized is None:
+            self._serialized = {
+                'name': self.name,
+                'type': self.type,
+                'sample_values': self.sample_values,
+                'null_count': int(self.null_count),  # Convert numpy types to Python types
+                'unique_count': int(self.unique_count)
+            }
+        return self._serialized
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'ColumnProfile':
+        """Rebuild a column profile from the output of to_dict."""
+        return cls(
+            name=data['name'],
+            data_type=data.get('type', 'string'),
+            sample_values=data.get('sample_values', []),
+            null_count=data.get('null_count', 0),
+            unique_count=data.get('unique_count', 0)
+        )
 
 class DataProfile:
     """Profile information for an entire dataset."""
@@ -48,7 +150,15 @@ class DataProfile:
         self.processing_time = processing_time
     
     def to_dict(self) -> Dict[str, Any]:
-        """Convert to dictionary representation with JSON-serializable types."""
+        """Convert to dictionary representation with JSON-serializable types.
+        
+        Built once and cached, so callers must not modify the returned dict.
+        """
+        return self._serialized
+    
+    @cached_property
+    def _serialized(self) -> Dict[str, Any]:
+        """Cached body of to_dict."""
         return {
             'columns': [col.to_dict() for col in self.columns],
             'total_rows': int(self.total_rows),  # Convert numpy types to Python types
@@ -56,9 +166,40 @@ class DataProfile:
             'processing_time': float(self.processing_time)
         }
     
+    def to_planner_digest(self) -> List[Dict[str, Any]]:
+        """Compact column summary for AI planning prompts.
+        
+        Keeps only what the planner needs to pick columns: name, type and, for
+        low-cardinality columns, the number of distinct values.
+        """
+        digest = []
+        for col in self.columns:
+            entry = {'name': col.name, 'type': col.type}
+            if col.unique_count and int(col.unique_count) <= PLANNER_DIGEST_MAX_UNIQUE:
+                entry['unique'] = int(col.unique_count)
+            digest.append(entry)
+        return digest
+    
+    @cached_property
+    def planner_digest_json(self) -> str:
+        """Compact JSON of to_planner_digest, serialized once per profile."""
+        if orjson is not None:
+            return orjson.dumps(self.to_planner_digest()).decode("utf-8")
+        return json.dumps(self.to_planner_digest(), separators=(",", ":"), ensure_ascii=False)
+    
+    @cached_property
+    def column_names(self) -> Tuple[str, ...]:
+        """Column names in profile order."""
+        return tuple(col.name for col in self.columns)
+    
+    @cached_property
+    def column_schema(self) -> Tuple[Tuple[str, str], ...]:
+        """(name, type) pairs identifying the shape of the data."""
+        return tuple((col.name, col.type) for col in self.columns)
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'DataProfile':
-        columns = [ColumnProfile(**col_data) for col_data in data['columns']]
+        columns = [ColumnProfile.from_dict(col_data) for col_data in data['columns']]
         return cls(
             columns=columns,
             total_rows=data.get('total_rows', 0),
@@ -66,35 +207,51 @@ class DataProfile:
             processing_time=data.get('processing_time', 0.0)
         )
     
+    @cached_property
+    def columns_by_type(self) -> Dict[str, List[ColumnProfile]]:
+        """Column profiles bucketed by type in a single pass.
+        
+        Built on first access and cached, so profiles should not have their
+        columns changed afterwards.
+        """
+        buckets = {data_type: [] for data_type in COLUMN_TYPES}
+        for col in self.columns:
+            buckets.setdefault(col.type, []).append(col)
+        return buckets
+    
+    @cached_property
+    def columns_by_name(self) -> Dict[str, ColumnProfile]:
+        """Column profiles keyed by name, built once so lookups don't scan the columns."""
+        return {col.name: col for col in self.columns}
+    
+    def get_column_by_name(self, name: str) -> Optional[ColumnProfile]:
+        """Get the profile of the named column, or None if there is no such column."""
+        return self.columns_by_name.get(name)
+    
     def get_columns_by_type(self, data_type: str) -> List[str]:
         """Get column names of a specific type."""
-        return [col.name for col in self.columns if col.type == data_type]
+        return [col.name for col in self.columns_by_type.get(data_type, [])]
     
     def get_sample_for_ai(self, max_rows: int = 500) -> 'DataProfile':
         """Create a sampled profile for AI planning to reduce token usage."""
         if self.total_rows <= max_rows:
             return self
         
-        # Create sampled profile with representative data
+        # Create sampled profile with representative data; columns whose samples
+        # already fit are shared with this profile rather than copied
         sampled_columns = []
         for col in self.columns:
-            # Take first, middle, and last samples for better representation
-            if self.total_rows > max_rows:
-                sample_size = min(max_rows, len(col.sample_values))
-                if sample_size < len(col.sample_values):
-                    # Take samples from different parts of the data
-                    first_samples = col.sample_values[:sample_size//2]
-                    last_samples = col.sample_values[-(sample_size//2):]
-                    sampled_values = first_samples + last_samples
-                else:
-                    sampled_values = col.sample_values
-            else:
-                sampled_values = col.sample_values
+            sample_values = col.sample_values
+            if len(sample_values) <= max_rows:
+                sampled_columns.append(col)
+                continue
             
+            # Take samples from the start and end of the data
+            half = max_rows // 2
             sampled_col = ColumnProfile(
                 name=col.name,
                 data_type=col.type,
-                sample_values=sampled_values,
+                sample_values=sample_values[:half] + sample_values[len(sample_values) - half:],
                 null_count=col.null_count,
                 unique_count=col.unique_count
             )
@@ -124,11 +281,97 @@ class DataProfile:
             recommendations['processing_strategy'] = 'sampled'
             recommendations['ai_planning_sample_size'] = 750
         
-        # Estimate AI token usage (rough calculation)
-        total_chars = sum(len(str(val)) for col in self.columns for val in col.sample_values)
-        recommendations['estimated_ai_tokens'] = int(total_chars // 4)  # Ensure it's a Python int
+        recommendations['estimated_ai_tokens'] = self.estimated_ai_tokens
         
         return recommendations
+    
+    @cached_property
+    def estimated_ai_tokens(self) -> int:
+        """Rough AI token estimate for the sample values, computed once per profile."""
+        total_chars = sum(_char_count(col.sample_values) for col in self.columns)
+        return int(total_chars // 4)  # Ensure it's a Python int
+
+class _ColumnAccumulator:
+    """Running profile of one column over the chunks of a file.
+    
+    The column type is locked in from the first chunk that has values; later
+    chunks only add to the counts and the head/tail sample.
+    """
+    
+    def __init__(self, processor: 'DataProcessor', name: str):
+        self.processor = processor
+        self.name = name
+        self.data_type: Optional[str] = None
+        self.null_count = 0
+        self.value_count = 0
+        self.head: Optional['pd.Series'] = None
+        self.tail: Optional['pd.Series'] = None
+        # Distinct values of the first chunk stay in pandas' array; a Python set
+        # is only built once a second chunk has to be merged in
+        self.first_uniques: Any = None
+        self.uniques: Optional[set] = None
+    
+    def add(self, col_data: 'pd.Series') -> None:
+        """Fold one chunk of the column into the running profile."""
+        import pandas as pd
+        # Drop nulls once; inference, sampling and counts all work on the non-null values
+        clean_data = col_data.dropna()
+        self.null_count += len(col_data) - len(clean_data)
+        if len(clean_data) == 0:
+            return
+        
+        if self.data_type is None:
+            self.data_type = self.processor._infer_column_type(clean_data)
+        self.value_count += len(clean_data)
+        
+        # Keep the first half-sample and the last full sample of non-null values
+        max_rows = self.processor.max_sample_rows
+        if self.head is None:
+            self.head = clean_data.head(max_rows // 2)
+        elif len(self.head) < max_rows // 2:
+            self.head = pd.concat([self.head, clean_data.head(max_rows // 2 - len(self.head))])
+        if self.tail is None:
+            self.tail = clean_data.tail(max_rows)
+        else:
+            self.tail = pd.concat([self.tail, clean_data.tail(max_rows)]).tail(max_rows)
+        
+        # Deduplicate the chunk in pandas' hash table, then merge its raw distinct values;
+        # re-deduplicating the values of every earlier chunk would be quadratic
+        chunk_uniques = clean_data.unique()
+        if self.first_uniques is None and self.uniques is None:
+            self.first_uniques = chunk_uniques
+            return
+        if self.uniques is None:
+            self.uniques = set(self.first_uniques.tolist())
+            self.first_uniques = None
+        self.uniques.update(chunk_uniques.tolist())
+    
+    def to_profile(self) -> ColumnProfile:
+        """Column profile of every chunk added so far."""
+        import pandas as pd
+        if self.value_count == 0:
+            sample_values = []
+        elif self.value_count <= self.processor.max_sample_rows:
+            sample_values = self.processor._get_sample_values(self.tail)
+        else:
+            half = self.processor.max_sample_rows // 2
+            sample_values = self.processor._get_sample_values(pd.concat([self.head, self.tail.tail(half)]))
+        
+        return ColumnProfile(
+            name=self.name,
+            data_type=self.data_type or 'string',
+            sample_values=sample_values,
+            null_count=self.null_count,
+            unique_count=self.unique_count
+        )
+    
+    @property
+    def unique_count(self) -> int:
+        """Distinct non-null values across every chunk added so far."""
+        if self.uniques is not None:
+            return len(self.uniques)
+        return len(self.first_uniques) if self.first_uniques is not None else 0
+
 
 class DataProcessor:
     """Process and analyze data files."""
@@ -137,146 +380,301 @@ class DataProcessor:
         self.max_sample_rows = max_sample_rows
         self.max_ai_tokens = max_ai_tokens
     
-    def process_data_from_string(self, data_string: str, file_type: str = 'csv') -> DataProfile:
-        """Process data from a string and return a profile."""
-        start_time = datetime.now()
+    def process_data_from_string(self, data_string: Union[str, bytes], file_type: str = 'csv') -> DataProfile:
+        """Process data from a string, or the raw bytes of a file, and return a profile.
+        
+        Workbooks are binary, so xlsx/xls data has to be passed as bytes.
+        """
+        start_time = time.perf_counter()
         
         try:
+            # Encode once: the bytes give the file size and feed the CSV parsers,
+            # which read UTF-8 bytes faster than they decode a text stream
+            data = data_string.encode('utf-8') if isinstance(data_string, str) else data_string
+            file_size_mb = len(data) / (1024 * 1024)
+            
             if file_type.lower() == 'csv':
-                df = pd.read_csv(StringIO(data_string))
+                df = self._read_csv(BytesIO(data), size_hint=len(data))
             elif file_type.lower() in ['xlsx', 'xls']:
-                df = pd.read_excel(StringIO(data_string))
+                df = self._read_excel(BytesIO(data))
             else:
                 raise ValueError(f"Unsupported file type: {file_type}")
             
-            # Calculate file size (rough estimate)
-            file_size_mb = len(data_string.encode('utf-8')) / (1024 * 1024)
+            return self._profile_dataframe(df, file_size_mb, start_time)
             
-            # Create column profiles
-            columns = []
-            for col_name in df.columns:
-                col_data = df[col_name]
-                data_type = self._infer_column_type(col_data)
-                sample_values = self._get_sample_values(col_data)
-                null_count = col_data.isnull().sum()
-                unique_count = col_data.nunique()
-                
-                column_profile = ColumnProfile(
-                    name=col_name,
-                    data_type=data_type,
-                    sample_values=sample_values,
-                    null_count=null_count,
-                    unique_count=unique_count
-                )
-                columns.append(column_profile)
-            
-            processing_time = (datetime.now() - start_time).total_seconds()
-            
-            profile = DataProfile(
-                columns=columns,
-                total_rows=len(df),
-                file_size_mb=file_size_mb,
-                processing_time=processing_time
-            )
+        except Exception as e:
+            logger.error("Error processing data: %s", e)
+            raise
+    
+    def process_data_from_file(self, file_obj: BinaryIO, file_type: str = 'csv') -> DataProfile:
+        """Process data read straight from a binary file object, such as an upload stream.
+        
+        Avoids holding the raw file as a Python string next to the parsed frame,
+        and parses CSVs a chunk at a time so only one chunk is in memory at once.
+        """
+        start_time = time.perf_counter()
+        
+        try:
+            if file_type.lower() == 'csv':
+                columns, total_rows = self._profile_csv_stream(file_obj)
+            elif file_type.lower() in ['xlsx', 'xls']:
+                columns, total_rows = self._profile_chunks([self._read_excel(file_obj)])
+            else:
+                raise ValueError(f"Unsupported file type: {file_type}")
             
-            # Log processing info
-            logger.info(f"Processed {len(df)} rows in {processing_time:.2f}s, "
-                       f"file size: {file_size_mb:.2f}MB")
+            # Bytes consumed by the parser (decompressed size for gzip streams)
+            try:
+                file_size_mb = file_obj.tell() / (1024 * 1024)
+            except (AttributeError, OSError):
+                file_size_mb = 0.0
             
-            return profile
+            return self._build_profile(columns, total_rows, file_size_mb, start_time)
             
         except Exception as e:
-            logger.error(f"Error processing data: {e}")
+            logger.error("Error processing data: %s", e)
             raise
     
-    def _infer_column_type(self, column_data: pd.Series) -> str:
-        """Infer the data type of a column."""
-        # Remove null values for type inference
-        clean_data = column_data.dropna()
+    def _read_csv(self, source: Any, size_hint: Optional[int] = None) -> 'pd.DataFrame':
+        """Parse CSV text with pyarrow's multithreaded reader, or pandas' C parser without it.
+        
+        Inputs whose size_hint is under PYARROW_CSV_MIN_BYTES also go to the C parser.
+        """
+        import pandas as pd
+        if PYARROW_AVAILABLE and (size_hint is None or size_hint >= PYARROW_CSV_MIN_BYTES):
+            try:
+                return pd.read_csv(source, engine='pyarrow')
+            except Exception as e:
+                # pyarrow is stricter about ragged rows and quoting; retry when the source can be rewound
+                if not (hasattr(source, 'seekable') and source.seekable()):
+                    raise
+                logger.debug("pyarrow CSV parse failed, retrying with the C parser: %s", e)
+                source.seek(0)
+        return pd.read_csv(source)
+    
+    def _profile_csv_stream(self, source: BinaryIO) -> Tuple[List[ColumnProfile], int]:
+        """Profile a CSV stream chunk by chunk, with pyarrow's streaming reader when it is installed.
+        
+        pyarrow parses PYARROW_CSV_BLOCK_BYTES at a time on its own threads; without it,
+        or when it rejects the file, pandas' C parser reads CSV_CHUNK_ROWS rows at a time.
+        """
+        import pandas as pd
+        if PYARROW_AVAILABLE:
+            try:
+                return self._profile_chunks(self._iter_arrow_csv_chunks(source))
+            except Exception as e:
+                # pyarrow fixes column types from the first block and is stricter about
+                # ragged rows; start over with the C parser when the source can be rewound
+                if not (hasattr(source, 'seekable') and source.seekable()):
+                    raise
+                logger.debug("pyarrow CSV stream failed, retrying with the C parser: %s", e)
+                source.seek(0)
+        return self._profile_chunks(pd.read_csv(source, chunksize=CSV_CHUNK_ROWS))
+    
+    def _iter_arrow_csv_chunks(self, source: BinaryIO) -> Iterator['pd.DataFrame']:
+        """Yield a CSV stream as frames of one pyarrow record batch each."""
+        from pyarrow import csv as pa_csv
+        reader = pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(block_size=PYARROW_CSV_BLOCK_BYTES),
+            # Empty fields are nulls in every column, as they are for pandas
+            convert_options=pa_csv.ConvertOptions(strings_can_be_null=True)
+        )
+        for batch in reader:
+            yield batch.to_pandas()
+    
+    def _read_excel(self, source: Any) -> 'pd.DataFrame':
+        """Parse a workbook's first sheet with calamine, or openpyxl without it.
+        
+        pandas' openpyxl reader already opens workbooks read-only, so that is the
+        fallback when calamine or a pandas version that supports it is missing.
+        """
+        import pandas as pd
+        if CALAMINE_AVAILABLE:
+            try:
+                return pd.read_excel(source, engine='calamine')
+            except (ImportError, ValueError) as e:
+                if not (hasattr(source, 'seekable') and source.seekable()):
+                    raise
+                logger.debug("calamine Excel parse failed, retrying with openpyxl: %s", e)
+                source.seek(0)
+        return pd.read_excel(source)
+    
+    def _profile_dataframe(self, df: 'pd.DataFrame', file_size_mb: float, start_time: float) -> DataProfile:
+        """Build the data profile for a parsed frame."""
+        columns, total_rows = self._profile_chunks([df])
+        return self._build_profile(columns, total_rows, file_size_mb, start_time)
+    
+    def _profile_chunks(self, chunks: Iterable['pd.DataFrame']) -> Tuple[List[ColumnProfile], int]:
+        """Profile the columns of a frame delivered as one or more row chunks."""
+        accumulators: Dict[Any, _ColumnAccumulator] = {}
+        total_rows = 0
+        for chunk in chunks:
+            total_rows += len(chunk)
+            # items() hands out each column's Series without a label lookup per column
+            pending = []
+            for col_name, col_data in chunk.items():
+                accumulator = accumulators.get(col_name)
+                if accumulator is None:
+                    accumulator = accumulators[col_name] = _ColumnAccumulator(self, col_name)
+                pending.append((accumulator, col_data))
+            
+            # Each accumulator only sees its own column, so columns can be added concurrently
+            if len(pending) >= PARALLEL_PROFILE_MIN_COLUMNS:
+                list(_profile_executor.map(lambda item: item[0].add(item[1]), pending))
+            else:
+                for accumulator, col_data in pending:
+                    accumulator.add(col_data)
         
+        return [accumulator.to_profile() for accumulator in accumulators.values()], total_rows
+    
+    def _build_profile(
+        self,
+        columns: List[ColumnProfile],
+        total_rows: int,
+        file_size_mb: float,
+        start_time: float
+    ) -> DataProfile:
+        """Wrap profiled columns in a DataProfile and log the time since start_time (a perf_counter reading)."""
+        processing_time = time.perf_counter() - start_time
+        
+        profile = DataProfile(
+            columns=columns,
+            total_rows=total_rows,
+            file_size_mb=file_size_mb,
+            processing_time=processing_time
+        )
+        
+        # Log processing info
+        logger.info("Processed %s rows in %.2fs, file size: %.2fMB",
+                    total_rows, processing_time, file_size_mb)
+        
+        return profile
+    
+    def _infer_column_type(self, clean_data: 'pd.Series') -> str:
+        """Infer the data type of a column from its non-null values."""
+        import pandas as pd
         if len(clean_data) == 0:
             return 'string'
         
-        # Check if it's a date column
-        if self._is_date_column(clean_data):
+        # Typed columns are classified by their dtype's kind code alone, which numpy,
+        # nullable and pyarrow-backed dtypes all report
+        kind = clean_data.dtype.kind
+        if kind == 'b':
+            return 'boolean'
+        if kind == 'M':
             return 'date'
         
         # Check if it's numeric
-        if pd.api.types.is_numeric_dtype(clean_data):
+        if kind in 'iufc':
+            # Both format checks read the same leading value; stringify it once
+            sample_str = str(clean_data.iloc[0]).strip()
             # Check if it's currency
-            if self._is_currency_column(clean_data):
+            if self._is_currency_column(sample_str):
                 return 'currency'
             # Check if it's percentage
-            elif self._is_percentage_column(clean_data):
+            elif self._is_percentage_column(clean_data, sample_str):
                 return 'percent'
             else:
                 return 'number'
         
-        # Check if it's boolean
-        if pd.api.types.is_bool_dtype(clean_data):
-            return 'boolean'
+        # Text columns are classified by the format of their leading values
+        if pd.api.types.is_object_dtype(clean_data) or pd.api.types.is_string_dtype(clean_data):
+            return self._infer_text_column_type(clean_data)
+        
+        # Check if it's a date column
+        if self._is_date_column(clean_data):
+            return 'date'
         
         # Default to string
         return 'string'
     
-    def _is_date_column(self, column_data: pd.Series) -> bool:
-        """Check if a column contains date-like data."""
-        # Try to parse as datetime
-        try:
-            pd.to_datetime(column_data, errors='raise')
+    def _infer_text_column_type(self, column_data: 'pd.Series') -> str:
+        """Infer the type of a non-empty text column from its leading values.
+        
+        Values are matched one at a time against the combined format regex, and
+        the scan stops as soon as one format has enough matches to win or none
+        can reach the threshold any more. On a sample this small a plain loop
+        is far cheaper than building the frame Series.str.extract returns.
+        """
+        sample = column_data.head(TYPE_INFERENCE_SAMPLE_SIZE).tolist()
+        size = len(sample)
+        counts: Dict[str, int] = {}
+        best = 0
+        for seen, value in enumerate(sample, 1):
+            match = _VALUE_FORMAT_RE.match(str(value).strip())
+            if match:
+                data_type = match.lastgroup
+                counts[data_type] = count = counts.get(data_type, 0) + 1
+                if count / size >= TYPE_INFERENCE_MIN_MATCH:
+                    return data_type
+                best = max(best, count)
+            if (best + size - seen) / size < TYPE_INFERENCE_MIN_MATCH:
+                break
+        return 'string'
+    
+    def _is_date_column(self, column_data: 'pd.Series') -> bool:
+        """Check if a column's leading values are mostly date-like.
+        
+        Only the values type inference samples are parsed, so columns of other
+        dtypes (such as categoricals) aren't converted in full to answer yes or no.
+        """
+        import pandas as pd
+        # Numbers would parse as epoch offsets, and timedeltas can't be parsed at all
+        kind = column_data.dtype.kind
+        if kind == 'M':
             return True
-        except:
+        if kind in 'iufcbm':
             return False
+        
+        sample = column_data.head(TYPE_INFERENCE_SAMPLE_SIZE)
+        try:
+            parsed = pd.to_datetime(sample, errors='coerce', format='mixed')
+        except (TypeError, ValueError):
+            return False
+        return bool(parsed.notna().mean() >= TYPE_INFERENCE_MIN_MATCH)
     
-    def _is_currency_column(self, column_data: pd.Series) -> bool:
-        """Check if a column contains currency data."""
+    def _is_currency_column(self, sample_str: str) -> bool:
+        """Check if a column's stringified leading value looks like currency."""
         # Look for currency symbols or patterns
-        sample_str = str(column_data.iloc[0]) if len(column_data) > 0 else ""
-        currency_patterns = [r'\$', r'USD', r'EUR', r'GBP', r'CAD']
-        return any(re.search(pattern, sample_str) for pattern in currency_patterns)
+        return any(marker in sample_str for marker in _CURRENCY_MARKERS)
     
-    def _is_percentage_column(self, column_data: pd.Series) -> bool:
-        """Check if a column contains percentage data."""
+    def _is_percentage_column(self, column_data: 'pd.Series', sample_str: str) -> bool:
+        """Check if a numeric column contains percentage data, given its stringified leading value.
+        
+        The column is only checked once inference has found a numeric dtype and
+        dropped the nulls, so its values are compared as they are, not reparsed.
+        """
         # Look for percentage signs or values between 0-1
-        sample_str = str(column_data.iloc[0]) if len(column_data) > 0 else ""
         if '%' in sample_str:
             return True
         
-        # Check if values are typically between 0-1 (common for percentages)
-        numeric_data = pd.to_numeric(column_data, errors='coerce').dropna()
-        if len(numeric_data) > 0:
-            return (numeric_data >= 0).all() and (numeric_data <= 1).all()
+        # Check if values are typically between 0-1 (common for percentages). The
+        # extremes of the raw array answer this without building boolean masks, and
+        # most numeric columns already fail on their maximum after a single pass
+        if len(column_data) > 0:
+            values = column_data.to_numpy()
+            return bool(values.max() <= 1 and values.min() >= 0)
         
         return False
     
-    def _get_sample_values(self, column_data: pd.Series) -> List[str]:
-        """Get sample values from a column for profiling."""
-        # Get non-null values
-        clean_data = column_data.dropna()
-        
+    def _get_sample_values(self, clean_data: 'pd.Series') -> List[str]:
+        """Get sample values for profiling from a column's non-null values."""
         if len(clean_data) == 0:
             return []
         
-        # Take a sample of values (first few + some random ones)
-        sample_size = min(self.max_sample_rows, len(clean_data))
-        
-        if len(clean_data) <= sample_size:
-            sample_values = clean_data.tolist()
+        # Keep at most max_sample_rows values, converting only those slices rather
+        # than the whole column; the first and last halves represent the data better
+        if len(clean_data) > self.max_sample_rows:
+            half = self.max_sample_rows // 2
+            values = clean_data.iloc[:half].tolist() + clean_data.iloc[len(clean_data) - half:].tolist()
         else:
-            # Take first few and some from middle/end for better representation
-            first_values = clean_data.head(sample_size // 2).tolist()
-            remaining_values = clean_data.tail(sample_size // 2).tolist()
-            sample_values = first_values + remaining_values
-        
-        # Convert to strings and limit length to prevent token explosion
-        string_values = []
-        for val in sample_values:
-            str_val = str(val)
-            if len(str_val) > 100:  # Limit very long values
-                str_val = str_val[:100] + "..."
-            string_values.append(str_val)
+            values = clean_data.tolist()
         
-        return string_values
+        # Convert to strings and limit length to prevent token explosion; repeated
+        # values share one string object, since profiles stay in the session
+        clipped = (s if len(s) <= 100 else s[:100] + "..." for s in map(str, values))
+        shared: Dict[str, str] = {}
+        return [shared.setdefault(s, s) for s in clipped]
     
     def get_ai_planning_profile(self, full_profile: DataProfile) -> Tuple[DataProfile, Dict[str, Any]]:
         """Get an AI-optimized profile for planning while preserving full data."""
@@ -287,8 +685,8 @@ class DataProcessor:
         
         # Check if we're within token limits
         if recommendations['estimated_ai_tokens'] > self.max_ai_tokens:
-            logger.warning(f"Estimated AI tokens ({recommendations['estimated_ai_tokens']}) "
-                          f"exceeds limit ({self.max_ai_tokens}). Using aggressive sampling.")
+            logger.warning("Estimated AI tokens (%s) exceeds limit (%s). Using aggressive sampling.",
+                           recommendations['estimated_ai_tokens'], self.max_ai_tokens)
             ai_profile = full_profile.get_sample_for_ai(200)  # Very aggressive sampling
         
         return ai_profile, recommendations
@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Flask JSON provider backed by orjson.
+Falls back to Flask's stdlib-based provider when orjson is not installed.
+"""
+
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - exercised only without orjson
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that encodes and decodes request/response bodies with orjson."""
+    
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        """Serialize obj to a JSON string, honouring the indent and sort_keys Flask passes."""
+        if orjson is None:
+            return super().dumps(obj, **kwargs)
+        
+        # Datetimes go through Flask's default hook so they keep the HTTP date format
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get("indent"):
+            option |= orjson.OPT_INDENT_2
+        if kwargs.get("sort_keys", self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=kwargs.get("default", self.default), option=option).decode("utf-8")
+    
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        """Deserialize JSON text or bytes."""
+        if orjson is None:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
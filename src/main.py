@@ -10,11 +10,11 @@ from pathlib import Path
 # Add the src directory to the Python path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from data_processor import DataProcessor, create_sample_data_profile
-from report_spec import create_sample_report_spec, create_government_report_templates
-
 def main():
     """Main function to run the application."""
+    from data_processor import create_sample_data_profile
+    from report_spec import create_sample_report_spec, create_government_report_templates
+    
     print("Welcome to Gov-Report-AI!")
     print("An AI-powered tool for analyzing and generating government reports.")
     print("=" * 60)
@@ -66,6 +66,8 @@ def main():
 
 def demo_data_processing():
     """Demonstrate data processing with a sample CSV."""
+    from data_processor import DataProcessor
+    
     print("\n" + "=" * 60)
     print("Data Processing Demo")
     print("=" * 60)
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Rate-limited gateway for async OpenAI requests.
+Token-bucket throttling with exponential backoff on 429s, after the
+api_request_parallel_processor example in the OpenAI cookbook.
+"""
+
+import os
+import time
+import random
+import asyncio
+import logging
+import threading
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import openai
+
+logger = logging.getLogger(__name__)
+
+# Default account limits, overridable from the environment
+DEFAULT_MAX_REQUESTS_PER_MINUTE = 500
+DEFAULT_MAX_TOKENS_PER_MINUTE = 200000
+
+# Retry settings for rate-limited requests
+RATE_LIMIT_MAX_RETRIES = 5
+RATE_LIMIT_BASE_DELAY_SECONDS = 1.0
+
+# Rough characters-per-token ratio for English prompts
+CHARS_PER_TOKEN = 4
+
+
+def estimate_request_tokens(request: Dict[str, Any]) -> int:
+    """Estimate the tokens a chat completion request consumes: prompt plus completion budget."""
+    prompt_chars = sum(len(message.get("content") or "") for message in request.get("messages", []))
+    return prompt_chars // CHARS_PER_TOKEN + int(request.get("max_tokens") or 0)
+
+
+class AsyncOpenAIPool:
+    """
+    Shared request and token budget for chat completion calls.
+    
+    Capacity refills continuously up to one minute's worth of the account's
+    limits. Each submit waits until both buckets can cover the request, and a
+    429 pauses every caller before the request is retried. Capacity is refilled
+    on demand rather than by a background task, so one pool can serve the
+    short-lived event loops Flask creates for async views.
+    """
+    
+    def __init__(
+        self,
+        max_requests_per_minute: int = DEFAULT_MAX_REQUESTS_PER_MINUTE,
+        max_tokens_per_minute: int = DEFAULT_MAX_TOKENS_PER_MINUTE,
+        max_retries: int = RATE_LIMIT_MAX_RETRIES
+    ):
+        """
+        Create a pool with full capacity.
+        
+        Args:
+            max_requests_per_minute: Account requests-per-minute limit
+            max_tokens_per_minute: Account tokens-per-minute limit
+            max_retries: Retries of a rate-limited request before giving up
+        """
+        self.max_requests_per_minute = max_requests_per_minute
+        self.max_tokens_per_minute = max_tokens_per_minute
+        self.max_retries = max_retries
+        self.available_request_capacity = float(max_requests_per_minute)
+        self.available_token_capacity = float(max_tokens_per_minute)
+        self.rate_limit_errors = 0
+        self._last_refill = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls) -> "AsyncOpenAIPool":
+        """Create a pool sized by OPENAI_MAX_REQUESTS_PER_MINUTE and OPENAI_MAX_TOKENS_PER_MINUTE."""
+        return cls(
+            max_requests_per_minute=int(os.getenv(
+                "OPENAI_MAX_REQUESTS_PER_MINUTE", DEFAULT_MAX_REQUESTS_PER_MINUTE
+            )),
+            max_tokens_per_minute=int(os.getenv(
+                "OPENAI_MAX_TOKENS_PER_MINUTE", DEFAULT_MAX_TOKENS_PER_MINUTE
+            ))
+        )
+    
+    async def submit(self, client: "openai.AsyncOpenAI", request: Dict[str, Any]) -> Any:
+        """
+        Send a chat completion request once capacity allows, retrying on rate limits.
+        
+        Args:
+            client: AsyncOpenAI client for the running event loop
+            request: Keyword arguments for chat.completions.create
+        
+        Returns:
+            The chat completion (or stream, if the request sets stream=True)
+        """
+        import openai
+        
+        tokens = estimate_request_tokens(request)
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(tokens)
+            try:
+                return await client.chat.completions.create(**request)
+            except openai.RateLimitError as e:
+                if attempt == self.max_retries:
+                    logger.error("OpenAI rate limit retries exhausted: %s", e)
+                    raise
+                delay = self._retry_after(e)
+                if delay is None:
+                    delay = RATE_LIMIT_BASE_DELAY_SECONDS * (2 ** attempt) * (1 + random.random())
+                logger.warning("OpenAI rate limit hit, pausing requests for %.1fs", delay)
+                with self._lock:
+                    self.rate_limit_errors += 1
+                    self._paused_until = max(self._paused_until, time.monotonic() + delay)
+    
+    async def _acquire(self, tokens: int) -> None:
+        """Wait until the pool is not paused and both buckets can cover the request."""
+        # A request larger than a whole minute's budget would otherwise wait forever
+        tokens = min(tokens, self.max_tokens_per_minute)
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self._paused_until and self.available_request_capacity >= 1 \
+                        and self.available_token_capacity >= tokens:
+                    self.available_request_capacity -= 1
+                    self.available_token_capacity -= tokens
+                    return
+                wait = max(
+                    self._paused_until - now,
+                    (1 - self.available_request_capacity) * 60.0 / self.max_requests_per_minute,
+                    (tokens - self.available_token_capacity) * 60.0 / self.max_tokens_per_minute,
+                    0.001
+                )
+            await asyncio.sleep(wait)
+    
+    def _refill(self, now: float) -> None:
+        """Add the capacity earned since the last refill, capped at one minute's worth."""
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        self.available_request_capacity = min(
+            self.max_requests_per_minute,
+            self.available_request_capacity + self.max_requests_per_minute * elapsed / 60.0
+        )
+        self.available_token_capacity = min(
+            self.max_tokens_per_minute,
+            self.available_token_capacity + self.max_tokens_per_minute * elapsed / 60.0
+        )
+    
+    @staticmethod
+    def _retry_after(error: Exception) -> Optional[float]:
+        """Seconds the server asked us to wait, from the Retry-After header if present."""
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        try:
+            return float(headers.get("retry-after")) if headers is not None else None
+        except (TypeError, ValueError):
+            return None
+    
+    def stats(self) -> Dict[str, Any]:
+        """Remaining capacity and rate limit counters, suitable for a health endpoint."""
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'max_requests_per_minute': self.max_requests_per_minute,
+                'max_tokens_per_minute': self.max_tokens_per_minute,
+                'available_request_capacity': int(self.available_request_capacity),
+                'available_token_capacity': int(self.available_token_capacity),
+                'rate_limit_errors': self.rate_limit_errors
+            }
@@ -5,14 +5,125 @@ Handles charts, tables, and formatted content generation.
 """
 
 import logging
-from typing import Dict, Any, List, Optional
+from types import MappingProxyType
+from typing import Callable, Dict, Any, List, Mapping, Optional, Tuple
 from datetime import datetime
 import json
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+import numpy as np
+
+# orjson is optional; the stdlib json module is used when it is not installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Characters replaced when interpolating report values into HTML, built once for str.translate
+_HTML_ESCAPE = str.maketrans({
+    '&': '&amp;',
+    '<': '&lt;',
+    '>': '&gt;',
+    '"': '&quot;',
+    "'": '&#39;'
+})
+
+
+# Rendering options per chart type; shared read-only views, never rebuilt per chart
+_CHART_OPTIONS = MappingProxyType({
+    'bar': MappingProxyType({
+        'orientation': 'vertical',
+        'show_grid': True,
+        'show_labels': True
+    }),
+    'line': MappingProxyType({
+        'show_points': True,
+        'show_grid': True,
+        'smooth': False
+    }),
+    'pie': MappingProxyType({
+        'show_percentages': True,
+        'show_labels': True,
+        'donut': False
+    })
+})
+
+_NO_CHART_OPTIONS = MappingProxyType({})
+
+# Canvas and Chart.js call for one chart, filled in with str.format; values in
+# the <script> must already be JSON from _script_json
+_CHART_BLOCK = (
+    '<div class="chart-container"><h3>{title}</h3><canvas id="chart{index}"></canvas></div>'
+    '<script>const ctx{index}=document.getElementById("chart{index}").getContext("2d");'
+    'new Chart(ctx{index},{{type:{type_json},data:{{labels:{labels_json},datasets:{datasets_json}}},'
+    'options:{{responsive:true,maintainAspectRatio:false,'
+    'plugins:{{title:{{display:true,text:{title_json}}}}}}}}});</script>'
+)
+
+# Page skeleton of the HTML preview, built once; filled in with str.format_map
+_HTML_HEAD = """
+            <!DOCTYPE html>
+            <html lang="en">
+            <head>
+                <meta charset="UTF-8">
+                <meta name="viewport" content="width=device-width, initial-scale=1.0">
+                <title>{page_title}</title>
+                <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
+                <style>
+                    body {{ font-family: 'Times New Roman', serif; margin: 40px; background: #f9f9f9; }}
+                    .report-container {{ max-width: 1200px; margin: 0 auto; background: white; padding: 40px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
+                    .report-header {{ text-align: center; border-bottom: 2px solid #333; padding-bottom: 20px; margin-bottom: 30px; }}
+                    .report-title {{ font-size: 28px; font-weight: bold; color: #333; margin-bottom: 10px; }}
+                    .report-meta {{ color: #666; font-size: 14px; }}
+                    .section {{ margin-bottom: 40px; }}
+                    .section-title {{ font-size: 20px; font-weight: bold; color: #333; border-bottom: 1px solid #ddd; padding-bottom: 10px; margin-bottom: 20px; }}
+                    .kpi-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 20px; }}
+                    .kpi-card {{ background: #f8f9fa; border: 1px solid #dee2e6; border-radius: 8px; padding: 20px; text-align: center; }}
+                    .kpi-value {{ font-size: 24px; font-weight: bold; color: #007bff; margin-bottom: 5px; }}
+                    .kpi-label {{ color: #666; font-size: 14px; }}
+                    .chart-container {{ margin: 20px 0; height: 400px; }}
+                    .table-container {{ overflow-x: auto; margin: 20px 0; }}
+                    table {{ width: 100%; border-collapse: collapse; }}
+                    th, td {{ border: 1px solid #ddd; padding: 12px; text-align: left; }}
+                    th {{ background-color: #f8f9fa; font-weight: bold; }}
+                    .narrative-item {{ background: #f8f9fa; border-left: 4px solid #007bff; padding: 15px; margin: 10px 0; }}
+                    .error {{ color: #dc3545; background: #f8d7da; padding: 10px; border-radius: 4px; }}
+                </style>
+            </head>
+            <body>
+                <div class="report-container">
+                    <div class="report-header">
+                        <div class="report-title">{report_title}</div>
+                        <div class="report-meta">Generated on {generated_at}</div>
+                        {description}
+                    </div>
+            """
+
+_HTML_TAIL = """
+                </div>
+            </body>
+            </html>
+            """
+
+
+def _escape_html(value: Any) -> str:
+    """Render a value as HTML-safe text."""
+    return str(value).translate(_HTML_ESCAPE)
+
+
+def _script_json(value: Any) -> str:
+    """Serialize a value as compact JSON that can't close the surrounding <script> tag."""
+    if orjson is not None:
+        try:
+            text = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY).decode("utf-8")
+        except TypeError:
+            # Values orjson rejects (e.g. integers beyond 64 bits) still serialize with the stdlib
+            text = json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+    else:
+        text = json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+    return text.replace('</', '<\\/')
+
 
 class ReportRenderer:
     """Renders ReportSpec objects into visual reports."""
@@ -22,6 +133,19 @@ class ReportRenderer:
             '#1f77b4', '#ff7f0e', '#2ca02c', '#d62728', '#9467bd',
             '#8c564b', '#e377c2', '#7f7f7f', '#bcbd22', '#17becf'
         ]
+        # Leading colors for a chart with n series at index n, shared by every chart
+        self._color_slices = tuple(tuple(self.chart_colors[:n]) for n in range(len(self.chart_colors) + 1))
+        # Parsed sample values per column dict, keyed by id(); the dict is kept
+        # alongside its array so the id can't be reused while the entry lives
+        self._numeric_cache: Dict[int, Tuple[Dict[str, Any], Optional[np.ndarray]]] = {}
+        # KPI metric name -> handler taking the column's profile dict
+        self._kpi_handlers: Dict[str, Callable[[Dict[str, Any]], Any]] = {
+            'count': self._kpi_count,
+            'sum': self._kpi_sum,
+            'avg': self._kpi_avg,
+            'min': self._kpi_min,
+            'max': self._kpi_max
+        }
     
     def render_report(self, report_spec: Dict[str, Any], data_profile: Dict[str, Any]) -> Dict[str, Any]:
         """Render a complete report from specification and data profile."""
@@ -33,22 +157,25 @@ class ReportRenderer:
                 'sections': []
             }
             
+            # Index the profile's columns once for every KPI, chart and table lookup
+            columns_by_name = self._index_columns(data_profile)
+            
             # Render KPIs section
             if report_spec.get('kpis'):
                 rendered_report['sections'].append(
-                    self._render_kpis_section(report_spec['kpis'], data_profile)
+                    self._render_kpis_section(report_spec['kpis'], data_profile, columns_by_name)
                 )
             
             # Render charts section
             if report_spec.get('charts'):
                 rendered_report['sections'].append(
-                    self._render_charts_section(report_spec['charts'], data_profile)
+                    self._render_charts_section(report_spec['charts'], data_profile, columns_by_name)
                 )
             
             # Render tables section
             if report_spec.get('tables'):
                 rendered_report['sections'].append(
-                    self._render_tables_section(report_spec['tables'], data_profile)
+                    self._render_tables_section(report_spec['tables'], data_profile, columns_by_name)
                 )
             
             # Render narrative section
@@ -58,16 +185,26 @@ class ReportRenderer:
                 )
             
             return rendered_report
-            
+        
         except Exception as e:
-            logger.error(f"Error rendering report: {e}")
+            logger.error("Error rendering report: %s", e)
             return {
                 'error': f'Failed to render report: {str(e)}',
                 'title': 'Report Generation Failed'
             }
     
-    def _render_kpis_section(self, kpis: List[Dict[str, Any]], data_profile: Dict[str, Any]) -> Dict[str, Any]:
+    def _index_columns(self, data_profile: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+        """Map column names to their profile dicts; the first column wins on duplicate names."""
+        columns_by_name = {}
+        for col in data_profile.get('columns', []):
+            columns_by_name.setdefault(col.get('name'), col)
+        return columns_by_name
+    
+    def _render_kpis_section(self, kpis: List[Dict[str, Any]], data_profile: Dict[str, Any],
+                             columns_by_name: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """Render the KPIs section with calculated metrics."""
+        if columns_by_name is None:
+            columns_by_name = self._index_columns(data_profile)
         section = {
             'type': 'kpis',
             'title': 'Key Performance Indicators',
@@ -78,7 +215,7 @@ class ReportRenderer:
         for i, kpi in enumerate(kpis):
             try:
                 # Calculate the actual metric value based on data profile
-                calculated_value = self._calculate_kpi_value(kpi, data_profile)
+                calculated_value = self._calculate_kpi_value(kpi, data_profile, columns_by_name)
                 
                 kpi_content = {
                     'label': kpi.get('label', f'KPI {i+1}'),
@@ -90,9 +227,9 @@ class ReportRenderer:
                 }
                 
                 section['content'].append(kpi_content)
-                
+            
             except Exception as e:
-                logger.warning(f"Error rendering KPI {i}: {e}")
+                logger.warning("Error rendering KPI %s: %s", i, e)
                 section['content'].append({
                     'label': kpi.get('label', f'KPI {i+1}'),
                     'value': 'Error calculating',
@@ -101,8 +238,11 @@ class ReportRenderer:
         
         return section
     
-    def _render_charts_section(self, charts: List[Dict[str, Any]], data_profile: Dict[str, Any]) -> Dict[str, Any]:
+    def _render_charts_section(self, charts: List[Dict[str, Any]], data_profile: Dict[str, Any],
+                               columns_by_name: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """Render the charts section with chart specifications."""
+        if columns_by_name is None:
+            columns_by_name = self._index_columns(data_profile)
         section = {
             'type': 'charts',
             'title': 'Data Visualizations',
@@ -112,20 +252,22 @@ class ReportRenderer:
         
         for i, chart in enumerate(charts):
             try:
+                series = chart.get('series', [])
                 chart_content = {
                     'type': chart.get('type', 'bar'),
                     'title': chart.get('title', f'Chart {i+1}'),
                     'x_axis': chart.get('x', {}),
-                    'series': chart.get('series', []),
-                    'chart_data': self._generate_chart_data(chart, data_profile),
-                    'color_scheme': self.chart_colors[:len(chart.get('series', []))],
-                    'chart_options': self._get_chart_options(chart)
+                    'series': series,
+                    'chart_data': self._generate_chart_data(chart, data_profile, columns_by_name),
+                    'color_scheme': self._color_slices[min(len(series), len(self._color_slices) - 1)],
+                    # Copied so the rendered report stays plain JSON-serializable dicts
+                    'chart_options': dict(self._get_chart_options(chart))
                 }
                 
                 section['content'].append(chart_content)
-                
+            
             except Exception as e:
-                logger.warning(f"Error rendering chart {i}: {e}")
+                logger.warning("Error rendering chart %s: %s", i, e)
                 section['content'].append({
                     'title': chart.get('title', f'Chart {i+1}'),
                     'error': f'Failed to render chart: {str(e)}'
@@ -133,8 +275,11 @@ class ReportRenderer:
         
         return section
     
-    def _render_tables_section(self, tables: List[Dict[str, Any]], data_profile: Dict[str, Any]) -> Dict[str, Any]:
+    def _render_tables_section(self, tables: List[Dict[str, Any]], data_profile: Dict[str, Any],
+                               columns_by_name: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
         """Render the tables section with formatted data tables."""
+        if columns_by_name is None:
+            columns_by_name = self._index_columns(data_profile)
         section = {
             'type': 'tables',
             'title': 'Data Tables',
@@ -147,15 +292,15 @@ class ReportRenderer:
                 table_content = {
                     'title': table.get('title', f'Table {i+1}'),
                     'columns': table.get('columns', []),
-                    'data': self._generate_table_data(table, data_profile),
+                    'data': self._generate_table_data(table, data_profile, columns_by_name),
                     'sort_options': table.get('sort', {}),
                     'limit': table.get('limit', 10)
                 }
                 
                 section['content'].append(table_content)
-                
+            
             except Exception as e:
-                logger.warning(f"Error rendering table {i}: {e}")
+                logger.warning("Error rendering table %s: %s", i, e)
                 section['content'].append({
                     'title': table.get('title', f'Table {i+1}'),
                     'error': f'Failed to render table: {str(e)}'
@@ -180,7 +325,8 @@ class ReportRenderer:
         
         return section
     
-    def _calculate_kpi_value(self, kpi: Dict[str, Any], data_profile: Dict[str, Any]) -> Any:
+    def _calculate_kpi_value(self, kpi: Dict[str, Any], data_profile: Dict[str, Any],
+                             columns_by_name: Optional[Dict[str, Dict[str, Any]]] = None) -> Any:
         """Calculate the actual value for a KPI based on the data profile."""
         metric_type = kpi.get('metric', 'count')
         column_name = kpi.get('column', '')
@@ -189,102 +335,125 @@ class ReportRenderer:
             return 'No column specified'
         
         # Find the column in the data profile
-        column_data = None
-        for col in data_profile.get('columns', []):
-            if col.get('name') == column_name:
-                column_data = col
-                break
+        if columns_by_name is None:
+            columns_by_name = self._index_columns(data_profile)
+        column_data = columns_by_name.get(column_name)
         
         if not column_data:
             return f'Column "{column_name}" not found'
         
-        # Calculate based on metric type
-        if metric_type == 'count':
-            return column_data.get('stats', {}).get('total_count', 0)
-        elif metric_type == 'sum':
-            # For numeric columns, try to calculate sum
-            if column_data.get('type') == 'number':
-                sample_values = column_data.get('sampleValues', [])
-                try:
-                    numeric_values = [float(str(v).replace(',', '')) for v in sample_values if v]
-                    return sum(numeric_values) if numeric_values else 0
-                except:
-                    return 'Cannot calculate sum'
-            return 'Column is not numeric'
-        elif metric_type == 'avg':
-            if column_data.get('type') == 'number':
-                stats = column_data.get('stats', {})
-                return stats.get('mean', 0)
-            return 'Column is not numeric'
-        elif metric_type == 'min':
-            if column_data.get('type') == 'number':
-                stats = column_data.get('stats', {})
-                return stats.get('min', 0)
+        handler = self._kpi_handlers.get(metric_type)
+        if handler is None:
+            return f'Unknown metric type: {metric_type}'
+        return handler(column_data)
+    
+    def _kpi_count(self, column_data: Dict[str, Any]) -> Any:
+        """Number of values the profile counted in the column."""
+        return column_data.get('stats', {}).get('total_count', 0)
+    
+    def _kpi_sum(self, column_data: Dict[str, Any]) -> Any:
+        """Sum of a numeric column's sample values."""
+        if column_data.get('type') != 'number':
             return 'Column is not numeric'
-        elif metric_type == 'max':
-            if column_data.get('type') == 'number':
-                stats = column_data.get('stats', {})
-                return stats.get('max', 0)
+        values = self._numeric_array(column_data)
+        if values is None:
+            return 'Cannot calculate sum'
+        return float(values.sum()) if values.size else 0
+    
+    def _kpi_avg(self, column_data: Dict[str, Any]) -> Any:
+        """Mean of a numeric column."""
+        return self._kpi_reduce(column_data, np.mean, 'mean')
+    
+    def _kpi_min(self, column_data: Dict[str, Any]) -> Any:
+        """Minimum of a numeric column."""
+        return self._kpi_reduce(column_data, np.min, 'min')
+    
+    def _kpi_max(self, column_data: Dict[str, Any]) -> Any:
+        """Maximum of a numeric column."""
+        return self._kpi_reduce(column_data, np.max, 'max')
+    
+    def _kpi_reduce(self, column_data: Dict[str, Any], reduce: Callable[[np.ndarray], Any], stats_key: str) -> Any:
+        """Reduce a numeric column's samples, falling back to its profiled stats."""
+        if column_data.get('type') != 'number':
             return 'Column is not numeric'
-        else:
-            return f'Unknown metric type: {metric_type}'
+        values = self._numeric_array(column_data)
+        if values is not None and values.size:
+            return float(reduce(values))
+        return column_data.get('stats', {}).get(stats_key, 0)
     
-    def _generate_chart_data(self, chart: Dict[str, Any], data_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _numeric_array(self, column_data: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Non-empty sample values of a column as floats, parsed once per column.
+        
+        Thousands separators are dropped from strings; ints and floats are taken
+        as they are. Returns None if any value isn't a number.
+        """
+        cached = self._numeric_cache.get(id(column_data))
+        if cached is not None and cached[0] is column_data:
+            return cached[1]
+        
+        numbers = []
+        try:
+            for v in column_data.get('sampleValues', []):
+                if v is None or v == '':
+                    continue
+                if isinstance(v, (int, float)):
+                    numbers.append(v)
+                else:
+                    numbers.append(float(str(v).replace(',', '')))
+            values = np.array(numbers, dtype=np.float64)
+        except ValueError:
+            values = None
+        self._numeric_cache[id(column_data)] = (column_data, values)
+        return values
+    
+    def _generate_chart_data(self, chart: Dict[str, Any], data_profile: Dict[str, Any],
+                             columns_by_name: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
         """Generate sample chart data based on chart specification and data profile."""
         chart_type = chart.get('type', 'bar')
         x_column = chart.get('x', {}).get('column', '')
         
         # Find the x-axis column
-        x_column_data = None
-        for col in data_profile.get('columns', []):
-            if col.get('name') == x_column:
-                x_column_data = col
-                break
+        if columns_by_name is None:
+            columns_by_name = self._index_columns(data_profile)
+        x_column_data = columns_by_name.get(x_column)
         
         if not x_column_data:
             return [{'error': f'X-axis column "{x_column}" not found'}]
         
+        # Resolve each series' values once; a series without a column gets placeholder
+        # values and one whose column is missing gets 0s
+        series_values = []
+        for j, series in enumerate(chart.get('series', [])[:3]):  # Limit to 3 series
+            series_column = series.get('column', '')
+            if not series_column:
+                values = range(0, 50, 10)  # Fallback value i * 10 for the 5 preview points
+            else:
+                col = columns_by_name.get(series_column)
+                values = col.get('sampleValues', []) if col is not None else ()
+            series_values.append((f'y{j+1}', values))
+        
         # Generate sample data points
         sample_values = x_column_data.get('sampleValues', [])
         chart_data = []
         
         for i, value in enumerate(sample_values[:5]):  # Limit to 5 data points for preview
             data_point = {'x': value}
-            
-            # Add series data
-            for j, series in enumerate(chart.get('series', [])[:3]):  # Limit to 3 series
-                series_column = series.get('column', '')
-                if series_column:
-                    # Find series column data
-                    for col in data_profile.get('columns', []):
-                        if col.get('name') == series_column:
-                            series_values = col.get('sampleValues', [])
-                            if i < len(series_values):
-                                data_point[f'y{j+1}'] = series_values[i]
-                            else:
-                                data_point[f'y{j+1}'] = 0
-                            break
-                    else:
-                        data_point[f'y{j+1}'] = 0
-                else:
-                    data_point[f'y{j+1}'] = i * 10  # Fallback value
-            
+            for y_key, values in series_values:
+                data_point[y_key] = values[i] if i < len(values) else 0
             chart_data.append(data_point)
         
         return chart_data
     
-    def _generate_table_data(self, table: Dict[str, Any], data_profile: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _generate_table_data(self, table: Dict[str, Any], data_profile: Dict[str, Any],
+                             columns_by_name: Optional[Dict[str, Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
         """Generate sample table data based on table specification and data profile."""
         columns = table.get('columns', [])
         limit = table.get('limit', 10)
         
         # Find the columns in the data profile
-        column_data = {}
-        for col_name in columns:
-            for col in data_profile.get('columns', []):
-                if col.get('name') == col_name:
-                    column_data[col_name] = col
-                    break
+        if columns_by_name is None:
+            columns_by_name = self._index_columns(data_profile)
+        column_data = {col_name: columns_by_name[col_name] for col_name in columns if col_name in columns_by_name}
         
         # Generate sample rows
         table_data = []
@@ -307,154 +476,99 @@ class ReportRenderer:
         
         return table_data
     
-    def _get_chart_options(self, chart: Dict[str, Any]) -> Dict[str, Any]:
-        """Get chart-specific rendering options."""
-        chart_type = chart.get('type', 'bar')
-        
-        if chart_type == 'bar':
-            return {
-                'orientation': 'vertical',
-                'show_grid': True,
-                'show_labels': True
-            }
-        elif chart_type == 'line':
-            return {
-                'show_points': True,
-                'show_grid': True,
-                'smooth': False
-            }
-        elif chart_type == 'pie':
-            return {
-                'show_percentages': True,
-                'show_labels': True,
-                'donut': False
-            }
-        else:
-            return {}
+    def _get_chart_options(self, chart: Dict[str, Any]) -> Mapping[str, Any]:
+        """Get chart-specific rendering options (read-only; copy before mutating)."""
+        return _CHART_OPTIONS.get(chart.get('type', 'bar'), _NO_CHART_OPTIONS)
     
     def generate_html_preview(self, rendered_report: Dict[str, Any]) -> str:
         """Generate an HTML preview of the rendered report."""
         try:
-            html = f"""
-            <!DOCTYPE html>
-            <html lang="en">
-            <head>
-                <meta charset="UTF-8">
-                <meta name="viewport" content="width=device-width, initial-scale=1.0">
-                <title>{rendered_report.get('title', 'Report Preview')}</title>
-                <script src="https://cdn.jsdelivr.net/npm/chart.js"></script>
-                <style>
-                    body {{ font-family: 'Times New Roman', serif; margin: 40px; background: #f9f9f9; }}
-                    .report-container {{ max-width: 1200px; margin: 0 auto; background: white; padding: 40px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); }}
-                    .report-header {{ text-align: center; border-bottom: 2px solid #333; padding-bottom: 20px; margin-bottom: 30px; }}
-                    .report-title {{ font-size: 28px; font-weight: bold; color: #333; margin-bottom: 10px; }}
-                    .report-meta {{ color: #666; font-size: 14px; }}
-                    .section {{ margin-bottom: 40px; }}
-                    .section-title {{ font-size: 20px; font-weight: bold; color: #333; border-bottom: 1px solid #ddd; padding-bottom: 10px; margin-bottom: 20px; }}
-                    .kpi-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(200px, 1fr)); gap: 20px; margin-bottom: 20px; }}
-                    .kpi-card {{ background: #f8f9fa; border: 1px solid #dee2e6; border-radius: 8px; padding: 20px; text-align: center; }}
-                    .kpi-value {{ font-size: 24px; font-weight: bold; color: #007bff; margin-bottom: 5px; }}
-                    .kpi-label {{ color: #666; font-size: 14px; }}
-                    .chart-container {{ margin: 20px 0; height: 400px; }}
-                    .table-container {{ overflow-x: auto; margin: 20px 0; }}
-                    table {{ width: 100%; border-collapse: collapse; }}
-                    th, td {{ border: 1px solid #ddd; padding: 12px; text-align: left; }}
-                    th {{ background-color: #f8f9fa; font-weight: bold; }}
-                    .narrative-item {{ background: #f8f9fa; border-left: 4px solid #007bff; padding: 15px; margin: 10px 0; }}
-                    .error {{ color: #dc3545; background: #f8d7da; padding: 10px; border-radius: 4px; }}
-                </style>
-            </head>
-            <body>
-                <div class="report-container">
-                    <div class="report-header">
-                        <div class="report-title">{rendered_report.get('title', 'Generated Report')}</div>
-                        <div class="report-meta">Generated on {rendered_report.get('generated_at', 'Unknown date')}</div>
-                        {f'<div class="report-meta">{rendered_report.get("description", "")}</div>' if rendered_report.get('description') else ''}
-                    </div>
-            """
-            
-            # Render each section
-            for section in rendered_report.get('sections', []):
-                html += self._render_section_html(section)
-            
-            html += """
-                </div>
-            </body>
-            </html>
-            """
-            
-            return html
-            
+            parts = []
+            self.stream_html_preview(rendered_report, parts.append)
+            return ''.join(parts)
+        
         except Exception as e:
-            logger.error(f"Error generating HTML preview: {e}")
-            return f"<html><body><h1>Error generating preview</h1><p>{str(e)}</p></body></html>"
+            logger.error("Error generating HTML preview: %s", e)
+            return f"<html><body><h1>Error generating preview</h1><p>{_escape_html(e)}</p></body></html>"
+    
+    def stream_html_preview(self, rendered_report: Dict[str, Any], write: Callable[[str], Any]) -> None:
+        """
+        Write the HTML preview piece by piece instead of building the whole page.
+        
+        Args:
+            rendered_report: Report returned by render_report
+            write: Called with each successive chunk of the page, e.g. a file's write method
+        """
+        description = rendered_report.get('description')
+        write(_HTML_HEAD.format_map({
+            'page_title': _escape_html(rendered_report.get('title', 'Report Preview')),
+            'report_title': _escape_html(rendered_report.get('title', 'Generated Report')),
+            'generated_at': _escape_html(rendered_report.get('generated_at', 'Unknown date')),
+            'description': f'<div class="report-meta">{_escape_html(description)}</div>' if description else ''
+        }))
+        
+        # Render each section
+        for section in rendered_report.get('sections', []):
+            self._write_section_html(section, write)
+        
+        write(_HTML_TAIL)
     
     def _render_section_html(self, section: Dict[str, Any]) -> str:
         """Render a single section as HTML."""
+        parts = []
+        self._write_section_html(section, parts.append)
+        return ''.join(parts)
+    
+    def _write_section_html(self, section: Dict[str, Any], write: Callable[[str], Any]) -> None:
+        """Write a single section as HTML, one chunk per item."""
         section_type = section.get('type', 'unknown')
         title = section.get('title', 'Section')
         content = section.get('content', [])
         
-        html = f'<div class="section"><div class="section-title">{title}</div>'
+        write(f'<div class="section"><div class="section-title">{_escape_html(title)}</div>')
         
         if section_type == 'kpis':
-            html += '<div class="kpi-grid">'
+            write('<div class="kpi-grid">')
             for kpi in content:
                 if 'error' in kpi:
-                    html += f'<div class="kpi-card error">{kpi["error"]}</div>'
+                    write(f'<div class="kpi-card error">{_escape_html(kpi["error"])}</div>')
                 else:
-                    html += f'''
+                    write(f'''
                     <div class="kpi-card">
-                        <div class="kpi-value">{kpi.get("value", "N/A")}</div>
-                        <div class="kpi-label">{kpi.get("label", "Unknown")}</div>
+                        <div class="kpi-value">{_escape_html(kpi.get("value", "N/A"))}</div>
+                        <div class="kpi-label">{_escape_html(kpi.get("label", "Unknown"))}</div>
                     </div>
-                    '''
-            html += '</div>'
-            
+                    ''')
+            write('</div>')
+        
         elif section_type == 'charts':
             for i, chart in enumerate(content):
                 if 'error' in chart:
-                    html += f'<div class="error">{chart["error"]}</div>'
+                    write(f'<div class="error">{_escape_html(chart["error"])}</div>')
                 else:
-                    html += f'''
-                    <div class="chart-container">
-                        <h3>{chart.get("title", "Chart")}</h3>
-                        <canvas id="chart{i}"></canvas>
-                    </div>
-                    <script>
-                        const ctx{i} = document.getElementById('chart{i}').getContext('2d');
-                        new Chart(ctx{i}, {{
-                            type: '{chart.get("type", "bar")}',
-                            data: {{
-                                labels: {json.dumps([d.get("x", "") for d in chart.get("chart_data", [])])},
-                                datasets: {json.dumps(self._generate_chart_datasets(chart))}
-                            }},
-                            options: {{
-                                responsive: true,
-                                maintainAspectRatio: false,
-                                plugins: {{
-                                    title: {{
-                                        display: true,
-                                        text: '{chart.get("title", "Chart")}'
-                                    }}
-                                }}
-                            }}
-                        }});
-                    </script>
-                    '''
-                    
+                    labels_json = _script_json([d.get("x", "") for d in chart.get("chart_data", [])])
+                    datasets_json = _script_json(self._generate_chart_datasets(chart))
+                    write(_CHART_BLOCK.format(
+                        index=i,
+                        title=_escape_html(chart.get("title", "Chart")),
+                        type_json=_script_json(chart.get("type", "bar")),
+                        labels_json=labels_json,
+                        datasets_json=datasets_json,
+                        title_json=_script_json(chart.get("title", "Chart"))
+                    ))
+        
         elif section_type == 'tables':
             for table in content:
                 if 'error' in table:
-                    html += f'<div class="error">{table["error"]}</div>'
+                    write(f'<div class="error">{_escape_html(table["error"])}</div>')
                 else:
-                    html += f'''
+                    write(f'''
                     <div class="table-container">
-                        <h3>{table.get("title", "Table")}</h3>
+                        <h3>{_escape_html(table.get("title", "Table"))}</h3>
                         <table>
                             <thead>
                                 <tr>
-                                    {''.join([f'<th>{col}</th>' for col in table.get("columns", [])])}
+                                    {''.join([f'<th>{_escape_html(col)}</th>' for col in table.get("columns", [])])}
                                 </tr>
                             </thead>
                             <tbody>
@@ -462,18 +576,17 @@ class ReportRenderer:
                             </tbody>
                         </table>
                     </div>
-                    '''
-                    
+                    ''')
+        
         elif section_type == 'narrative':
             for item in content:
-                html += f'''
+                write(f'''
                 <div class="narrative-item">
-                    <strong>Insight:</strong> {item.get("insight", "No insight provided")}
+                    <strong>Insight:</strong> {_escape_html(item.get("insight", "No insight provided"))}
                 </div>
-                '''
+                ''')
         
-        html += '</div>'
-        return html
+        write('</div>')
     
     def _generate_chart_datasets(self, chart: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Generate Chart.js datasets from chart data."""
@@ -483,10 +596,18 @@ class ReportRenderer:
         # Count how many y-series we have
         y_keys = [k for k in chart_data[0].keys() if k.startswith('y')] if chart_data else []
         
+        # Transpose the rows into one list per series in a single pass; rows missing a series keep 0
+        series_data = {y_key: [0] * len(chart_data) for y_key in y_keys}
+        for row_index, row in enumerate(chart_data):
+            for key, value in row.items():
+                values = series_data.get(key)
+                if values is not None:
+                    values[row_index] = value
+        
         for i, y_key in enumerate(y_keys):
             dataset = {
                 'label': f'Series {i+1}',
-                'data': [row.get(y_key, 0) for row in chart_data],
+                'data': series_data[y_key],
                 'backgroundColor': chart.get('color_scheme', self.chart_colors)[i % len(self.chart_colors)],
                 'borderColor': chart.get('color_scheme', self.chart_colors)[i % len(self.chart_colors)],
                 'borderWidth': 1
@@ -504,16 +625,8 @@ class ReportRenderer:
     
     def _generate_table_rows_html(self, table: Dict[str, Any]) -> str:
         """Generate HTML for table rows."""
-        rows_html = ""
         columns = table.get("columns", [])
-        data = table.get("data", [])
-        
-        for row in data:
-            row_html = "<tr>"
-            for col in columns:
-                cell_value = row.get(col, '')
-                row_html += f"<td>{cell_value}</td>"
-            row_html += "</tr>"
-            rows_html += row_html
-        
-        return rows_html
+        return ''.join(
+            '<tr>' + ''.join([f"<td>{_escape_html(row.get(col, ''))}</td>" for col in columns]) + '</tr>'
+            for row in table.get("data", [])
+        )
@@ -8,8 +8,6 @@ from typing import Dict, Any, List, Tuple
 from datetime import datetime
 import re
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
@@ -176,7 +174,7 @@ class ReportTypeSuggester:
             return suggestions
             
         except Exception as e:
-            logger.error(f"Error suggesting report types: {e}")
+            logger.error("Error suggesting report types: %s", e)
             return []
     
     def _calculate_confidence(self, pattern: Dict[str, Any], column_names: List[str], 
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+In-process semantic cache for LLM responses.
+Matches near-duplicate requests by cosine similarity of their embeddings.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Hashable, Optional, Sequence, Tuple, TYPE_CHECKING
+
+# numpy is imported inside the methods that compare embeddings, so importing
+# this module (and the planner with it) stays cheap until the cache is used
+if TYPE_CHECKING:
+    import numpy as np
+
+
+class SemanticCache:
+    """
+    Thread-safe LRU cache of LLM responses looked up by embedding similarity.
+    
+    Every entry carries a signature (for example the data layout) that must
+    match exactly; among entries with the same signature, the most similar
+    embedding wins if it reaches the similarity threshold.
+    """
+    
+    def __init__(
+        self,
+        min_similarity: float = 0.92,
+        max_entries: int = 512,
+        ttl_seconds: Optional[float] = None
+    ):
+        """
+        Create an empty cache.
+        
+        Args:
+            min_similarity: Lowest cosine similarity that counts as a hit
+            max_entries: Maximum number of responses kept; least recently used go first
+            ttl_seconds: Lifetime of an entry, or None to keep entries until evicted
+        """
+        self.min_similarity = min_similarity
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[int, Tuple[Hashable, np.ndarray, Any, Optional[float]]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> "np.ndarray":
+        """Return the embedding as a unit-length float32 vector."""
+        import numpy as np
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+    
+    def get(self, embedding: Sequence[float], signature: Hashable) -> Optional[Tuple[Any, float]]:
+        """
+        Find the cached value whose embedding is most similar to this one.
+        
+        Args:
+            embedding: Embedding of the new request
+            signature: Value that a cached entry's signature must equal
+        
+        Returns:
+            (value, similarity) for the best match at or above min_similarity, or None
+        """
+        import numpy as np
+        query = self._normalize(embedding)
+        with self._lock:
+            now = time.monotonic()
+            expired = [entry_id for entry_id, (_, _, _, expires_at) in self._entries.items()
+                       if expires_at is not None and expires_at <= now]
+            for entry_id in expired:
+                del self._entries[entry_id]
+            
+            candidates = [(entry_id, vector) for entry_id, (entry_signature, vector, _, _)
+                          in self._entries.items() if entry_signature == signature]
+            if candidates and all(vector.shape == query.shape for _, vector in candidates):
+                similarities = np.stack([vector for _, vector in candidates]) @ query
+                best = int(similarities.argmax())
+                similarity = float(similarities[best])
+                if similarity >= self.min_similarity:
+                    entry_id = candidates[best][0]
+                    self._entries.move_to_end(entry_id)
+                    self.hits += 1
+                    return self._entries[entry_id][2], similarity
+            
+            self.misses += 1
+            return None
+    
+    def set(self, embedding: Sequence[float], signature: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond max_entries."""
+        vector = self._normalize(embedding)
+        expires_at = time.monotonic() + self.ttl_seconds if self.ttl_seconds is not None else None
+        with self._lock:
+            self._entries[self._next_id] = (signature, vector, value, expires_at)
+            self._next_id += 1
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self) -> None:
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and occupancy, suitable for a health endpoint."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'min_similarity': self.min_similarity,
+                'ttl_seconds': self.ttl_seconds
+            }
@@ -69,21 +69,24 @@ test_serialization()
 # Try relative imports first, fall back to absolute for standalone testing
 try:
     from .data_processor import DataProcessor, create_sample_data_profile, DataProfile
-    from .ai_planner import AIReportPlanner
+    from .ai_planner import AIReportPlanner, generate_fallback_spec
     from .report_spec import create_government_report_templates
     from .report_renderer import ReportRenderer
     from .report_suggester import ReportTypeSuggester
+    from .json_provider import OrjsonProvider
 except ImportError:
     from data_processor import DataProcessor, create_sample_data_profile, DataProfile
-    from ai_planner import AIReportPlanner
+    from ai_planner import AIReportPlanner, generate_fallback_spec
     from report_spec import create_government_report_templates
     from report_renderer import ReportRenderer
     from report_suggester import ReportTypeSuggester
+    from json_provider import OrjsonProvider
 
 
 def create_app():
     """Application factory for creating Flask app instances."""
     app = Flask(__name__)
+    app.json = OrjsonProvider(app)
     app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
     
     # Configure session settings to handle larger data
@@ -139,12 +142,14 @@ def register_routes(app, data_processor, ai_planner):
                 return redirect(url_for('index'))
             
             if file:
-                # Read file content
-                file_content = file.read().decode('utf-8')
-                
                 # Determine file type
                 file_extension = file.filename.rsplit('.', 1)[1].lower() if '.' in file.filename else 'csv'
                 
+                # Read file content; workbooks are binary and are profiled from their bytes
+                file_content = file.read()
+                if file_extension not in ('xlsx', 'xls'):
+                    file_content = file_content.decode('utf-8')
+                
                 # Process the data with smart handling
                 try:
                     logger.info(f"Starting data processing for file: {file.filename}")
@@ -291,11 +296,12 @@ def register_routes(app, data_processor, ai_planner):
                            f"using {ai_data_profile.total_rows} row sample, "
                            f"estimated tokens: {recommendations.get('estimated_ai_tokens', 0)}")
                 
-                # Initialize AI planner
-                planner = AIReportPlanner()
+                # Reuse the planner created at startup; without one, go straight to the fallback
+                if ai_planner is None:
+                    raise ValueError("AI planner not available - missing API key")
                 
                 # Plan the report using AI-optimized profile
-                report_spec = planner.plan_report(user_description, ai_data_profile, template_hint)
+                report_spec = ai_planner.plan_report(user_description, ai_data_profile, template_hint)
                 
                 # Store the report specification in session for preview
                 session['report_spec'] = ensure_json_serializable(report_spec.to_dict())
@@ -328,10 +334,7 @@ def register_routes(app, data_processor, ai_planner):
                     ai_data_profile = DataProfile.from_dict(session['ai_data_profile'])
                     
                     # Generate fallback report
-                    fallback_planner = AIReportPlanner.__new__(AIReportPlanner)
-                    report_spec = fallback_planner._generate_fallback_report(
-                        ai_data_profile, user_description, template_hint
-                    )
+                    report_spec = generate_fallback_spec(user_description, ai_data_profile, template_hint)
                     
                     # Store the report specification in session for preview
                     session['report_spec'] = ensure_json_serializable(report_spec.to_dict())
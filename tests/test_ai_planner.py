@@ -0,0 +1,741 @@
+"""
+Tests for the AI planning module.
+"""
+
+import json
+import asyncio
+import subprocess
+import pytest
+from dataclasses import fields
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock
+import sys
+
+# Add the src directory to the Python path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import ai_planner
+import data_processor
+from ai_planner import AIReportPlanner, create_sample_ai_plan
+from data_processor import ColumnProfile, DataProfile, create_sample_data_profile
+from report_spec import ReportSpec, KPI, ChartSpec, TableSpec, MetricType
+
+
+@pytest.fixture(autouse=True)
+def clear_plan_cache():
+    """Keep cached plans from leaking between tests."""
+    ai_planner._plan_cache.clear()
+    ai_planner._template_cache.clear()
+    ai_planner._semantic_cache = None
+    yield
+    ai_planner._plan_cache.clear()
+    ai_planner._template_cache.clear()
+    ai_planner._semantic_cache = None
+
+
+@pytest.fixture
+def planner():
+    """Create a planner whose OpenAI client is mocked out."""
+    planner = AIReportPlanner(
+        api_key="test-key", model="gpt-4o-mini", escalation_model="", embedding_model="", builtin_templates=False
+    )
+    planner.client = MagicMock()
+    planner.async_client = MagicMock()
+    return planner
+
+
+def _completion(content):
+    """Build a minimal chat completion response object."""
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def _batch_output_line(custom_id, content, status_code=200):
+    """Build one line of an OpenAI batch output file."""
+    return json.dumps({
+        "custom_id": custom_id,
+        "response": {
+            "status_code": status_code,
+            "body": {"choices": [{"message": {"content": content}}]}
+        },
+        "error": None
+    })
+
+
+class TestBatchPlanning:
+    """Test planning many reports through the OpenAI Batch API."""
+
+    def test_plan_reports_batch_maps_results_in_order(self, planner):
+        """Test that batch results are matched back to requests by custom_id."""
+        profile = create_sample_data_profile()
+        plan = create_sample_ai_plan()
+        second_plan = dict(plan, title="Second Report")
+
+        planner.client.files.create.return_value = SimpleNamespace(id="file-in")
+        planner.client.batches.create.return_value = SimpleNamespace(id="batch-1", status="validating")
+        planner.client.batches.retrieve.return_value = SimpleNamespace(
+            id="batch-1", status="completed", output_file_id="file-out"
+        )
+        # Output lines are not guaranteed to be in input order
+        planner.client.files.content.return_value = SimpleNamespace(text="\n".join([
+            _batch_output_line("1", json.dumps(second_plan)),
+            _batch_output_line("0", json.dumps(plan)),
+        ]))
+
+        specs = planner.plan_reports_batch(
+            [("Budget report", profile, None), ("Second report", profile, "budget_vs_actual")],
+            poll_interval=0
+        )
+
+        assert [spec.title for spec in specs] == ["Budget Performance Analysis", "Second Report"]
+
+        submitted = planner.client.files.create.call_args.kwargs
+        assert submitted["purpose"] == "batch"
+        lines = submitted["file"][1].decode("utf-8").splitlines()
+        assert [json.loads(line)["custom_id"] for line in lines] == ["0", "1"]
+        assert json.loads(lines[0])["url"] == "/v1/chat/completions"
+
+    def test_parse_batch_output_skips_failed_requests(self, planner):
+        """Test that failed batch lines are left out of the response map."""
+        output = "\n".join([
+            _batch_output_line("0", "{}"),
+            _batch_output_line("1", "{}", status_code=500),
+        ])
+
+        assert planner._parse_batch_output(output) == {"0": "{}"}
+
+    def test_collect_reports_batch_waits_for_completion(self, planner):
+        """Test that collecting a running batch returns None and a finished one returns plans."""
+        profile = create_sample_data_profile()
+        requests = [("Budget report", profile, None)]
+
+        planner.client.batches.retrieve.return_value = SimpleNamespace(id="batch-1", status="in_progress")
+        assert planner.collect_reports_batch("batch-1", requests) is None
+        planner.client.files.content.assert_not_called()
+
+        planner.client.batches.retrieve.return_value = SimpleNamespace(
+            id="batch-1", status="completed", output_file_id="file-out"
+        )
+        planner.client.files.content.return_value = SimpleNamespace(
+            text=_batch_output_line("0", json.dumps(create_sample_ai_plan()))
+        )
+        specs = planner.collect_reports_batch("batch-1", requests)
+
+        assert [spec.title for spec in specs] == ["Budget Performance Analysis"]
+
+    def test_plan_reports_batch_empty(self, planner):
+        """Test that an empty batch does not call the API."""
+        assert planner.plan_reports_batch([]) == []
+        planner.client.files.create.assert_not_called()
+
+
+class TestConcurrentPlanning:
+    """Test concurrent planning with the async OpenAI client."""
+
+    def test_plan_reports_many_respects_concurrency(self, planner):
+        """Test that no more than `concurrency` calls are in flight at once."""
+        profile = create_sample_data_profile()
+        content = json.dumps(create_sample_ai_plan())
+        in_flight = 0
+        peak = 0
+
+        async def fake_create(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return _completion(content)
+
+        planner.async_client.chat.completions.create = AsyncMock(side_effect=fake_create)
+
+        requests = [(f"Report on {topic}", profile, None)
+                    for topic in ["budget", "payroll", "grants", "permits", "overtime", "revenue"]]
+        specs = asyncio.run(planner.plan_reports_many(requests, concurrency=2))
+
+        assert len(specs) == 6
+        assert all(spec.title == "Budget Performance Analysis" for spec in specs)
+        assert peak == 2
+
+
+class TestPlanCache:
+    """Test reuse of AI responses for repeated planning requests."""
+
+    def test_repeated_request_skips_openai(self, planner):
+        """Test that a normalized repeat of a request is served from the cache."""
+        profile = create_sample_data_profile()
+        planner.client.chat.completions.create.return_value = _completion(
+            json.dumps(create_sample_ai_plan())
+        )
+
+        first = planner.plan_report("Budget  vs actual by department", profile)
+        second = planner.plan_report("  budget vs ACTUAL by department ", profile)
+
+        assert planner.client.chat.completions.create.call_count == 1
+        assert first.to_dict() == second.to_dict()
+
+    def test_failed_call_returns_fallback_plan(self, planner):
+        """Test that the fallback plan built alongside the OpenAI call is returned on failure."""
+        profile = create_sample_data_profile()
+        planner.client.chat.completions.create.side_effect = RuntimeError("down")
+
+        spec = planner.plan_report("Budget report", profile)
+
+        assert spec.title.startswith("Budget Performance Analysis: Budget report")
+        assert spec.validate_against_profile(profile) == []
+
+    def test_different_hint_misses_cache(self, planner):
+        """Test that the template hint is part of the cache key."""
+        profile = create_sample_data_profile()
+        planner.client.chat.completions.create.return_value = _completion(
+            json.dumps(create_sample_ai_plan())
+        )
+
+        planner.plan_report("Budget report", profile)
+        planner.plan_report("Budget report", profile, "budget_vs_actual")
+
+        assert planner.client.chat.completions.create.call_count == 2
+
+
+class TestModelEscalation:
+    """Test retrying unusable plans from the default model on the escalation model."""
+
+    @pytest.fixture
+    def escalating_planner(self):
+        """Create a mocked planner that escalates from gpt-4o-mini to gpt-4o."""
+        planner = AIReportPlanner(
+            api_key="test-key", model="gpt-4o-mini", escalation_model="gpt-4o", embedding_model=""
+        )
+        planner.client = MagicMock()
+        return planner
+
+    def test_valid_plan_stays_on_default_model(self, escalating_planner):
+        """Test that a usable plan from the small model is not re-requested."""
+        escalating_planner.client.chat.completions.create.return_value = _completion(
+            json.dumps(create_sample_ai_plan())
+        )
+
+        escalating_planner.plan_report("Budget report", create_sample_data_profile())
+
+        calls = escalating_planner.client.chat.completions.create.call_args_list
+        assert [call.kwargs["model"] for call in calls] == ["gpt-4o-mini"]
+
+    def test_unparseable_plan_escalates(self, escalating_planner):
+        """Test that an unparseable response is retried once on the escalation model."""
+        escalating_planner.client.chat.completions.create.side_effect = [
+            _completion("not json"),
+            _completion(json.dumps(create_sample_ai_plan())),
+        ]
+
+        spec = escalating_planner.plan_report("Budget report", create_sample_data_profile())
+
+        calls = escalating_planner.client.chat.completions.create.call_args_list
+        assert [call.kwargs["model"] for call in calls] == ["gpt-4o-mini", "gpt-4o"]
+        assert spec.title == "Budget Performance Analysis"
+
+    def test_escalation_disabled_when_models_match(self):
+        """Test that escalating to the planning model itself is treated as disabled."""
+        planner = AIReportPlanner(api_key="test-key", model="gpt-4o", escalation_model="gpt-4o")
+        assert planner.escalation_model == ""
+
+
+class TestSemanticCache:
+    """Test reuse of plans for near-duplicate descriptions via embeddings."""
+
+    EMBEDDINGS = {
+        "budget variance by dept": [1.0, 0.0, 0.1],
+        "show me spending variance per department": [0.98, 0.05, 0.12],
+        "list every permit issued": [0.0, 1.0, 0.0],
+    }
+
+    @pytest.fixture
+    def semantic_planner(self):
+        """Create a mocked planner whose embeddings come from EMBEDDINGS."""
+        planner = AIReportPlanner(
+            api_key="test-key", escalation_model="", embedding_model="text-embedding-3-small",
+            builtin_templates=False
+        )
+        planner.client = MagicMock()
+        planner.client.embeddings.create.side_effect = lambda model, input: SimpleNamespace(
+            data=[SimpleNamespace(embedding=self.EMBEDDINGS[input])]
+        )
+        planner.client.chat.completions.create.return_value = _completion(
+            json.dumps(create_sample_ai_plan())
+        )
+        return planner
+
+    def test_near_duplicate_description_skips_openai(self, semantic_planner):
+        """Test that a reworded request on the same columns reuses the cached plan."""
+        profile = create_sample_data_profile()
+
+        first = semantic_planner.plan_report("Budget variance by dept", profile)
+        second = semantic_planner.plan_report("Show me spending variance per department", profile)
+
+        assert semantic_planner.client.chat.completions.create.call_count == 1
+        assert first.to_dict() == second.to_dict()
+        assert ai_planner.semantic_cache_stats()["hits"] == 1
+
+    def test_dissimilar_description_or_columns_calls_openai(self, semantic_planner):
+        """Test that unrelated descriptions and different column layouts miss the cache."""
+        profile = create_sample_data_profile()
+        other_profile = DataProfile(columns=profile.columns[:2])
+
+        semantic_planner.plan_report("Budget variance by dept", profile)
+        semantic_planner.plan_report("List every permit issued", profile)
+        semantic_planner.plan_report("Show me spending variance per department", other_profile)
+
+        assert semantic_planner.client.chat.completions.create.call_count == 3
+
+    def test_disabled_by_default(self, monkeypatch):
+        """Test that without a configured embedding model, a cache miss goes straight to the completion."""
+        monkeypatch.delenv("OPENAI_EMBEDDING_MODEL", raising=False)
+        planner = AIReportPlanner(api_key="test-key", escalation_model="", builtin_templates=False)
+        planner.client = MagicMock()
+        planner.client.chat.completions.create.return_value = _completion(
+            json.dumps(create_sample_ai_plan())
+        )
+
+        planner.plan_report("Budget variance by dept", create_sample_data_profile())
+
+        assert planner.embedding_model == ""
+        planner.client.embeddings.create.assert_not_called()
+        assert planner.client.chat.completions.create.call_count == 1
+        assert ai_planner.semantic_cache_stats() == {"enabled": False}
+
+    def test_import_does_not_load_numpy(self):
+        """Test that importing the planner leaves numpy unimported until the cache compares embeddings."""
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, ai_planner; print('numpy' in sys.modules)"],
+            cwd=Path(__file__).parent.parent / "src", capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "False"
+
+
+class TestBuiltinTemplates:
+    """Test planning descriptions that name a built-in government template without OpenAI."""
+
+    @pytest.fixture
+    def template_planner(self):
+        """Create a mocked planner with built-in template matching enabled."""
+        planner = AIReportPlanner(api_key="test-key", escalation_model="", embedding_model="")
+        planner.client = MagicMock()
+        planner.client.chat.completions.create.return_value = _completion(
+            json.dumps(create_sample_ai_plan())
+        )
+        return planner
+
+    @pytest.mark.parametrize("description, hint, expected", [
+        ("Budget vs. actual spending by department", None, "budget_vs_actual"),
+        ("Quarterly balance sheet", None, "balance_sheet"),
+        ("How fast do we close 311 tickets?", None, "response_times"),
+        ("Anything", "Budget vs Actual", "budget_vs_actual"),
+        ("List every permit issued", None, None),
+    ])
+    def test_match_builtin_template(self, description, hint, expected):
+        """Test that template names and keyword phrases select a template."""
+        assert ai_planner._match_builtin_template(description, hint) == expected
+
+    def test_matching_description_skips_openai(self, template_planner):
+        """Test that a named template whose columns exist is served without an API call."""
+        spec = template_planner.plan_report("Budget vs actual by department", create_sample_data_profile())
+
+        template_planner.client.chat.completions.create.assert_not_called()
+        assert spec.template == "budget_vs_actual"
+        assert spec.validate_against_profile(create_sample_data_profile()) == []
+
+    def test_template_columns_bind_to_profile_names(self, template_planner):
+        """Test that template columns are re-pointed at differently cased profile columns."""
+        profile = DataProfile(
+            columns=[
+                ColumnProfile("department", "string", ["Finance", "Health"]),
+                ColumnProfile("BUDGET", "currency", ["$100", "$200"]),
+                ColumnProfile("actual", "currency", ["$90", "$210"]),
+                ColumnProfile("Variance", "percent", ["-10%", "5%"])
+            ],
+            total_rows=2, file_size_mb=0.001, processing_time=0.1
+        )
+
+        spec = template_planner.plan_report("Budget variance report", profile)
+
+        template_planner.client.chat.completions.create.assert_not_called()
+        assert {kpi.column for kpi in spec.kpis} == {"BUDGET", "actual", "Variance"}
+
+    def test_template_that_does_not_fit_calls_openai(self, template_planner):
+        """Test that a matched template missing most of its columns falls through to OpenAI."""
+        template_planner.plan_report("Balance sheet", create_sample_data_profile())
+
+        template_planner.client.chat.completions.create.assert_called_once()
+
+
+class TestTemplateCache:
+    """Test re-binding cached plans to structurally similar requests."""
+
+    @pytest.fixture
+    def template_cache_planner(self):
+        """Create a mocked planner with the structural template cache enabled."""
+        planner = AIReportPlanner(
+            api_key="test-key", escalation_model="", embedding_model="", builtin_templates=False,
+            template_cache=True
+        )
+        planner.client = MagicMock()
+        planner.client.chat.completions.create.return_value = _completion(
+            json.dumps(create_sample_ai_plan())
+        )
+        return planner
+
+    @pytest.mark.parametrize("first_description, second_description", [
+        ("Top 10 departments by overspend", "Top 3 departments by overspend"),
+        ("Show Revenue by Region", "Show Headcount by Division"),
+    ])
+    def test_disabled_by_default(self, monkeypatch, first_description, second_description):
+        """Test that requests differing only in masked words each get their own plan by default."""
+        monkeypatch.delenv("PLAN_TEMPLATE_CACHE", raising=False)
+        planner = AIReportPlanner(
+            api_key="test-key", escalation_model="", embedding_model="", builtin_templates=False
+        )
+        planner.client = MagicMock()
+        first_plan = create_sample_ai_plan()
+        second_plan = create_sample_ai_plan()
+        first_plan["charts"][0]["limit"] = 10
+        second_plan["title"] = second_description
+        second_plan["charts"][0]["limit"] = 3
+        planner.client.chat.completions.create.side_effect = [
+            _completion(json.dumps(first_plan)),
+            _completion(json.dumps(second_plan)),
+        ]
+
+        planner.plan_report(first_description, create_sample_data_profile())
+        spec = planner.plan_report(second_description, create_sample_data_profile())
+
+        assert planner.template_cache is False
+        assert planner.client.chat.completions.create.call_count == 2
+        assert spec.title == second_description
+        assert spec.charts[0].limit == 3
+
+    def test_similar_request_rebinds_columns(self, template_cache_planner):
+        """Test that a cached plan is reused with the new profile's column names."""
+        planner = template_cache_planner
+        planner.plan_report("Budget analysis for Parks Department Q1 2024", create_sample_data_profile())
+
+        renamed = DataProfile(columns=[
+            ColumnProfile("Department", "string", ["Parks"]),
+            ColumnProfile("Budgeted", "currency", ["$100"]),
+            ColumnProfile("Spent", "currency", ["$90"]),
+            ColumnProfile("Variance", "percent", ["-10%"]),
+            ColumnProfile("Date", "date", ["2024-04-01"]),
+        ])
+        spec = planner.plan_report("Budget analysis for Fire Department Q2 2025", renamed)
+
+        assert planner.client.chat.completions.create.call_count == 1
+        assert spec.validate_against_profile(renamed) == []
+        assert spec.kpis[0].column == "Budgeted"
+
+    def test_weak_match_calls_openai(self, template_cache_planner):
+        """Test that a profile sharing no column types falls through to OpenAI."""
+        planner = template_cache_planner
+        planner.plan_report("Budget analysis for Parks Department", create_sample_data_profile())
+
+        unrelated = DataProfile(columns=[ColumnProfile("Notes", "string", ["n/a"])])
+        planner.plan_report("Budget analysis for Fire Department", unrelated)
+
+        assert planner.client.chat.completions.create.call_count == 2
+
+
+class TestResponseParsing:
+    """Test turning AI responses into ReportSpec objects."""
+
+    def test_well_formed_plan_matches_lenient_parsing(self, planner):
+        """Test that the pydantic path builds the same spec as the per-item parser."""
+        plan = create_sample_ai_plan()
+
+        spec = planner._parse_ai_response(json.dumps(plan), create_sample_data_profile())
+
+        assert spec == ReportSpec(
+            title=plan["title"],
+            kpis=[planner._parse_kpi(kpi, i) for i, kpi in enumerate(plan["kpis"])],
+            charts=[planner._parse_chart(chart, i) for i, chart in enumerate(plan["charts"])],
+            tables=[planner._parse_table(table, i) for i, table in enumerate(plan["tables"])],
+            narrative_goals=plan["narrative_goals"],
+            template=plan.get("template"),
+            description=plan.get("description")
+        )
+
+    def test_import_does_not_load_pydantic(self):
+        """Test that importing the planner leaves pydantic unimported until a response is parsed."""
+        result = subprocess.run(
+            [sys.executable, "-c", "import sys, ai_planner; print('pydantic' in sys.modules)"],
+            cwd=Path(__file__).parent.parent / "src", capture_output=True, text=True, check=True
+        )
+
+        assert result.stdout.strip() == "False"
+
+    def test_malformed_items_fall_back_to_lenient_parsing(self, planner):
+        """Test that items pydantic rejects are repaired or skipped."""
+        plan = create_sample_ai_plan()
+        plan["kpis"].append({"metric": "sum"})
+        plan["charts"][0]["type"] = "radar"
+        plan["charts"][0]["series"].append("not a series")
+
+        spec = planner._parse_ai_response(json.dumps(plan), create_sample_data_profile())
+
+        assert len(spec.kpis) == len(create_sample_ai_plan()["kpis"])
+        assert spec.charts[0].type.value == "bar"
+        assert len(spec.charts[0].series) == len(create_sample_ai_plan()["charts"][0]["series"])
+
+
+class TestStreamingPlanning:
+    """Test yielding plan components while the AI response streams in."""
+
+    def test_incremental_parser_handles_split_chunks(self):
+        """Test that items split across chunks and braces inside strings are decoded."""
+        text = json.dumps({
+            "title": "Report {draft}",
+            "kpis": [{"label": "Total [all]", "metric": "sum", "column": "Budget"}],
+            "charts": [],
+            "tables": [{"title": "Detail", "columns": ["Department"]}]
+        })
+        parser = ai_planner._IncrementalSectionParser()
+        items = []
+        for start in range(0, len(text), 7):
+            items.extend(parser.feed(text[start:start + 7]))
+
+        assert [section for section, _ in items] == ["kpis", "tables"]
+        assert items[0][1]["label"] == "Total [all]"
+
+    def test_stream_yields_components_then_report(self, planner):
+        """Test that KPIs are yielded before the full report when streaming."""
+        profile = create_sample_data_profile()
+        content = json.dumps(create_sample_ai_plan())
+
+        async def fake_stream():
+            for start in range(0, len(content), 40):
+                delta = SimpleNamespace(content=content[start:start + 40])
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+
+        planner.async_client.chat.completions.create = AsyncMock(return_value=fake_stream())
+
+        async def run():
+            return [item async for item in planner.stream_plan_report("Budget report", profile)]
+
+        events = asyncio.run(run())
+        kinds = [kind for kind, _ in events]
+
+        assert kinds[-1] == "report"
+        assert kinds.count("kpi") == len(events[-1][1].kpis)
+        assert events[-1][1].title == "Budget Performance Analysis"
+        assert planner.async_client.chat.completions.create.call_args.kwargs["stream"] is True
+
+
+class TestSharedHttpClient:
+    """Test connection pool sharing between planner instances."""
+
+    def test_planners_share_one_connection_pool(self):
+        """Test that every sync OpenAI client is built on the same HTTP client."""
+        first = AIReportPlanner(api_key="test-key")
+        second = AIReportPlanner(api_key="test-key")
+
+        assert first.client._client is second.client._client
+        assert first.client._client is ai_planner._get_shared_http_client()
+
+
+class TestAsyncClient:
+    """Test per-event-loop AsyncOpenAI clients and the shared OpenAI loop."""
+
+    def test_one_client_per_event_loop(self):
+        """Test that a loop reuses its client and a new loop gets a fresh one."""
+        planner = AIReportPlanner(api_key="test-key")
+
+        async def clients():
+            return planner.async_client, planner.async_client
+
+        first, again = asyncio.run(clients())
+        second, _ = asyncio.run(clients())
+
+        assert first is again
+        assert first is not second
+
+    def test_calls_from_separate_loops_share_one_client(self, monkeypatch):
+        """Test that completions requested from fresh event loops reuse one pooled client."""
+        import openai
+
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value=_completion("{}"))
+        factory = MagicMock(return_value=client)
+        monkeypatch.setattr(openai, "AsyncOpenAI", factory)
+        planner = AIReportPlanner(api_key="test-key")
+
+        assert asyncio.run(planner._call_openai_api_async("first")) == "{}"
+        assert asyncio.run(planner._call_openai_api_async("second")) == "{}"
+
+        assert factory.call_count == 1
+        assert client.chat.completions.create.call_count == 2
+
+    def test_iterate_on_openai_loop_closes_abandoned_stream(self):
+        """Test that items are produced on the shared loop and a stream dropped early is closed there."""
+        seen = []
+
+        async def stream():
+            try:
+                for i in range(3):
+                    seen.append(asyncio.get_running_loop())
+                    yield i
+            finally:
+                seen.append("closed")
+
+        items = ai_planner.iterate_on_openai_loop(stream())
+        assert next(items) == 0
+        items.close()
+
+        assert seen == [ai_planner._get_openai_loop(), "closed"]
+
+
+class TestPromptLayout:
+    """Test how the planning prompt is split across chat messages."""
+
+    def test_static_instructions_lead_the_request(self, planner):
+        """Test that the schema sits in the system message and only request data in the user message."""
+        profile = create_sample_data_profile()
+        prompt = planner._create_planning_prompt("Budget report", profile, None)
+        request = planner._build_chat_request(prompt)
+
+        assert request["messages"][0] == {"role": "system", "content": ai_planner.PLANNING_SYSTEM_PROMPT}
+        assert request["messages"][1]["content"] == prompt
+        assert '"narrative_goals"' not in prompt
+        assert "Budget report" in prompt
+
+    def test_system_prompt_is_model_neutral(self):
+        """Test that the cached instructions don't name a model, since the model is configurable."""
+        prompt = ai_planner.PLANNING_SYSTEM_PROMPT.lower()
+
+        assert "gpt" not in prompt
+        assert ai_planner.DEFAULT_PLANNING_MODEL not in prompt
+
+    def test_prefix_identical_across_requests(self, planner):
+        """Test that different data and descriptions share a byte-identical leading message."""
+        small = DataProfile(columns=[ColumnProfile("Notes", "string", ["n/a"])], total_rows=1)
+        first = planner._build_chat_request(
+            planner._create_planning_prompt("Budget report", create_sample_data_profile(), None))
+        second = planner._build_chat_request(
+            planner._create_planning_prompt("Permit backlog", small, "operations"))
+
+        assert first["messages"][0] == second["messages"][0]
+        assert first["messages"][1] != second["messages"][1]
+
+    def test_response_format_limits_columns_to_profile(self, planner):
+        """Test that the strict schema only admits the profile's column names."""
+        profile = create_sample_data_profile()
+        request = planner._build_chat_request("prompt", profile)
+        response_format = request["response_format"]
+        schema = response_format["json_schema"]["schema"]
+        table_columns = schema["properties"]["tables"]["items"]["properties"]["columns"]["items"]
+
+        assert response_format["json_schema"]["strict"] is True
+        assert table_columns["enum"] == sorted(col.name for col in profile.columns)
+
+        def objects(node):
+            if isinstance(node, dict):
+                if node.get("type") == "object":
+                    yield node
+                for value in node.values():
+                    yield from objects(value)
+            elif isinstance(node, list):
+                for value in node:
+                    yield from objects(value)
+
+        for obj in objects(schema):
+            assert obj["additionalProperties"] is False
+            assert obj["required"] == list(obj["properties"])
+
+    def test_response_format_follows_report_spec(self, planner):
+        """Test that the strict schema is derived from the dataclasses pydantic validates against."""
+        request = planner._build_chat_request("prompt", create_sample_data_profile())
+        schema = request["response_format"]["json_schema"]["schema"]
+        items = {section: schema["properties"][section]["items"]["properties"] for section in ("kpis", "charts", "tables")}
+
+        assert set(schema["properties"]) == {f.name for f in fields(ReportSpec)}
+        assert set(items["kpis"]) == {f.name for f in fields(KPI)} - {"filter"}
+        assert set(items["charts"]) == {f.name for f in fields(ChartSpec)}
+        assert set(items["tables"]) == {f.name for f in fields(TableSpec)}
+        assert items["kpis"]["metric"]["enum"] == [metric.value for metric in MetricType]
+
+    def test_response_format_shared_across_column_orders(self, planner):
+        """Test that profiles with the same columns in any order reuse one schema object."""
+        profile = create_sample_data_profile()
+        reordered = DataProfile(columns=list(reversed(profile.columns)))
+
+        first = planner._build_chat_request("prompt", profile)["response_format"]
+        second = planner._build_chat_request("other prompt", reordered)["response_format"]
+
+        assert first is second
+
+    def test_no_response_format_without_columns(self, planner):
+        """Test that an empty profile does not produce an empty column enum."""
+        assert "response_format" not in planner._build_chat_request("prompt", DataProfile(columns=[]))
+
+    def test_prompt_identical_without_orjson(self, planner, monkeypatch):
+        """Test that the stdlib fallback serializes the digest exactly like orjson."""
+        prompt = planner._create_planning_prompt("Budget report", create_sample_data_profile(), None)
+        monkeypatch.setattr(ai_planner, "orjson", None)
+        monkeypatch.setattr(data_processor, "orjson", None)
+
+        # A fresh profile, so the digest is not served from the first profile's cache
+        assert planner._create_planning_prompt("Budget report", create_sample_data_profile(), None) == prompt
+
+
+class TestColumnMatching:
+    """Test matching column names against a data profile, as used to re-bind cached templates."""
+
+    @pytest.mark.parametrize("use_rapidfuzz", [True, False])
+    def test_find_similar_column(self, planner, monkeypatch, use_rapidfuzz):
+        """Test exact, case-insensitive and fuzzy matches with and without RapidFuzz."""
+        if not use_rapidfuzz:
+            monkeypatch.setattr(ai_planner, "fuzz_process", None)
+        index = ai_planner._build_column_index(["Department", "Total Budget", "Actual"])
+
+        assert planner._find_similar_column("Actual", index) == "Actual"
+        assert planner._find_similar_column("department", index) == "Department"
+        assert planner._find_similar_column("Budget", index) == "Total Budget"
+        assert planner._find_similar_column("Zzz", index) is None
+
+    def test_word_match_without_rapidfuzz(self, planner, monkeypatch):
+        """Test that the fallback ladder matches on a shared word through the word index."""
+        monkeypatch.setattr(ai_planner, "fuzz_process", None)
+        index = ai_planner._build_column_index(["Department", "Total Budget", "Actual"])
+
+        assert planner._find_similar_column("Budget Amount", index) == "Total Budget"
+        assert ai_planner._build_column_index(("Department", "Total Budget", "Actual")) is index
+
+
+class TestFallbackSpec:
+    """Test the rule-based plan that needs no planner instance or API key."""
+
+    def test_budget_profile(self):
+        """Test that a budget profile gets the budget performance fallback."""
+        spec = ai_planner.generate_fallback_spec("Budget report", create_sample_data_profile())
+
+        assert spec.title.startswith("Budget Performance Analysis")
+        assert [kpi.column for kpi in spec.kpis][:2] == ["Budget", "Actual"]
+        assert spec.validate_against_profile(create_sample_data_profile()) == []
+
+    def test_operational_metrics_profile(self):
+        """Test that the operational metrics fallback builds a max KPI."""
+        profile = DataProfile(
+            columns=[
+                ColumnProfile("Team", "string", ["A", "B"]),
+                ColumnProfile("Performance Score", "number", ["81", "92"])
+            ],
+            total_rows=2, file_size_mb=0.001, processing_time=0.1
+        )
+
+        spec = ai_planner.generate_fallback_spec("Team scores", profile)
+
+        assert [kpi.metric.value for kpi in spec.kpis] == ["avg", "max"]
+
+    def test_planner_method_forwards(self, planner):
+        """Test that the planner's fallback method returns the module-level plan."""
+        profile = create_sample_data_profile()
+
+        spec = planner._generate_fallback_report(profile, "Budget report", None)
+
+        assert spec.to_dict() == ai_planner.generate_fallback_spec("Budget report", profile).to_dict()
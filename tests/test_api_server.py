@@ -0,0 +1,230 @@
+"""
+Tests for the planning API endpoints.
+"""
+
+import io
+import gzip
+import json
+import asyncio
+import pytest
+from pathlib import Path
+import sys
+
+# Add the src directory to the Python path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import api_server
+import ai_planner
+from ai_planner import generate_fallback_spec
+from batch_store import BatchStore
+
+
+CSV_DATA = "Department,Budget\nFinance,1200\nHealth,800\n"
+
+
+class FakePlanner:
+    """Stands in for AIReportPlanner, answering every request with the template-based plan."""
+    
+    def __init__(self):
+        self.batch_finished = False
+        self.submitted = []
+        self.stream_loops = []
+    
+    async def plan_report_async(self, user_description, data_profile, template_hint=None):
+        return generate_fallback_spec(user_description, data_profile, template_hint)
+    
+    async def plan_reports_many(self, requests):
+        return [generate_fallback_spec(*request) for request in requests]
+    
+    def submit_reports_batch(self, requests):
+        self.submitted.append(requests)
+        return "batch_123"
+    
+    def collect_reports_batch(self, batch_id, requests):
+        if not self.batch_finished:
+            return None
+        return [generate_fallback_spec(*request) for request in requests]
+    
+    async def stream_plan_report(self, user_description, data_profile, template_hint=None):
+        self.stream_loops.append(asyncio.get_running_loop())
+        spec = generate_fallback_spec(user_description, data_profile, template_hint)
+        for kpi in spec.kpis:
+            yield "kpi", kpi
+        for chart in spec.charts:
+            yield "chart", chart
+        yield "report", spec
+
+
+@pytest.fixture
+def planner(monkeypatch):
+    """Install a fake planner as the server's shared planner."""
+    planner = FakePlanner()
+    monkeypatch.setattr(api_server, "ai_planner", planner)
+    return planner
+
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """Flask test client with batches stored in a temporary directory."""
+    monkeypatch.setattr(api_server, "pending_batches", BatchStore(str(tmp_path / "batches")))
+    return api_server.app.test_client()
+
+
+def _reports(count):
+    return [{"user_description": f"Budget report {i}", "data": CSV_DATA} for i in range(count)]
+
+
+class TestPlanReports:
+    """Test planning several reports through /api/plan-reports."""
+    
+    def test_interactive_plans_every_report(self, client, planner):
+        """Test that interactive mode returns one plan per report."""
+        response = client.post("/api/plan-reports", json={"reports": _reports(2)})
+        
+        assert response.status_code == 200
+        body = response.get_json()
+        assert body["success"] is True
+        assert len(body["report_specs"]) == 2
+    
+    def test_over_limit_rejected(self, client, planner):
+        """Test that more than MAX_REPORTS_PER_REQUEST reports is a 400 without planning anything."""
+        reports = _reports(api_server.MAX_REPORTS_PER_REQUEST + 1)
+        
+        response = client.post("/api/plan-reports", json={"reports": reports, "mode": "batch"})
+        
+        assert response.status_code == 400
+        assert "At most" in response.get_json()["error"]
+        assert planner.submitted == []
+    
+    @pytest.mark.parametrize("payload", [
+        {"reports": []},
+        {"reports": _reports(1), "mode": "overnight"},
+        {"reports": [{"user_description": "No data"}]}
+    ])
+    def test_invalid_payloads(self, client, planner, payload):
+        """Test that malformed requests are rejected with 400."""
+        assert client.post("/api/plan-reports", json=payload).status_code == 400
+    
+    def test_batch_collected_from_another_worker(self, client, planner, monkeypatch, tmp_path):
+        """Test that a batch polls as running, then completes on a worker that didn't submit it."""
+        response = client.post("/api/plan-reports", json={"reports": _reports(2), "mode": "batch"})
+        assert response.status_code == 202
+        status_url = response.get_json()["status_url"]
+        assert status_url == "/api/plan-reports/batch_123"
+        
+        # A fresh store on the same directory stands in for a different gunicorn worker
+        monkeypatch.setattr(api_server, "pending_batches", BatchStore(str(tmp_path / "batches")))
+        response = client.get(status_url)
+        assert response.status_code == 202
+        assert response.get_json()["status"] == "in_progress"
+        
+        planner.batch_finished = True
+        response = client.get(status_url)
+        assert response.status_code == 200
+        assert len(response.get_json()["report_specs"]) == 2
+        
+        # Collected batches are forgotten
+        assert client.get(status_url).status_code == 404
+    
+    def test_unknown_batch(self, client, planner):
+        """Test that polling a batch id that was never submitted is a 404."""
+        response = client.get("/api/plan-reports/batch_missing")
+        
+        assert response.status_code == 404
+        assert response.get_json()["error"] == "Unknown batch batch_missing"
+
+
+
+class TestPlanReportStream:
+    """Test the server-sent event stream of /api/plan-report/stream."""
+    
+    def test_events_are_framed_in_order(self, client, planner):
+        """Test that each component is one event/data block, ending with the full report."""
+        response = client.post("/api/plan-report/stream",
+                               json={"user_description": "Budget report", "data": CSV_DATA})
+        
+        assert response.status_code == 200
+        assert response.mimetype == "text/event-stream"
+        assert response.headers["Cache-Control"] == "no-cache"
+        
+        body = response.get_data(as_text=True)
+        assert body.endswith("\n\n")
+        events = []
+        for block in body[:-2].split("\n\n"):
+            event_line, data_line = block.split("\n")
+            assert event_line.startswith("event: ") and data_line.startswith("data: ")
+            events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+        
+        kinds = [kind for kind, _ in events]
+        report = events[-1][1]
+        assert kinds == ["kpi"] * len(report["kpis"]) + ["chart"] * len(report["charts"]) + ["report"]
+        assert [payload for kind, payload in events if kind == "kpi"] == report["kpis"]
+    
+    def test_stream_runs_on_shared_openai_loop(self, client, planner):
+        """Test that every stream runs on the one long-lived OpenAI loop, not a loop per request."""
+        for _ in range(2):
+            client.post("/api/plan-report/stream",
+                        json={"user_description": "Budget report", "data": CSV_DATA}).get_data()
+        
+        assert planner.stream_loops == [ai_planner._get_openai_loop()] * 2
+    
+    def test_bad_request_is_json_error(self, client, planner):
+        """Test that request errors are returned before the stream starts."""
+        response = client.post("/api/plan-report/stream", json={"data": CSV_DATA})
+        
+        assert response.status_code == 400
+        assert response.get_json()["error"] == "user_description is required"
+
+
+
+class TestPlanReportRequestDecoding:
+    """Test the request encodings /api/plan-report accepts."""
+    
+    def _column_names(self, response):
+        """Column names of the profile returned with the plan."""
+        return [col["name"] for col in response.get_json()["data_profile"]["columns"]]
+    
+    def test_gzip_json_body(self, client, planner):
+        """Test that a JSON body sent with Content-Encoding: gzip is decompressed before parsing."""
+        body = gzip.compress(json.dumps({"user_description": "Budget report", "data": CSV_DATA}).encode("utf-8"))
+        
+        response = client.post("/api/plan-report", data=body, content_type="application/json",
+                               headers={"Content-Encoding": "gzip"})
+        
+        assert response.status_code == 200
+        assert self._column_names(response) == ["Department", "Budget"]
+    
+    def test_multipart_gzip_csv(self, client, planner):
+        """Test that a gzipped CSV file part is decompressed and profiled from its stream."""
+        upload = (io.BytesIO(gzip.compress(CSV_DATA.encode("utf-8"))), "budget.csv.gz")
+        
+        response = client.post("/api/plan-report", content_type="multipart/form-data",
+                               data={"user_description": "Budget report", "file": upload})
+        
+        assert response.status_code == 200
+        assert self._column_names(response) == ["Department", "Budget"]
+        assert response.get_json()["data_profile"]["total_rows"] == 2
+    
+    def test_xlsx_sent_as_json_is_unsupported(self, client, planner):
+        """Test that spreadsheet data in a JSON body is refused with 415."""
+        response = client.post("/api/plan-report",
+                               json={"user_description": "Budget report", "data": "UEsDBA==", "data_type": "xlsx"})
+        
+        assert response.status_code == 415
+        assert response.get_json()["error"] == "Send xlsx data as a multipart file upload"
+    
+    @pytest.mark.parametrize("body", [
+        b"not gzip at all",
+        gzip.compress(json.dumps({"user_description": "Budget report", "data": CSV_DATA}).encode("utf-8"))[:20]
+    ], ids=["not-gzip", "truncated"])
+    def test_corrupt_gzip_body(self, client, planner, body):
+        """Test that a body that fails to decompress is a 400, not a server error."""
+        response = client.post("/api/plan-report", data=body, content_type="application/json",
+                               headers={"Content-Encoding": "gzip"})
+        
+        assert response.status_code == 400
+        assert response.get_json()["error"].startswith("Request body is not valid gzip data")
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
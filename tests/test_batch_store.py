@@ -0,0 +1,72 @@
+"""
+Tests for the file-backed batch store.
+"""
+
+import os
+import time
+import pytest
+from pathlib import Path
+import sys
+
+# Add the src directory to the Python path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from batch_store import BatchStore
+
+
+def _age(store, key, seconds):
+    """Backdate an entry's file by the given number of seconds."""
+    path = store._path(key)
+    mtime = time.time() - seconds
+    os.utime(path, (mtime, mtime))
+
+
+class TestBatchStore:
+    """Test storing, sharing and evicting batch entries."""
+    
+    def test_entries_are_shared_between_instances(self, tmp_path):
+        """Test that a store on the same directory, as in another worker, reads the entry."""
+        BatchStore(str(tmp_path)).set("batch_1", [{"user_description": "Budget"}])
+        
+        other_worker = BatchStore(str(tmp_path))
+        assert other_worker.get("batch_1") == [{"user_description": "Budget"}]
+        
+        other_worker.delete("batch_1")
+        assert BatchStore(str(tmp_path)).get("batch_1") is None
+    
+    def test_keys_never_become_paths(self, tmp_path):
+        """Test that a key with path separators stays inside the store directory."""
+        store = BatchStore(str(tmp_path / "store"))
+        store.set("../../escape", 1)
+        
+        assert store.get("../../escape") == 1
+        assert os.listdir(tmp_path) == ["store"]
+    
+    def test_entries_expire_after_ttl(self, tmp_path):
+        """Test that expired entries read as missing and are removed on the next write."""
+        store = BatchStore(str(tmp_path), ttl_seconds=60)
+        store.set("old", 1)
+        store.set("abandoned", 2)
+        _age(store, "old", 61)
+        _age(store, "abandoned", 61)
+        
+        assert store.get("old") is None
+        store.set("new", 3)
+        assert len(store) == 1
+        assert store.get("new") == 3
+    
+    def test_oldest_entries_evicted_beyond_max_entries(self, tmp_path):
+        """Test that the store keeps at most max_entries, dropping the oldest first."""
+        store = BatchStore(str(tmp_path), max_entries=2)
+        for age, key in ((30, "a"), (20, "b")):
+            store.set(key, key)
+            _age(store, key, age)
+        store.set("c", "c")
+        
+        assert store.get("a") is None
+        assert [store.get("b"), store.get("c")] == ["b", "c"]
+        assert store.stats()["size"] == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
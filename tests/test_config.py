@@ -0,0 +1,55 @@
+"""
+Tests for the configuration module.
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add the src directory to the Python path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from config import Config
+
+
+class TestCostWarning:
+    """Test the cost warnings and recommendations for a dataset."""
+    
+    def test_all_thresholds_exceeded(self):
+        """Test that warnings follow row/file/token order and recommendations row/token/file."""
+        result = Config.get_cost_warning(row_count=20000, file_size_mb=75.0, estimated_tokens=12000)
+        
+        assert result['has_warnings'] is True
+        assert result['warnings'] == [
+            "Large dataset detected (20,000 rows). Consider using a smaller sample for initial planning.",
+            "Large file size (75.0 MB). Processing may take longer.",
+            "High token usage estimated (12,000 tokens). Using aggressive sampling to reduce costs."
+        ]
+        assert result['recommendations'] == [
+            "Use AI-optimized sampling for planning (reduces tokens by 80%)",
+            "Process data in chunks for better performance",
+            "Consider breaking large reports into smaller sections",
+            "Use template-based planning for cost-sensitive operations",
+            "Large files may take longer to process",
+            "Consider compressing data or using more efficient formats"
+        ]
+    
+    def test_single_threshold_exceeded(self):
+        """Test that only the triggered rule contributes a warning and its recommendations."""
+        result = Config.get_cost_warning(row_count=10, file_size_mb=0.1, estimated_tokens=12000)
+        
+        assert len(result['warnings']) == 1
+        assert result['recommendations'] == [
+            "Consider breaking large reports into smaller sections",
+            "Use template-based planning for cost-sensitive operations"
+        ]
+    
+    def test_small_dataset_has_no_warnings(self):
+        """Test that a dataset under every threshold gets no warnings or recommendations."""
+        result = Config.get_cost_warning(row_count=10, file_size_mb=0.1, estimated_tokens=100)
+        
+        assert result == {'has_warnings': False, 'warnings': [], 'recommendations': []}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
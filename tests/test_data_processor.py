@@ -2,6 +2,9 @@
 Tests for the data processing module.
 """
 
+import io
+import gzip
+import json
 import pytest
 import pandas as pd
 import tempfile
@@ -12,6 +15,7 @@ import sys
 # Add the src directory to the Python path for testing
 sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 
+import data_processor
 from data_processor import DataProcessor, ColumnProfile, DataProfile, create_sample_data_profile
 
 
@@ -216,6 +220,323 @@ class TestSampleData:
         assert date_col.type == "date"
 
 
+class TestPlannerDigest:
+    """Test the compact profile summary sent to the AI planner."""
+    
+    def test_digest_keeps_names_types_and_small_cardinality(self):
+        """Test that the digest drops sample values and large cardinalities."""
+        profile = DataProfile(columns=[
+            ColumnProfile("Department", "string", ["Finance", "Health"], unique_count=4),
+            ColumnProfile("PermitID", "string", ["P-1", "P-2"], unique_count=5000)
+        ], total_rows=5000)
+        
+        assert profile.to_planner_digest() == [
+            {"name": "Department", "type": "string", "unique": 4},
+            {"name": "PermitID", "type": "string"}
+        ]
+
+
+
+class TestColumnsByType:
+    """Test bucketing profile columns by type."""
+    
+    def test_buckets_cover_every_type(self):
+        """Test that every column lands in its type's bucket and empty types are present."""
+        profile = DataProfile(columns=[
+            ColumnProfile("Department", "string", ["Finance"]),
+            ColumnProfile("Budget", "currency", ["$100"]),
+            ColumnProfile("Actual", "currency", ["$90"])
+        ])
+        
+        buckets = profile.columns_by_type
+        assert [col.name for col in buckets["currency"]] == ["Budget", "Actual"]
+        assert buckets["date"] == []
+        assert profile.columns_by_type is buckets
+        assert profile.get_columns_by_type("string") == ["Department"]
+    
+    def test_get_column_by_name_uses_index(self):
+        """Test that named lookups go through one cached name index."""
+        profile = create_sample_data_profile()
+        
+        assert profile.get_column_by_name("Budget") is profile.columns[1]
+        assert profile.get_column_by_name("Missing") is None
+        assert profile.columns_by_name is profile.columns_by_name
+
+
+class TestProfileSerialization:
+    """Test the per-profile cached planner context."""
+    
+    def test_planner_digest_json_is_cached(self):
+        """Test that the digest is serialized once and matches to_planner_digest."""
+        profile = DataProfile(columns=[
+            ColumnProfile("Département", "string", ["Finance"], unique_count=3),
+            ColumnProfile("Budget", "currency", ["$100"])
+        ])
+        
+        digest_json = profile.planner_digest_json
+        assert json.loads(digest_json) == profile.to_planner_digest()
+        assert "Département" in digest_json
+        assert profile.planner_digest_json is digest_json
+        assert profile.column_names == ("Département", "Budget")
+        assert profile.column_schema == (("Département", "string"), ("Budget", "currency"))
+    
+    def test_to_dict_is_cached(self):
+        """Test that profiles serialize once and reuse their column dicts."""
+        profile = create_sample_data_profile()
+        
+        data = profile.to_dict()
+        assert profile.to_dict() is data
+        assert data["columns"][0] is profile.columns[0].to_dict()
+        assert data["columns"][1] == {
+            "name": "Budget", "type": "currency",
+            "sample_values": ["$1,200,000", "$850,000", "$650,000", "$1,100,000"],
+            "null_count": 0, "unique_count": 0
+        }
+    
+    def test_from_dict_round_trip(self):
+        """Test that a serialized profile, as stored in the session, rebuilds intact."""
+        profile = create_sample_data_profile()
+        
+        restored = DataProfile.from_dict(json.loads(json.dumps(profile.to_dict())))
+        
+        assert restored.to_dict() == profile.to_dict()
+        assert restored.get_column_by_name("Budget").type == "currency"
+
+
+class TestSampleForAI:
+    """Test trimming profiles for AI planning."""
+    
+    def test_trims_long_samples_and_shares_short_columns(self):
+        """Test that long samples keep their first and last halves and short columns are reused."""
+        long_col = ColumnProfile("PermitID", "string", [f"P-{i}" for i in range(10)], unique_count=10)
+        short_col = ColumnProfile("Department", "string", ["Finance", "Health"], unique_count=2)
+        profile = DataProfile(columns=[long_col, short_col], total_rows=10)
+        
+        sampled = profile.get_sample_for_ai(max_rows=4)
+        
+        assert sampled.total_rows == 4
+        assert sampled.columns[0].sample_values == ["P-0", "P-1", "P-8", "P-9"]
+        assert sampled.columns[0].unique_count == 10
+        assert sampled.columns[1] is short_col
+        assert long_col.sample_values == [f"P-{i}" for i in range(10)]
+
+
+class TestProcessDataFromFile:
+    """Test profiling data read straight from file objects."""
+    
+    def test_matches_string_processing(self):
+        """Test that a gzipped upload stream profiles like the same CSV sent as a string."""
+        csv_text = "Department,Budget,Actual\nFinance,100,90\nHR,50,55\n"
+        processor = DataProcessor()
+        
+        from_string = processor.process_data_from_string(csv_text, 'csv')
+        stream = gzip.GzipFile(fileobj=io.BytesIO(gzip.compress(csv_text.encode('utf-8'))), mode='rb')
+        from_file = processor.process_data_from_file(stream, 'csv')
+        
+        assert from_file.column_schema == from_string.column_schema
+        assert from_file.total_rows == 2
+        assert from_file.file_size_mb == pytest.approx(len(csv_text) / (1024 * 1024))
+    
+    @pytest.mark.parametrize("use_pyarrow", [True, False])
+    def test_csv_engines_agree(self, monkeypatch, use_pyarrow):
+        """Test that the pyarrow and C parsers produce the same profile."""
+        if use_pyarrow:
+            pytest.importorskip("pyarrow")
+        monkeypatch.setattr(data_processor, "PYARROW_AVAILABLE", use_pyarrow)
+        monkeypatch.setattr(data_processor, "PYARROW_CSV_MIN_BYTES", 0)
+        csv_text = "Department,Budget,Variance,Date\nFinance,\"$1,200\",-1.5%,2024-01-01\nHR,$850,2.5%,2024-02-01\n"
+        
+        profile = DataProcessor().process_data_from_string(csv_text, 'csv')
+        
+        assert profile.column_schema == (
+            ("Department", "string"), ("Budget", "currency"), ("Variance", "percent"), ("Date", "date")
+        )
+        assert profile.columns[3].sample_values == ["2024-01-01", "2024-02-01"]
+    
+    def test_small_csv_skips_pyarrow(self, monkeypatch):
+        """Test that inputs under the size threshold are parsed by the C parser."""
+        monkeypatch.setattr(data_processor, "PYARROW_AVAILABLE", True)
+        engines = []
+        real_read_csv = pd.read_csv
+        
+        def read_csv(*args, **kwargs):
+            engines.append(kwargs.get("engine"))
+            return real_read_csv(*args, **kwargs)
+        
+        monkeypatch.setattr(pd, "read_csv", read_csv)
+        
+        DataProcessor().process_data_from_string("a,b\n1,2\n", 'csv')
+        
+        assert engines == [None]
+    
+    def test_ragged_csv_falls_back_to_c_parser(self, monkeypatch):
+        """Test that rows the pyarrow reader rejects are still parsed."""
+        monkeypatch.setattr(data_processor, "PYARROW_CSV_MIN_BYTES", 0)
+        profile = DataProcessor().process_data_from_string("a,b\n1,2\n3\n", 'csv')
+        
+        assert profile.total_rows == 2
+        assert profile.columns[1].null_count == 1
+    
+    @pytest.mark.parametrize("use_pyarrow", [True, False])
+    def test_chunked_stream_matches_whole_frame(self, monkeypatch, use_pyarrow):
+        """Test that profiling an upload in small chunks gives the whole-frame profile."""
+        if use_pyarrow:
+            pytest.importorskip("pyarrow")
+        monkeypatch.setattr(data_processor, "PYARROW_AVAILABLE", use_pyarrow)
+        monkeypatch.setattr(data_processor, "CSV_CHUNK_ROWS", 7)
+        monkeypatch.setattr(data_processor, "PYARROW_CSV_BLOCK_BYTES", 64)
+        rows = [f"{'Finance' if i % 3 else ''},{i % 11},${i}" for i in range(40)]
+        csv_text = "Department,Code,Amount\n" + "\n".join(rows) + "\n"
+        processor = DataProcessor(max_sample_rows=10)
+        
+        whole = processor.process_data_from_string(csv_text, 'csv')
+        chunked = processor.process_data_from_file(io.BytesIO(csv_text.encode('utf-8')), 'csv')
+        
+        assert chunked.total_rows == whole.total_rows == 40
+        assert [col.to_dict() for col in chunked.columns] == [col.to_dict() for col in whole.columns]
+    
+    def test_ragged_stream_falls_back_to_c_parser(self):
+        """Test that an upload the pyarrow stream reader rejects is profiled again from the start."""
+        profile = DataProcessor().process_data_from_file(io.BytesIO(b"a,b\n1,2\n3\n"), 'csv')
+        
+        assert profile.total_rows == 2
+        assert profile.columns[1].null_count == 1
+    
+    def test_wide_frame_profiles_in_parallel_like_serial(self, monkeypatch):
+        """Test that profiling columns on the thread pool gives the serial profile, in column order."""
+        header = ",".join(f"Col{i}" for i in range(20))
+        rows = [",".join(f"{'$' if i % 2 else ''}{r * i}" for i in range(20)) for r in range(30)]
+        csv_text = header + "\n" + "\n".join(rows) + "\n"
+        processor = DataProcessor()
+        
+        parallel = processor.process_data_from_string(csv_text, 'csv')
+        monkeypatch.setattr(data_processor, "PARALLEL_PROFILE_MIN_COLUMNS", 10 ** 6)
+        serial = processor.process_data_from_string(csv_text, 'csv')
+        
+        assert [col.to_dict() for col in parallel.columns] == [col.to_dict() for col in serial.columns]
+        assert parallel.column_names[:3] == ("Col0", "Col1", "Col2")
+    
+    def test_excel_falls_back_without_calamine(self, monkeypatch):
+        """Test that workbooks still parse with openpyxl when the calamine engine can't be used."""
+        pytest.importorskip("openpyxl")
+        buffer = io.BytesIO()
+        pd.DataFrame({"Department": ["Finance", "HR"], "Budget": [100, 50]}).to_excel(buffer, index=False)
+        buffer.seek(0)
+        monkeypatch.setattr(data_processor, "CALAMINE_AVAILABLE", True)
+        
+        real_read_excel = pd.read_excel
+        
+        def read_excel(source, engine=None, **kwargs):
+            if engine == 'calamine':
+                raise ImportError("Missing optional dependency 'python-calamine'")
+            return real_read_excel(source, engine=engine, **kwargs)
+        
+        monkeypatch.setattr(pd, "read_excel", read_excel)
+        
+        profile = DataProcessor().process_data_from_file(buffer, 'xlsx')
+        
+        assert profile.total_rows == 2
+        assert profile.column_schema == (("Department", "string"), ("Budget", "number"))
+    
+    def test_workbook_bytes_profile_like_upload(self):
+        """Test that a workbook passed as bytes profiles like the same workbook streamed from a file."""
+        pytest.importorskip("openpyxl")
+        buffer = io.BytesIO()
+        pd.DataFrame({"Department": ["Finance", "HR"], "Budget": [100, 50]}).to_excel(buffer, index=False)
+        processor = DataProcessor()
+        
+        from_bytes = processor.process_data_from_string(buffer.getvalue(), 'xlsx')
+        buffer.seek(0)
+        from_file = processor.process_data_from_file(buffer, 'xlsx')
+        
+        assert from_bytes.total_rows == from_file.total_rows == 2
+        assert [col.to_dict() for col in from_bytes.columns] == [col.to_dict() for col in from_file.columns]
+    
+    def test_rejects_unknown_file_type(self):
+        """Test that unsupported formats raise."""
+        with pytest.raises(ValueError):
+            DataProcessor().process_data_from_file(io.BytesIO(b"{}"), 'json')
+
+
+class TestTypeInference:
+    """Test classifying text columns by the format of their values."""
+    
+    @pytest.mark.parametrize("values, expected", [
+        (["Finance", "Public Works", "Health"], "string"),
+        (["$1,200,000", "$850,000", "$650,000.50"], "currency"),
+        (["-1.67%", "2.35%", "6.67 %"], "percent"),
+        (["2024-01-01", "01/15/2024", "Jan 5, 2024"], "date"),
+        (["1,200", "850", "-3.5"], "number"),
+        (["$100", "$200", "$300", "n/a"], "currency"),
+        (["$100", "n/a", "n/a", "TBD"], "string"),
+    ])
+    def test_text_column_type(self, values, expected):
+        """Test that a text column takes the type most of its leading values match."""
+        series = pd.Series(values, dtype=object)
+        
+        assert DataProcessor()._infer_column_type(series) == expected
+    
+    @pytest.mark.parametrize("series, expected", [
+        (pd.Series([1200, 850, 650]), "number"),
+        (pd.Series([0.25, 0.5, 1.0]), "percent"),
+        (pd.Series([True, False, True]), "boolean"),
+        (pd.Series(pd.to_datetime(["2024-01-01", "2024-02-01"])), "date"),
+        (pd.Series([1200, 850], dtype="Int64"), "number"),
+        (pd.Series([True, False], dtype="boolean"), "boolean"),
+    ])
+    def test_typed_column_uses_dtype(self, series, expected):
+        """Test that numeric, boolean and datetime columns are typed from their dtype."""
+        assert DataProcessor()._infer_column_type(series) == expected
+    
+    @pytest.mark.parametrize("series, expected", [
+        (pd.Series(["2024-01-01", "2024-02-01", "n/a"] + ["2024-03-01"] * 30, dtype=object), True),
+        (pd.Series(["Finance", "Health", "2024-01-01"], dtype=object), False),
+        (pd.Series(pd.timedelta_range("1 day", periods=3)), False),
+        (pd.Series([20240101, 20240201]), False),
+        (pd.Series(pd.to_datetime(["2024-01-01"])), True),
+    ])
+    def test_date_probe_parses_leading_values(self, series, expected):
+        """Test that the date probe accepts mostly-parseable samples and rejects unparseable dtypes."""
+        assert DataProcessor()._is_date_column(series) is expected
+    
+    @pytest.mark.parametrize("values, expected", [
+        (["$5"] * 14 + ["n/a"] * 6, "currency"),
+        (["$5"] * 13 + ["n/a"] * 7, "string"),
+        (["n/a"] * 7 + ["$5"] * 13, "string"),
+        (["n/a"] * 6 + ["10%"] * 14, "percent"),
+        (["2024-01-01"] * 20 + ["n/a"] * 100, "date"),
+    ])
+    def test_threshold_over_leading_sample(self, values, expected):
+        """Test that only the leading values count, and a format needs 70% of them."""
+        series = pd.Series(values, dtype=object)
+        
+        assert DataProcessor()._infer_column_type(series) == expected
+
+
+class TestColumnCounts:
+    """Test the per-column counts computed while profiling."""
+    
+    def test_null_and_unique_counts(self):
+        """Test that nulls are counted once and excluded from cardinality and samples."""
+        csv_text = "Department,Budget\nFinance,100\n,100\nHR,\nFinance,50\n"
+        
+        profile = DataProcessor().process_data_from_string(csv_text, 'csv')
+        
+        department, budget = profile.columns
+        assert (department.null_count, department.unique_count) == (1, 2)
+        assert (budget.null_count, budget.unique_count) == (1, 2)
+        assert department.sample_values == ["Finance", "HR", "Finance"]
+        assert type(budget.null_count) is int and type(budget.unique_count) is int
+    
+    def test_sample_values_are_capped_at_max_sample_rows(self):
+        """Test that long columns keep only their first and last values as samples."""
+        csv_text = "Value\n" + "\n".join(str(i) for i in range(1000)) + "\n"
+        
+        profile = DataProcessor(max_sample_rows=10).process_data_from_string(csv_text, 'csv')
+        
+        assert profile.columns[0].sample_values == ["0", "1", "2", "3", "4", "995", "996", "997", "998", "999"]
+        assert profile.total_rows == 1000
+
 if __name__ == "__main__":
     # Run tests
     pytest.main([__file__])
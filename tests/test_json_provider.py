@@ -0,0 +1,55 @@
+"""
+Tests for the orjson-backed Flask JSON provider.
+"""
+
+import json
+import pytest
+from datetime import datetime
+from pathlib import Path
+import sys
+
+from flask import Flask, jsonify, request
+from flask.json.provider import DefaultJSONProvider
+
+# Add the src directory to the Python path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import json_provider
+from json_provider import OrjsonProvider
+
+
+@pytest.fixture
+def app():
+    """Create a bare Flask app using the orjson provider."""
+    app = Flask(__name__)
+    app.json = OrjsonProvider(app)
+    return app
+
+
+class TestOrjsonProvider:
+    """Test that the orjson provider is a drop-in replacement for Flask's default."""
+    
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_dumps_matches_default_provider(self, app, monkeypatch, use_orjson):
+        """Test that output, including datetimes and sorted keys, matches Flask's provider."""
+        if not use_orjson:
+            monkeypatch.setattr(json_provider, "orjson", None)
+        payload = {"title": "Budget", "created": datetime(2024, 1, 31, 12, 0), "amounts": [1, 2.5, None]}
+        default = DefaultJSONProvider(app)
+        
+        assert json.loads(app.json.dumps(payload)) == json.loads(default.dumps(payload))
+        assert list(json.loads(app.json.dumps({"b": 1, "a": 2}))) == ["a", "b"]
+    
+    def test_jsonify_and_request_parsing(self, app):
+        """Test that request bodies and responses round-trip through the provider."""
+        @app.route("/echo", methods=["POST"])
+        def echo():
+            return jsonify(received=request.get_json())
+        
+        response = app.test_client().post("/echo", json={"name": "Département"})
+        
+        assert response.status_code == 200
+        assert response.get_json() == {"received": {"name": "Département"}}
+
+if __name__ == "__main__":
+    pytest.main([__file__])
@@ -0,0 +1,61 @@
+"""
+Tests for the LLM response cache.
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add the src directory to the Python path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import llm_cache
+from llm_cache import LLMCache
+
+
+class TestLLMCache:
+    """Test the LRU/TTL response cache."""
+    
+    def test_evicts_least_recently_used(self):
+        """Test that reading an entry protects it from eviction."""
+        cache = LLMCache(max_entries=2)
+        cache.set("a", "1")
+        cache.set("b", "2")
+        cache.get("a")
+        cache.set("c", "3")
+        
+        assert cache.get("a") == "1"
+        assert cache.get("b") is None
+        assert len(cache) == 2
+    
+    def test_entries_expire_after_ttl(self, monkeypatch):
+        """Test that expired entries are treated as misses."""
+        now = [1000.0]
+        monkeypatch.setattr(llm_cache.time, "monotonic", lambda: now[0])
+        cache = LLMCache(ttl_seconds=60)
+        cache.set("a", "1")
+        
+        now[0] += 59
+        assert cache.get("a") == "1"
+        now[0] += 2
+        assert cache.get("a") is None
+    
+    def test_stats_count_hits_and_misses(self):
+        """Test the counters reported to the health endpoint."""
+        cache = LLMCache()
+        cache.set("a", "1")
+        cache.get("a")
+        cache.get("b")
+        
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"], stats["hit_rate"], stats["size"]) == (1, 1, 0.5, 1)
+    
+    def test_make_key_ignores_argument_order(self):
+        """Test that keys depend on content, not keyword order."""
+        assert LLMCache.make_key(model="m", messages=[1]) == LLMCache.make_key(messages=[1], model="m")
+        assert LLMCache.make_key(model="m") != LLMCache.make_key(model="n")
+
+
+if __name__ == "__main__":
+    # Run tests
+    pytest.main([__file__])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the rate-limited OpenAI request pool.
+"""
+
+import pytest
+import asyncio
+import sys
+import os
+from types import SimpleNamespace
+from unittest.mock import MagicMock, AsyncMock
+
+import openai
+
+# Add src directory to path for imports
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from openai_pool import AsyncOpenAIPool, estimate_request_tokens
+
+
+def _request(prompt="Plan a report", max_tokens=100):
+    """Build a minimal chat completion request."""
+    return {
+        "model": "gpt-4o",
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": max_tokens
+    }
+
+
+def _rate_limit_error(retry_after="0"):
+    """Build a 429 error carrying a Retry-After header."""
+    response = MagicMock(status_code=429, headers={"retry-after": retry_after})
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+class TestAsyncOpenAIPool:
+    """Test token-bucket throttling and rate limit retries."""
+
+    def test_estimate_request_tokens(self):
+        """Test that the estimate covers the prompt and the completion budget."""
+        assert estimate_request_tokens(_request("x" * 400, max_tokens=100)) == 200
+
+    def test_submit_waits_for_token_capacity(self):
+        """Test that a request exceeding the remaining token budget waits for a refill."""
+        # 6000 tokens per minute refills 100 tokens per second
+        pool = AsyncOpenAIPool(max_requests_per_minute=1000, max_tokens_per_minute=6000)
+        pool.available_token_capacity = 0
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(return_value="done")
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            start = loop.time()
+            result = await pool.submit(client, _request("", max_tokens=20))
+            return result, loop.time() - start
+
+        result, elapsed = asyncio.run(run())
+
+        assert result == "done"
+        assert elapsed >= 0.15
+
+    def test_submit_retries_rate_limited_request(self):
+        """Test that a 429 is retried and counted."""
+        pool = AsyncOpenAIPool()
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(side_effect=[_rate_limit_error(), "done"])
+
+        assert asyncio.run(pool.submit(client, _request())) == "done"
+        assert client.chat.completions.create.call_count == 2
+        assert pool.stats()["rate_limit_errors"] == 1
+
+    def test_submit_gives_up_after_max_retries(self):
+        """Test that the rate limit error surfaces once retries are exhausted."""
+        pool = AsyncOpenAIPool(max_retries=1)
+        client = MagicMock()
+        client.chat.completions.create = AsyncMock(side_effect=_rate_limit_error())
+
+        with pytest.raises(openai.RateLimitError):
+            asyncio.run(pool.submit(client, _request()))
+        assert client.chat.completions.create.call_count == 2
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
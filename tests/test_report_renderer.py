@@ -0,0 +1,248 @@
+"""
+Tests for the report renderer.
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add the src directory to the Python path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from report_renderer import ReportRenderer
+
+
+@pytest.fixture
+def data_profile():
+    """Profile dict with a duplicated column name, as stored in the session."""
+    return {
+        'columns': [
+            {'name': 'Department', 'type': 'string', 'sampleValues': ['Finance', 'Health']},
+            {'name': 'Budget', 'type': 'number', 'sampleValues': ['1,200', '800']},
+            {'name': 'Budget', 'type': 'string', 'sampleValues': ['shadowed']}
+        ]
+    }
+
+
+class TestColumnLookup:
+    """Test resolving KPI, chart and table columns against the profile."""
+    
+    def test_render_report_resolves_columns(self, data_profile):
+        """Test that every section finds its columns, the first one winning on duplicate names."""
+        report_spec = {
+            'title': 'Budget Review',
+            'kpis': [{'label': 'Total Budget', 'metric': 'sum', 'column': 'Budget'},
+                     {'label': 'Missing', 'metric': 'sum', 'column': 'Nope'}],
+            'charts': [{'type': 'bar', 'x': {'column': 'Department'}, 'series': [{'column': 'Budget'}]}],
+            'tables': [{'columns': ['Department', 'Nope'], 'limit': 2}]
+        }
+        
+        report = ReportRenderer().render_report(report_spec, data_profile)
+        
+        kpis, charts, tables = report['sections']
+        assert [kpi['value'] for kpi in kpis['content']] == [2000.0, 'Column "Nope" not found']
+        assert charts['content'][0]['chart_data'] == [{'x': 'Finance', 'y1': '1,200'}, {'x': 'Health', 'y1': '800'}]
+        assert tables['content'][0]['data'][0] == {'Department': 'Finance', 'Nope': 'Column Nope not found'}
+    
+    def test_helpers_index_the_profile_without_a_mapping(self, data_profile):
+        """Test that the helpers still work when called without a prebuilt column index."""
+        renderer = ReportRenderer()
+        
+        assert renderer._calculate_kpi_value({'metric': 'sum', 'column': 'Budget'}, data_profile) == 2000.0
+        assert renderer._generate_table_data({'columns': ['Department'], 'limit': 1}, data_profile) == [
+            {'Department': 'Finance'}
+        ]
+
+
+class TestKpiValues:
+    """Test KPI metrics computed from a column's sample values."""
+    
+    @pytest.mark.parametrize("metric, expected", [
+        ('sum', 2000.0), ('avg', 1000.0), ('min', 800.0), ('max', 1200.0)
+    ])
+    def test_numeric_metrics(self, data_profile, metric, expected):
+        """Test that each metric reduces the parsed samples, thousands separators included."""
+        kpi = {'metric': metric, 'column': 'Budget'}
+        
+        assert ReportRenderer()._calculate_kpi_value(kpi, data_profile) == expected
+    
+    def test_samples_parsed_once_per_column(self, data_profile):
+        """Test that KPIs over the same column reuse its parsed samples."""
+        renderer = ReportRenderer()
+        budget = data_profile['columns'][1]
+        
+        assert renderer._numeric_array(budget) is renderer._numeric_array(budget)
+    
+    def test_numeric_samples_used_as_is(self):
+        """Test that already-numeric samples, zeros included, are taken without string parsing."""
+        profile = {'columns': [{'name': 'Rate', 'type': 'number', 'sampleValues': [0, 2.5, '1,000', None, '']}]}
+        renderer = ReportRenderer()
+        
+        assert renderer._numeric_array(profile['columns'][0]).tolist() == [0.0, 2.5, 1000.0]
+        assert renderer._calculate_kpi_value({'metric': 'min', 'column': 'Rate'}, profile) == 0.0
+    
+    def test_unparseable_samples(self):
+        """Test that a sum over non-numeric samples reports it, while other metrics fall back to stats."""
+        profile = {'columns': [{'name': 'Code', 'type': 'number', 'sampleValues': ['12', 'N/A'],
+                                'stats': {'mean': 7}}]}
+        renderer = ReportRenderer()
+        
+        assert renderer._calculate_kpi_value({'metric': 'sum', 'column': 'Code'}, profile) == 'Cannot calculate sum'
+        assert renderer._calculate_kpi_value({'metric': 'avg', 'column': 'Code'}, profile) == 7
+    
+    def test_count_and_unknown_metric(self):
+        """Test the count metric and the message for a metric without a handler."""
+        profile = {'columns': [{'name': 'Code', 'type': 'string', 'stats': {'total_count': 42}}]}
+        renderer = ReportRenderer()
+        
+        assert renderer._calculate_kpi_value({'metric': 'count', 'column': 'Code'}, profile) == 42
+        assert renderer._calculate_kpi_value({'metric': 'median', 'column': 'Code'}, profile) == 'Unknown metric type: median'
+        assert renderer._calculate_kpi_value({'metric': 'avg', 'column': 'Code'}, profile) == 'Column is not numeric'
+
+
+class TestHtmlPreview:
+    """Test the standalone HTML preview of a rendered report."""
+    
+    def test_preview_contains_header_and_sections(self, data_profile):
+        """Test that the page skeleton is filled in and every section is rendered in order."""
+        report_spec = {
+            'title': 'Budget Review',
+            'description': 'FY24 actuals',
+            'kpis': [{'label': 'Total Budget', 'metric': 'sum', 'column': 'Budget'}],
+            'charts': [{'type': 'bar', 'x': {'column': 'Department'}, 'series': [{'column': 'Budget'}]}]
+        }
+        renderer = ReportRenderer()
+        
+        html = renderer.generate_html_preview(renderer.render_report(report_spec, data_profile))
+        
+        assert html.lstrip().startswith('<!DOCTYPE html>')
+        assert '<title>Budget Review</title>' in html
+        assert '<div class="report-meta">FY24 actuals</div>' in html
+        assert '.kpi-card { background: #f8f9fa;' in html
+        assert html.index('kpi-grid') < html.index('chart-container')
+        assert html.rstrip().endswith('</html>')
+    
+    def test_table_rows(self):
+        """Test that table rows follow the column order and leave missing cells empty."""
+        table = {'columns': ['Department', 'Budget'], 'data': [{'Budget': 5, 'Department': 'Finance'}, {'Budget': 3}]}
+        
+        assert ReportRenderer()._generate_table_rows_html(table) == (
+            '<tr><td>Finance</td><td>5</td></tr><tr><td></td><td>3</td></tr>'
+        )
+    
+    def test_stream_matches_preview(self, data_profile):
+        """Test that streaming writes the same page as generate_html_preview, in several chunks."""
+        report_spec = {
+            'title': 'Budget Review',
+            'kpis': [{'label': 'Total Budget', 'metric': 'sum', 'column': 'Budget'}],
+            'tables': [{'columns': ['Department'], 'limit': 2}]
+        }
+        renderer = ReportRenderer()
+        rendered = renderer.render_report(report_spec, data_profile)
+        chunks = []
+        
+        renderer.stream_html_preview(rendered, chunks.append)
+        
+        assert len(chunks) > 2
+        assert ''.join(chunks) == renderer.generate_html_preview(rendered)
+    
+    def test_chart_json_is_compact(self, data_profile):
+        """Test that chart labels and datasets are serialized without padding."""
+        section = {
+            'type': 'charts',
+            'content': [{'type': 'bar', 'title': 'Budget', 'chart_data': [{'x': 'Finance', 'y1': 1200}]}]
+        }
+        
+        html = ReportRenderer()._render_section_html(section)
+        
+        assert 'labels:["Finance"],' in html
+        assert '"data":[1200]' in html
+    
+    @pytest.mark.parametrize("use_orjson", [True, False])
+    def test_script_json_with_and_without_orjson(self, monkeypatch, use_orjson):
+        """Test that chart JSON is the same compact text whichever serializer is used."""
+        import report_renderer
+        if use_orjson and report_renderer.orjson is None:
+            pytest.skip("orjson not installed")
+        if not use_orjson:
+            monkeypatch.setattr(report_renderer, "orjson", None)
+        
+        text = report_renderer._script_json({'label': 'Café </b>', 'data': [1, 2.5, 2 ** 70]})
+        
+        assert text == '{"label":"Café <\\/b>","data":[1,2.5,1180591620717411303424]}'
+    
+    def test_report_values_are_escaped(self):
+        """Test that values from the data and the spec can't inject markup into the page."""
+        rendered = {
+            'title': 'Q1 <Review>',
+            'sections': [
+                {'type': 'kpis', 'content': [{'label': 'R&D', 'value': '<b>1</b>'}]},
+                {'type': 'tables', 'content': [{'columns': ['Note'], 'data': [{'Note': '"quoted" & <i>'}]}]},
+                {'type': 'charts', 'content': [{'type': 'bar', 'title': "It's </script>",
+                                                'chart_data': [{'x': '</script><script>', 'y1': 1}]}]}
+            ]
+        }
+        
+        html = ReportRenderer().generate_html_preview(rendered)
+        
+        assert '<title>Q1 &lt;Review&gt;</title>' in html
+        assert '<div class="kpi-value">&lt;b&gt;1&lt;/b&gt;</div>' in html
+        assert '<div class="kpi-label">R&amp;D</div>' in html
+        assert '<td>&quot;quoted&quot; &amp; &lt;i&gt;</td>' in html
+        assert '<h3>It&#39;s &lt;/script&gt;</h3>' in html
+        assert html.count('</script>') == 2
+
+
+class TestChartDatasets:
+    """Test building Chart.js datasets from row-oriented chart data."""
+    
+    def test_chart_data_series_values(self, data_profile):
+        """Test that chart points pair x samples with each series, including missing and unset columns."""
+        chart = {'x': {'column': 'Department'},
+                 'series': [{'column': 'Budget'}, {'column': 'Nope'}, {}, {'column': 'Budget'}]}
+        
+        assert ReportRenderer()._generate_chart_data(chart, data_profile) == [
+            {'x': 'Finance', 'y1': '1,200', 'y2': 0, 'y3': 0},
+            {'x': 'Health', 'y1': '800', 'y2': 0, 'y3': 10}
+        ]
+    
+    def test_one_dataset_per_series(self):
+        """Test that each y-series becomes a dataset and rows missing a series contribute 0."""
+        chart = {'type': 'bar', 'chart_data': [{'x': 'Finance', 'y1': 5, 'y2': 7}, {'x': 'Health', 'y1': 3}]}
+        
+        datasets = ReportRenderer()._generate_chart_datasets(chart)
+        
+        assert [dataset['label'] for dataset in datasets] == ['Series 1', 'Series 2']
+        assert [dataset['data'] for dataset in datasets] == [[5, 3], [7, 0]]
+    
+    def test_empty_chart_data(self):
+        """Test that a chart without rows has no datasets."""
+        assert ReportRenderer()._generate_chart_datasets({'type': 'bar', 'chart_data': []}) == []
+    
+    def test_chart_options_per_type(self, data_profile):
+        """Test that each chart gets its type's options as a plain, independent dict."""
+        report_spec = {'charts': [{'type': 'line', 'x': {'column': 'Department'}, 'series': [{'column': 'Budget'}]},
+                                  {'type': 'radar', 'x': {'column': 'Department'}, 'series': []}]}
+        
+        line, radar = ReportRenderer().render_report(report_spec, data_profile)['sections'][0]['content']
+        line['chart_options']['smooth'] = True
+        
+        assert type(line['chart_options']) is dict
+        assert radar['chart_options'] == {}
+        assert ReportRenderer()._get_chart_options({'type': 'line'})['smooth'] is False
+    
+    def test_color_scheme_per_series_count(self, data_profile):
+        """Test that a chart gets one color per series, capped at the palette size."""
+        renderer = ReportRenderer()
+        report_spec = {'charts': [{'type': 'bar', 'x': {'column': 'Department'}, 'series': [{'column': 'Budget'}] * n}
+                                  for n in (0, 2, 12)]}
+        
+        charts = renderer.render_report(report_spec, data_profile)['sections'][0]['content']
+        
+        assert [list(chart['color_scheme']) for chart in charts] == [
+            [], renderer.chart_colors[:2], renderer.chart_colors
+        ]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
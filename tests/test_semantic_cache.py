@@ -0,0 +1,60 @@
+"""
+Tests for the embedding-based semantic cache.
+"""
+
+import pytest
+from pathlib import Path
+import sys
+
+# Add the src directory to the Python path for testing
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from semantic_cache import SemanticCache
+
+
+class TestSemanticCache:
+    """Test similarity lookup, signatures, eviction and expiry."""
+    
+    def test_returns_most_similar_entry_above_threshold(self):
+        """Test that the closest embedding wins and weak matches miss."""
+        cache = SemanticCache(min_similarity=0.9)
+        cache.set([1.0, 0.0], "layout", "budget plan")
+        cache.set([0.0, 1.0], "layout", "permit plan")
+        
+        value, similarity = cache.get([0.95, 0.1], "layout")
+        assert value == "budget plan"
+        assert similarity > 0.99
+        assert cache.get([0.7, 0.7], "layout") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+    
+    def test_signature_must_match(self):
+        """Test that an identical embedding under another signature is a miss."""
+        cache = SemanticCache()
+        cache.set([1.0, 0.0], ("Budget", "currency"), "plan")
+        
+        assert cache.get([1.0, 0.0], ("Actual", "currency")) is None
+    
+    def test_evicts_least_recently_used(self):
+        """Test that reading an entry protects it from eviction."""
+        cache = SemanticCache(max_entries=2)
+        cache.set([1.0, 0.0, 0.0], "layout", "a")
+        cache.set([0.0, 1.0, 0.0], "layout", "b")
+        cache.get([1.0, 0.0, 0.0], "layout")
+        cache.set([0.0, 0.0, 1.0], "layout", "c")
+        
+        assert len(cache) == 2
+        assert cache.get([0.0, 1.0, 0.0], "layout") is None
+        assert cache.get([1.0, 0.0, 0.0], "layout")[0] == "a"
+    
+    def test_expired_entries_miss(self):
+        """Test that entries past their TTL are dropped."""
+        cache = SemanticCache(ttl_seconds=0)
+        cache.set([1.0, 0.0], "layout", "plan")
+        
+        assert cache.get([1.0, 0.0], "layout") is None
+        assert len(cache) == 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])